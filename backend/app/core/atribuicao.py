@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from app.core.matriz_score import construir_matriz_score
+from app.core.pool_processos import obter_pool, tamanho_pool
+
+# Pares com score <= LIMITE_VIAVEL não podem ser alocados (mesma regra do guloso)
+LIMITE_VIAVEL = -1000
+
+def resolver_bucket(scores: np.ndarray):
+    """
+    Resolve um (dia, turno) como problema de atribuição retangular de custo mínimo.
+    Pares viáveis custam max_viavel - score (>= 0, mesmo com scores negativos) e
+    os inviáveis uma penalidade maior que a soma de qualquer atribuição viável,
+    então o solver primeiro maximiza quantas grades recebem sala e depois o score.
+    Retorna (linhas, colunas, segundos) só com os pares viáveis.
+    """
+    inicio = time.perf_counter()
+    viavel = scores > LIMITE_VIAVEL
+    if not viavel.any():
+        vazio = np.array([], dtype=np.int64)
+        return vazio, vazio, time.perf_counter() - inicio
+
+    validos = scores[viavel].astype(np.int64)
+    max_viavel = int(validos.max())
+    penalidade = (max_viavel - int(validos.min()) + 1) * min(scores.shape) + 1
+    custo = np.where(viavel, max_viavel - scores.astype(np.int64), penalidade)
+
+    linhas, colunas = linear_sum_assignment(custo)
+    ok = viavel[linhas, colunas]
+    return linhas[ok], colunas[ok], time.perf_counter() - inicio
+
+def alocar_otima(grades, salas, zona_preferencial: dict, ocupacao: dict, max_workers: int = None):
+    """
+    Alternativa ao alocar_gulosa: cada (dia, turno) é resolvido de forma ótima e
+    os buckets (independentes entre si) rodam em paralelo no pool de processos da API.
+    Salas já presentes em `ocupacao` ficam fora da atribuição.
+    Retorna (lista de (grade, sala, score), grades sem sala, estatísticas por bucket).
+    """
+    buckets = {}
+    for i, item in enumerate(grades):
+        if item.dia_semana not in ocupacao or item.turno not in ocupacao[item.dia_semana]: continue
+        buckets.setdefault((item.dia_semana, item.turno), []).append(i)
+
+    if not buckets: return [], [], []
+    if not salas:
+        return [], [grades[i] for i in sorted(i for idx in buckets.values() for i in idx)], []
+
+    matriz, perfil_por_grade = construir_matriz_score(grades, salas, zona_preferencial)
+
+    tarefas = []
+    for (dia, turno), indices in buckets.items():
+        ocupadas = ocupacao[dia][turno]
+        livres = np.array([j for j, sala in enumerate(salas) if sala.id not in ocupadas], dtype=np.int64)
+        sub = matriz[perfil_por_grade[indices]][:, livres] if len(livres) else np.zeros((len(indices), 0), dtype=np.int32)
+        tarefas.append(((dia, turno), indices, livres, sub))
+
+    workers = max_workers or min(len(tarefas), tamanho_pool())
+    if workers == 1:
+        resultados = [resolver_bucket(t[3]) for t in tarefas]
+    else:
+        resultados = list(obter_pool().map(resolver_bucket, [t[3] for t in tarefas]))
+
+    alocadas, sem_sala_idx, estatisticas = [], [], []
+    for ((dia, turno), indices, livres, sub), (linhas, colunas, segundos) in zip(tarefas, resultados):
+        atendidas = set()
+        score_bucket = 0
+        for r, c in zip(linhas.tolist(), colunas.tolist()):
+            item, sala, score = grades[indices[r]], salas[livres[c]], int(sub[r, c])
+            alocadas.append((item, sala, score))
+            ocupacao[dia][turno].add(sala.id)
+            atendidas.add(r)
+            score_bucket += score
+        faltantes = [indices[r] for r in range(len(indices)) if r not in atendidas]
+        sem_sala_idx.extend(faltantes)
+        estatisticas.append({
+            "dia": dia, "turno": turno, "grades": len(indices), "alocadas": len(atendidas),
+            "conflitos": len(faltantes), "score_total": score_bucket, "tempo_ms": round(segundos * 1000, 2)
+        })
+
+    sem_sala = [grades[i] for i in sorted(sem_sala_idx)]
+    return alocadas, sem_sala, estatisticas
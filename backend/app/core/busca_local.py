@@ -0,0 +1,201 @@
+import time
+
+import numpy as np
+
+from app.core.matriz_score import construir_matriz_score
+
+# Mesma regra dos solvers: pares com score <= LIMITE_VIAVEL não podem ser alocados
+LIMITE_VIAVEL = -1000
+INVIAVEL = np.iinfo(np.int64).min // 4
+
+class _Bucket:
+    """
+    Estado de um (dia, turno) para a busca local: grade -> coluna da sala
+    (-1 = sem sala) e sala -> grade (-1 = livre), sobre a submatriz de scores.
+    Os deltas de cada movimento são lidos da matriz, sem recalcular a solução.
+    """
+    def __init__(self, scores: np.ndarray, sala_de: np.ndarray):
+        self.scores = scores
+        self.viavel = scores > LIMITE_VIAVEL
+        self.sala_de = sala_de
+        self.dono = np.full(scores.shape[1], -1, dtype=np.int64)
+        alocadas = np.flatnonzero(sala_de >= 0)
+        self.dono[sala_de[alocadas]] = alocadas
+
+    def _melhor_livre(self):
+        """Para cada grade, (score, coluna) da melhor sala livre viável."""
+        livres = self.dono < 0
+        if not livres.any():
+            n = len(self.sala_de)
+            return np.full(n, INVIAVEL, dtype=np.int64), np.full(n, -1, dtype=np.int64)
+        sub = np.where(self.viavel[:, livres], self.scores[:, livres], INVIAVEL)
+        cols = np.flatnonzero(livres)
+        idx = sub.argmax(axis=1)
+        return sub[np.arange(len(sub)), idx], cols[idx]
+
+    def resolver_conflito(self):
+        """
+        Dá sala a uma grade sem sala: direto numa sala livre ou deslocando o dono
+        de uma sala viável para outra livre. Escolhe o maior ganho de score.
+        Retorna o delta de score aplicado, ou None se nenhuma grade puder entrar.
+        """
+        sem_sala = np.flatnonzero(self.sala_de < 0)
+        if not len(sem_sala): return None
+        melhor_livre, col_livre = self._melhor_livre()
+
+        # Inserção direta
+        ganhos = melhor_livre[sem_sala]
+        i = int(ganhos.argmax())
+        candidato = (int(ganhos[i]), "inserir", int(sem_sala[i]), None) if ganhos[i] > INVIAVEL else None
+
+        # Deslocamento: g ocupa a sala r do dono h; h vai para a melhor livre dele
+        ocupadas = np.flatnonzero(self.dono >= 0)
+        if len(ocupadas):
+            donos = self.dono[ocupadas]
+            destino_dono = melhor_livre[donos]
+            delta = self.scores[np.ix_(sem_sala, ocupadas)] + destino_dono[None, :] - self.scores[donos, ocupadas][None, :]
+            ok = self.viavel[np.ix_(sem_sala, ocupadas)] & (destino_dono > INVIAVEL)[None, :]
+            delta = np.where(ok, delta, INVIAVEL)
+            a, b = np.unravel_index(int(delta.argmax()), delta.shape)
+            if delta[a, b] > INVIAVEL and (candidato is None or delta[a, b] > candidato[0]):
+                candidato = (int(delta[a, b]), "deslocar", int(sem_sala[a]), int(ocupadas[b]))
+
+        if candidato is None: return None
+        ganho, tipo, g, r = candidato
+        if tipo == "inserir":
+            self._mover(g, int(col_livre[g]))
+        else:
+            h = int(self.dono[r])
+            self._mover(h, int(col_livre[h]))
+            self._mover(g, r)
+        return ganho
+
+    def melhorar_score(self):
+        """
+        Uma rodada de melhoria com três movimentos: realocar uma grade para uma
+        sala livre, trocar as salas de duas grades e empurrar (g toma a sala de h,
+        h vai para uma livre). Pega o melhor movimento de cada grade e aplica, do
+        maior ganho para o menor, todos que não disputam grade nem sala com um já
+        aplicado (o delta de cada um só depende das próprias grades e salas).
+        Retorna (ganho, movimentos) ou None no ótimo local.
+        """
+        alocadas = np.flatnonzero(self.sala_de >= 0)
+        if not len(alocadas): return None
+        atuais = self.sala_de[alocadas]
+        score_atual = self.scores[alocadas, atuais]
+        linhas = np.arange(len(alocadas))
+        candidatos = []
+
+        melhor_livre, col_livre = self._melhor_livre()
+        livre = melhor_livre[alocadas]
+        ganho = np.where(livre > INVIAVEL, livre - score_atual, 0)
+        for a in np.flatnonzero(ganho > 0).tolist():
+            candidatos.append((int(ganho[a]), "realocar", a, None))
+
+        # Troca: delta[i, j] = S[gi, rj] + S[gj, ri] - S[gi, ri] - S[gj, rj]
+        cruzado = self.scores[np.ix_(alocadas, atuais)]
+        viavel = self.viavel[np.ix_(alocadas, atuais)]
+        delta = cruzado + cruzado.T - score_atual[:, None] - score_atual[None, :]
+        delta = np.where(viavel & viavel.T, delta, 0)
+        melhor_b = delta.argmax(axis=1)
+        for a in np.flatnonzero(delta[linhas, melhor_b] > 0).tolist():
+            candidatos.append((int(delta[a, melhor_b[a]]), "trocar", a, int(melhor_b[a])))
+
+        # Empurrar: delta[i, j] = S[gi, rj] - S[gi, ri] + livre(gj) - S[gj, rj]
+        delta = cruzado - score_atual[:, None] + (livre - score_atual)[None, :]
+        delta = np.where(viavel & (livre > INVIAVEL)[None, :], delta, 0)
+        np.fill_diagonal(delta, 0)
+        melhor_b = delta.argmax(axis=1)
+        for a in np.flatnonzero(delta[linhas, melhor_b] > 0).tolist():
+            candidatos.append((int(delta[a, melhor_b[a]]), "empurrar", a, int(melhor_b[a])))
+
+        if not candidatos: return None
+        candidatos.sort(key=lambda c: c[0], reverse=True)
+        grades_usadas, salas_usadas = set(), set()
+        total, movimentos = 0, 0
+        for ganho, tipo, a, b in candidatos:
+            ga = int(alocadas[a])
+            gb = int(alocadas[b]) if b is not None else None
+            envolvidas = {ga} if gb is None else {ga, gb}
+            salas = {int(self.sala_de[g]) for g in envolvidas}
+            if tipo != "trocar": salas.add(int(col_livre[ga if tipo == "realocar" else gb]))
+            if envolvidas & grades_usadas or salas & salas_usadas: continue
+            grades_usadas |= envolvidas
+            salas_usadas |= salas
+
+            if tipo == "realocar":
+                self._mover(ga, int(col_livre[ga]))
+            elif tipo == "empurrar":
+                destino = int(self.sala_de[gb])
+                self._mover(gb, int(col_livre[gb]))
+                self._mover(ga, destino)
+            else:
+                ra, rb = int(self.sala_de[ga]), int(self.sala_de[gb])
+                self.sala_de[ga], self.sala_de[gb] = rb, ra
+                self.dono[ra], self.dono[rb] = gb, ga
+            total += ganho
+            movimentos += 1
+        return total, movimentos
+
+    def _mover(self, g: int, col: int):
+        if self.sala_de[g] >= 0: self.dono[self.sala_de[g]] = -1
+        self.sala_de[g] = col
+        self.dono[col] = g
+
+def melhorar_alocacao(salas, zona_preferencial: dict, alocadas: list, sem_sala: list, orcamento_s: float):
+    """
+    Busca local depois do guloso/ótimo, bucket a bucket (dia, turno).
+    Primeiro tenta dar sala às grades sem sala (inserção ou deslocamento), depois
+    sobe o score com realocações, trocas de pares e empurrões, sempre pelo
+    melhor movimento.
+    Cada bucket recebe uma fatia do tempo que ainda resta; ao estourar, fica a
+    melhor solução até ali (toda iteração só aceita melhorias).
+    Retorna (alocadas, sem_sala, estatísticas) no mesmo formato dos solvers.
+    """
+    inicio = time.perf_counter()
+    prazo_final = inicio + orcamento_s
+    score_inicial = sum(score for _, _, score in alocadas)
+
+    todas = [item for item, _, _ in alocadas] + list(sem_sala)
+    if not todas or not salas:
+        return alocadas, sem_sala, {"tempo_ms": 0.0, "movimentos": 0, "melhoria_score": 0, "conflitos_resolvidos": 0, "orcamento_esgotado": False}
+
+    matriz, perfil_por_grade = construir_matriz_score(todas, salas, zona_preferencial)
+    coluna = {id(sala): j for j, sala in enumerate(salas)}
+    sala_inicial = [coluna[id(sala)] for _, sala, _ in alocadas] + [-1] * len(sem_sala)
+
+    buckets = {}
+    for i, item in enumerate(todas):
+        buckets.setdefault((item.dia_semana, item.turno), []).append(i)
+
+    novas_alocadas, novas_sem_sala = [], []
+    movimentos, conflitos_resolvidos, esgotado = 0, 0, False
+    for n, indices in enumerate(buckets.values()):
+        estado = _Bucket(matriz[perfil_por_grade[indices]].astype(np.int64), np.array([sala_inicial[i] for i in indices], dtype=np.int64))
+        prazo = time.perf_counter() + (prazo_final - time.perf_counter()) / (len(buckets) - n)
+
+        while True:
+            if time.perf_counter() >= prazo:
+                esgotado = True
+                break
+            if estado.resolver_conflito() is not None:
+                conflitos_resolvidos += 1
+                movimentos += 1
+                continue
+            rodada = estado.melhorar_score()
+            if rodada is None: break
+            movimentos += rodada[1]
+
+        for k, i in enumerate(indices):
+            col = int(estado.sala_de[k])
+            if col >= 0: novas_alocadas.append((todas[i], salas[col], int(estado.scores[k, col])))
+            else: novas_sem_sala.append(todas[i])
+
+    estatisticas = {
+        "tempo_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        "movimentos": movimentos,
+        "melhoria_score": sum(score for _, _, score in novas_alocadas) - score_inicial,
+        "conflitos_resolvidos": conflitos_resolvidos,
+        "orcamento_esgotado": esgotado,
+    }
+    return novas_alocadas, novas_sem_sala, estatisticas
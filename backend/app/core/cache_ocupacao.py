@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import json
+import threading
+import uuid
+
+# Snapshot de ocupação por (dia, turno), mantido em memória do processo.
+# Quem altera alocações ou salas chama invalidar_ocupacao; a próxima leitura remonta.
+_snapshots = {}
+_geracoes = {}
+_geracao_global = 0
+_ouvintes = []
+_ouvintes_modelo = []
+_lock = threading.Lock()
+# Versão dos dados do processo: toda escrita (importação, alocação, troca,
+# check-in/out, salas) passa por invalidar_ocupacao, que a incrementa. O prefixo
+# muda a cada início do processo, então uma ETag de antes de um restart não
+# coincide com a contagem reiniciada.
+_inicio_processo = uuid.uuid4().hex[:8]
+_versao_dados = 0
+# Montagens em andamento pedidas pelo event loop ((chave, geração) -> Task)
+_em_montagem = {}
+
+def registrar_ouvinte(callback):
+    """`callback(dia, turno)` é chamado a cada invalidação (dia/turno None = tudo)."""
+    _ouvintes.append(callback)
+
+def registrar_ouvinte_modelo(callback):
+    """Como registrar_ouvinte, mas só para mudanças do modelo semanal (check-ins do portal ficam de fora)."""
+    _ouvintes_modelo.append(callback)
+
+def _geracao(chave):
+    return (_geracao_global, _geracoes.get(chave, 0))
+
+def obter_snapshot(chave, montar):
+    """
+    Devolve o snapshot da chave, montando com `montar()` só se não houver um válido.
+    Se houve invalidação durante a montagem, o resultado é entregue mas não fica em cache.
+    """
+    with _lock:
+        snapshot = _snapshots.get(chave)
+        if snapshot is not None: return snapshot
+        geracao = _geracao(chave)
+
+    return _guardar(chave, geracao, montar())
+
+async def obter_snapshot_async(chave, montar):
+    """
+    Versão de obter_snapshot para o event loop: `montar` é uma coroutine function.
+    Leituras concorrentes da mesma chave sem snapshot esperam uma única montagem,
+    em vez de cada uma ir ao banco logo após uma invalidação.
+    """
+    with _lock:
+        snapshot = _snapshots.get(chave)
+        if snapshot is not None: return snapshot
+        geracao = _geracao(chave)
+
+    # Quem chega depois de uma invalidação não reaproveita a montagem anterior a ela
+    id_montagem = (chave, geracao)
+    tarefa = _em_montagem.get(id_montagem)
+    if tarefa is None:
+        async def _montar_e_guardar():
+            return _guardar(chave, geracao, await montar())
+        tarefa = asyncio.ensure_future(_montar_e_guardar())
+        _em_montagem[id_montagem] = tarefa
+        tarefa.add_done_callback(lambda _: _em_montagem.pop(id_montagem, None))
+    # shield: um cliente que desconecta não cancela a montagem dos demais
+    return await asyncio.shield(tarefa)
+
+def _guardar(chave, geracao, dados):
+    conteudo = json.dumps(dados, sort_keys=True, default=str).encode()
+    snapshot = {**dados, "versao": hashlib.md5(conteudo).hexdigest()[:16]}
+
+    with _lock:
+        if _geracao(chave) == geracao: _snapshots[chave] = snapshot
+    return snapshot
+
+def versao_dados() -> str:
+    return f"{_inicio_processo}-{_versao_dados}"
+
+def invalidar_ocupacao(dia: str = None, turno: str = None, modelo: bool = True):
+    """
+    Sem argumentos invalida tudo (ex: salas mudaram); com (dia, turno) só aquele turno.
+    `modelo=False` quando só a ocupação mudou (check-in/out do portal): grades,
+    salas e alocações do modelo semanal continuam as mesmas.
+    """
+    global _geracao_global, _versao_dados
+    with _lock:
+        _versao_dados += 1
+        if dia is None or turno is None:
+            _geracao_global += 1
+            _snapshots.clear()
+        else:
+            chave = (dia, turno)
+            _geracoes[chave] = _geracoes.get(chave, 0) + 1
+            _snapshots.pop(chave, None)
+    for callback in _ouvintes: callback(dia, turno)
+    if modelo:
+        for callback in _ouvintes_modelo: callback(dia, turno)
@@ -0,0 +1,160 @@
+import time
+from collections import defaultdict, namedtuple
+from functools import partial
+
+from sqlalchemy.orm import Session
+
+from app.models import Sala, Grade, Alocacao
+from app.core.config import settings
+from app.core.matriz_score import alocar_gulosa, construir_matriz_score
+from app.core.atribuicao import alocar_otima
+from app.core.busca_local import melhorar_alocacao
+from app.core.pool_processos import obter_pool, tamanho_pool
+from app.core.optimizer import DIAS_SEMANA, TURNOS, TIPO_CHECKIN, calcular_zonas_preferenciais, natural_sort_key
+
+# Cópias em memória (picklable) do que o solver usa; o cenário nunca toca o banco
+SalaCenario = namedtuple("SalaCenario", "id nome_visual bloco andar especialidade_id especialidade_preferencial features is_maintenance")
+GradeCenario = namedtuple("GradeCenario", "id nome_profissional especialidade especialidade_id tipo_recurso dia_semana turno")
+
+def carregar_base(db: Session) -> dict:
+    """
+    Snapshot único de salas, grades e do plano atual, compartilhado por todos os
+    cenários de uma simulação. Check-ins do portal ficam de fora (não são planejados).
+    """
+    salas = [SalaCenario(s.id, s.nome_visual, s.bloco, s.andar, s.especialidade_id, s.especialidade_preferencial, s.features, bool(s.is_maintenance))
+             for s in db.query(Sala).all()]
+    grades = [GradeCenario(g.id, g.nome_profissional, g.especialidade, g.especialidade_id, g.tipo_recurso, g.dia_semana, g.turno)
+              for g in db.query(Grade).filter(Grade.tipo_recurso != TIPO_CHECKIN).all()]
+    sala_atual = dict(db.query(Alocacao.grade_id, Alocacao.sala_id).filter(Alocacao.sala_id.isnot(None)).all())
+    base = {"salas": salas, "grades": grades}
+    base["atual"] = _avaliar_plano_atual(salas, grades, sala_atual)
+    return base
+
+def _preparar(salas, grades):
+    """Mesma ordem e zonas de gerar_alocacao_grade, para o cenário sem mudanças reproduzir o gerador."""
+    grades = sorted(grades, key=lambda x: (x.especialidade_id is None, x.tipo_recurso == 'RESIDENTE', x.nome_profissional))
+    salas = sorted((s for s in salas if not s.is_maintenance), key=lambda s: (s.bloco, s.andar, natural_sort_key(s.id)))
+    return salas, grades, calcular_zonas_preferenciais(salas)
+
+def _avaliar_plano_atual(salas, grades, sala_atual: dict) -> dict:
+    """
+    Score do plano gravado recalculado pela matriz (trocas manuais e check-ins
+    guardam scores fixos, que não são comparáveis com os de um cenário).
+    """
+    salas, grades, zona_pref = _preparar(salas, grades)
+    coluna = {s.id: j for j, s in enumerate(salas)}
+    alocadas, sem_sala = [], []
+    if salas and grades:
+        matriz, perfil_por_grade = construir_matriz_score(grades, salas, zona_pref)
+        for i, grade in enumerate(grades):
+            j = coluna.get(sala_atual.get(grade.id))
+            if j is None: sem_sala.append(grade)
+            else: alocadas.append((grade, salas[j], int(matriz[perfil_por_grade[i], j])))
+    else:
+        sem_sala = list(grades)
+    return _resumir(salas, grades, alocadas, sem_sala)
+
+def aplicar_alteracoes(base: dict, cenario: dict):
+    """
+    Aplica as alterações de um cenário sobre cópias das salas e grades da base.
+    Chaves aceitas (todas opcionais):
+      salas_manutencao / salas_liberadas: ids de sala
+      locais_fechados: [{"bloco", "andar"}] (sem andar = bloco inteiro)
+      especialidade_salas: {sala_id: especialidade_preferencial}
+      grades_removidas: ids de grade
+      especialidade_grades: {grade_id: especialidade}
+      grades_adicionadas: [{"nome_profissional", "especialidade", "dia_semana", "turno", "tipo_recurso"}]
+    """
+    manutencao = set(cenario.get("salas_manutencao") or [])
+    liberadas = set(cenario.get("salas_liberadas") or [])
+    locais = [(l["bloco"], l.get("andar")) for l in cenario.get("locais_fechados") or []]
+    esp_salas = cenario.get("especialidade_salas") or {}
+
+    salas = []
+    for s in base["salas"]:
+        fechada = any(s.bloco == bloco and (andar is None or str(s.andar) == str(andar)) for bloco, andar in locais)
+        if s.id in manutencao or fechada: s = s._replace(is_maintenance=True)
+        elif s.id in liberadas: s = s._replace(is_maintenance=False)
+        if s.id in esp_salas: s = s._replace(especialidade_preferencial=esp_salas[s.id], especialidade_id=None)
+        salas.append(s)
+
+    removidas = {int(g) for g in cenario.get("grades_removidas") or []}
+    esp_grades = {int(k): v for k, v in (cenario.get("especialidade_grades") or {}).items()}
+    grades = []
+    for g in base["grades"]:
+        if g.id in removidas: continue
+        if g.id in esp_grades: g = g._replace(especialidade=esp_grades[g.id], especialidade_id=None)
+        grades.append(g)
+    # Ids negativos: grades que só existem no cenário
+    for n, nova in enumerate(cenario.get("grades_adicionadas") or [], start=1):
+        grades.append(GradeCenario(-n, nova["nome_profissional"], nova["especialidade"], None, nova.get("tipo_recurso") or "EXTRA", nova["dia_semana"], nova["turno"]))
+    return salas, grades
+
+def _resumir(salas, grades, alocadas, sem_sala) -> dict:
+    """Score, conflitos e utilização por bloco/andar (ocupações / (salas x turnos com demanda))."""
+    turnos_com_demanda = {(g.dia_semana, g.turno) for g in grades}
+    por_local = defaultdict(lambda: {"salas": 0, "alocacoes": 0})
+    for s in salas: por_local[(s.bloco, s.andar)]["salas"] += 1
+    for _, sala, _ in alocadas: por_local[(sala.bloco, sala.andar)]["alocacoes"] += 1
+
+    utilizacao = []
+    for (bloco, andar), info in sorted(por_local.items(), key=lambda x: (x[0][0], natural_sort_key(str(x[0][1])))):
+        capacidade = info["salas"] * len(turnos_com_demanda)
+        utilizacao.append({"bloco": bloco, "andar": andar, "salas": info["salas"], "alocacoes": info["alocacoes"],
+                           "taxa": round(info["alocacoes"] / capacidade, 4) if capacidade else 0.0})
+    return {
+        "score_total": sum(score for _, _, score in alocadas),
+        "total_alocadas": len(alocadas),
+        "total_conflitos": len(sem_sala),
+        "conflitos": [{"grade_id": g.id, "medico": g.nome_profissional, "especialidade": g.especialidade, "dia": g.dia_semana, "turno": g.turno, "motivo": "Sem sala"}
+                      for g in sem_sala],
+        "utilizacao": utilizacao,
+    }
+
+def simular_cenario(base: dict, cenario: dict) -> dict:
+    """Roda o alocador sobre a base alterada, só em memória, e compara com o plano atual."""
+    inicio = time.perf_counter()
+    salas, grades, zona_pref = _preparar(*aplicar_alteracoes(base, cenario))
+    ocupacao = {d: {t: set() for t in TURNOS} for d in DIAS_SEMANA}
+
+    if cenario.get("modo") == "otimo":
+        # Já estamos num processo do pool: os buckets rodam em sequência aqui dentro
+        alocadas, sem_sala, _ = alocar_otima(grades, salas, zona_pref, ocupacao, max_workers=1)
+    else:
+        alocadas, sem_sala = alocar_gulosa(grades, salas, zona_pref, ocupacao)
+    if cenario.get("busca_local_s"):
+        alocadas, sem_sala, _ = melhorar_alocacao(salas, zona_pref, alocadas, sem_sala, cenario["busca_local_s"])
+
+    resultado = {"nome": cenario.get("nome"), **_resumir(salas, grades, alocadas, sem_sala)}
+    atual = base["atual"]
+    resultado["delta"] = {
+        "score_total": resultado["score_total"] - atual["score_total"],
+        "total_alocadas": resultado["total_alocadas"] - atual["total_alocadas"],
+        "total_conflitos": resultado["total_conflitos"] - atual["total_conflitos"],
+    }
+    resultado["tempo_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+    return resultado
+
+def simular_cenarios(db: Session, cenarios: list, max_workers: int = None) -> dict:
+    """
+    Carrega a base uma vez e simula os cenários em paralelo no pool de processos
+    da API (cenários são independentes entre si). Nenhuma escrita no banco.
+    """
+    inicio = time.perf_counter()
+    base = carregar_base(db)
+    tempo_base = time.perf_counter() - inicio
+
+    workers = min(len(cenarios), max_workers or settings.CENARIOS_WORKERS or tamanho_pool(), tamanho_pool())
+    if workers <= 1:
+        resultados = [simular_cenario(base, c) for c in cenarios]
+    else:
+        # O pool é compartilhado, então a base vai com cada cenário (no máximo 20 por simulação)
+        resultados = list(obter_pool().map(partial(simular_cenario, base), cenarios))
+
+    atual = {k: v for k, v in base["atual"].items() if k != "conflitos"}
+    return {
+        "plano_atual": atual,
+        "cenarios": resultados,
+        "estatisticas": {"salas": len(base["salas"]), "grades": len(base["grades"]), "processos": workers,
+                         "tempo_base_ms": round(tempo_base * 1000, 2), "tempo_total_ms": round((time.perf_counter() - inicio) * 1000, 2)},
+    }
@@ -9,10 +9,57 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     
-    # Credenciais Admin
+    # Credenciais Admin (primeiro usuário, criado na tabela usuarios se ela estiver vazia)
     ADMIN_USERNAME: str
     ADMIN_PASSWORD: str
 
+    # Usuários: custo do bcrypt (2^n) e cache dos tokens já verificados
+    BCRYPT_ROUNDS: int = 12
+    TOKEN_CACHE_MAX: int = 4096
+    TOKEN_CACHE_TTL_SEGUNDOS: int = 300
+
+    # Banco de dados (trocar de SQLite para um servidor é só mudar a URL)
+    DATABASE_URL: str = "sqlite:///./gds_poc.db"
+    ASYNC_DATABASE_URL: str = ""  # vazio = derivada de DATABASE_URL (sqlite -> sqlite+aiosqlite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -20000  # negativo = KiB (~20 MB)
+
+    # Busca local depois da alocação (0 = desligada); pode ser sobrescrito por requisição
+    BUSCA_LOCAL_SEGUNDOS: float = 0
+
+    # Turnos: início de cada um no fuso do hospital; o último vai até o primeiro do dia seguinte
+    FUSO_HORARIO: str = "America/Recife"
+    TURNOS_INICIO: str = "MANHA=06:00,TARDE=13:00,NOITE=18:00,MADRUGADA=23:00"
+    # Minutos antes de cada troca em que a ocupação do próximo turno é pré-montada
+    TURNO_PREAQUECIMENTO_MINUTOS: int = 5
+
+    # Horizonte datado (semanas à frente consultáveis/planejáveis a partir de hoje)
+    HORIZONTE_SEMANAS: int = 12
+
+    # Pool de processos compartilhado (solver ótimo e cenários; 0 = um por CPU)
+    POOL_PROCESSOS: int = 0
+    # Simulação de cenários (processos em paralelo, limitado ao pool; 0 = um por CPU)
+    CENARIOS_WORKERS: int = 0
+
+    # /metrics (formato Prometheus): só responde a estes IPs, separados por vírgula
+    METRICAS_IPS_PERMITIDOS: str = "127.0.0.1,::1"
+
+    # Compressão das respostas (nível 6: quase a mesma taxa do 9 com ~1/8 da CPU)
+    GZIP_TAMANHO_MINIMO: int = 1024
+    GZIP_NIVEL: int = 6
+
+    # Escrita em massa (importadores e alocação)
+    BULK_BATCH_SIZE: int = 1000
+
+    # Importações em segundo plano (cada uma substitui a tabela inteira, então 1 por vez)
+    IMPORT_WORKERS: int = 1
+    IMPORT_CHUNK_SIZE: int = 5000
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
@@ -0,0 +1,246 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Sala, Grade, Alocacao, ExcecaoData, AlocacaoData
+from app.core.config import settings
+from app.core.matriz_score import alocar_gulosa
+from app.core.optimizer import DIAS_SEMANA, TURNOS, TIPO_CHECKIN, calcular_zonas_preferenciais, natural_sort_key
+from app.core.persistencia import inserir_em_lote
+from app.core.time import get_data_atual
+from app.core.cache_ocupacao import registrar_ouvinte_modelo
+
+TIPOS_EXCECAO = ("FECHAMENTO", "AUSENCIA", "GRADE_EXTRA")
+
+# Grade extra de uma data: entra no solver como uma grade comum, sem existir na tabela grades
+GradeExtra = namedtuple("GradeExtra", "excecao_id nome_profissional especialidade especialidade_id tipo_recurso dia_semana turno")
+
+# (dia_semana, turno) do modelo semanal alterados desde a última sincronização; None = todos.
+# Começa com tudo para um processo novo conferir os planos datados (agendar_sincronizacao no lifespan).
+_pendentes = {None}
+_lock = threading.Lock()
+# Quem refaz planos datados (sincronização em segundo plano e criação/remoção de
+# exceções) passa por aqui, um de cada vez
+_lock_resolucao = threading.RLock()
+# Sincronização do lado da escrita: uma thread, e uma execução na fila no máximo
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="horizonte")
+_agendada = False
+
+def _marcar_pendente(dia, turno):
+    with _lock: _pendentes.add(None if dia is None or turno is None else (dia, turno))
+    agendar_sincronizacao()
+
+registrar_ouvinte_modelo(_marcar_pendente)
+
+def agendar_sincronizacao():
+    """Refaz em segundo plano as datas com exceção dos turnos pendentes; as leituras nunca escrevem."""
+    global _agendada
+    with _lock:
+        if _agendada or not _pendentes: return
+        _agendada = True
+    _executor.submit(_sincronizar_em_segundo_plano)
+
+def _sincronizar_em_segundo_plano():
+    global _agendada
+    with _lock: _agendada = False
+    try:
+        with SessionLocal() as db: sincronizar_com_modelo(db)
+    except Exception as e:
+        print(f"Erro ao sincronizar o horizonte: {e}")
+
+def dia_semana(data: date) -> str:
+    return DIAS_SEMANA[data.weekday()]
+
+def _turnos_da_excecao(excecao: ExcecaoData):
+    return [excecao.turno] if excecao.turno else TURNOS
+
+def validar_excecao(db: Session, dados: dict):
+    """Confere os campos obrigatórios de cada tipo. Retorna uma mensagem de erro ou None."""
+    data, turno, tipo = dados["data"], dados.get("turno"), dados["tipo"]
+    if tipo not in TIPOS_EXCECAO: return f"Tipo inválido. Use um de: {', '.join(TIPOS_EXCECAO)}"
+    if turno is not None and turno not in TURNOS: return f"Turno inválido. Use um de: {', '.join(TURNOS)}"
+    hoje = get_data_atual()
+    if not hoje <= data < hoje + timedelta(weeks=settings.HORIZONTE_SEMANAS): return "Data fora do horizonte de planejamento"
+
+    if tipo == "FECHAMENTO" and dados.get("sala_id") and not db.get(Sala, dados["sala_id"]):
+        return "Sala não encontrada"
+    if tipo == "AUSENCIA":
+        grade = db.get(Grade, dados.get("grade_id")) if dados.get("grade_id") else None
+        if not grade: return "Grade não encontrada"
+        if grade.dia_semana != dia_semana(data) or (turno and grade.turno != turno):
+            return "A grade não atende nesta data/turno"
+    if tipo == "GRADE_EXTRA" and not (turno and dados.get("nome_profissional") and dados.get("especialidade")):
+        return "Grade extra precisa de turno, profissional e especialidade"
+    return None
+
+def resolver_turno_datado(db: Session, data: date, turno: str):
+    """
+    Refaz o plano de uma (data, turno) a partir do modelo semanal e das exceções.
+    Sem exceção, apaga o plano datado e a data volta a seguir o modelo.
+    Alocações do modelo que continuam válidas ficam na mesma sala; só as grades
+    deslocadas (sala fechada) e as extras passam pelo solver, nas salas que sobraram.
+    Não faz commit. Retorna None (segue o modelo) ou {alocadas, conflitos}.
+    """
+    db.query(AlocacaoData).filter(AlocacaoData.data == data, AlocacaoData.turno == turno).delete(synchronize_session=False)
+    excecoes = db.query(ExcecaoData).filter(
+        ExcecaoData.data == data, (ExcecaoData.turno == turno) | (ExcecaoData.turno.is_(None))
+    ).all()
+    if not excecoes: return None
+
+    fechamentos = [e for e in excecoes if e.tipo == "FECHAMENTO"]
+    if any(e.sala_id is None for e in fechamentos): return {"alocadas": 0, "conflitos": []}
+    fechadas = {e.sala_id for e in fechamentos}
+    ausentes = {e.grade_id for e in excecoes if e.tipo == "AUSENCIA"}
+    dia = dia_semana(data)
+
+    modelo = db.query(Alocacao, Grade).join(Grade, Alocacao.grade_id == Grade.id).filter(
+        Alocacao.dia_semana == dia, Alocacao.turno == turno, Grade.tipo_recurso != TIPO_CHECKIN
+    ).all()
+    mantidas = [(aloc, grade) for aloc, grade in modelo if grade.id not in ausentes and aloc.sala_id and aloc.sala_id not in fechadas]
+    com_sala = {grade.id for _, grade in mantidas}
+
+    grades = db.query(Grade).filter(Grade.dia_semana == dia, Grade.turno == turno, Grade.tipo_recurso != TIPO_CHECKIN).all()
+    pendentes = [g for g in grades if g.id not in ausentes and g.id not in com_sala]
+    pendentes += [GradeExtra(e.id, e.nome_profissional, e.especialidade, None, "EXTRA", dia, turno) for e in excecoes if e.tipo == "GRADE_EXTRA"]
+    pendentes.sort(key=lambda x: (x.especialidade_id is None, x.tipo_recurso == 'RESIDENTE', x.nome_profissional))
+
+    salas = db.query(Sala).filter(Sala.is_maintenance == False).all()
+    salas.sort(key=lambda s: (s.bloco, s.andar, natural_sort_key(s.id)))
+    zona_pref = calcular_zonas_preferenciais(salas)
+    abertas = [s for s in salas if s.id not in fechadas]
+    ocupacao = {dia: {turno: {aloc.sala_id for aloc, _ in mantidas}}}
+    alocadas, sem_sala = alocar_gulosa(pendentes, abertas, zona_pref, ocupacao)
+
+    linhas = [{"data": data, "turno": turno, "sala_id": aloc.sala_id, "grade_id": grade.id, "excecao_id": None, "score": aloc.score} for aloc, grade in mantidas]
+    for item, sala, score in alocadas:
+        extra = isinstance(item, GradeExtra)
+        linhas.append({"data": data, "turno": turno, "sala_id": sala.id, "grade_id": None if extra else item.id,
+                       "excecao_id": item.excecao_id if extra else None, "score": score})
+    inserir_em_lote(db, AlocacaoData, linhas, commit=False)
+    return {"alocadas": len(linhas), "conflitos": [{"medico": item.nome_profissional, "motivo": "Sem sala"} for item in sem_sala]}
+
+def resolver_datas(db: Session, pares: set):
+    """Refaz as (data, turno) informadas numa transação. Retorna o resultado por par."""
+    resultado = {}
+    for data, turno in sorted(pares):
+        resultado[f"{data.isoformat()}-{turno}"] = resolver_turno_datado(db, data, turno)
+    db.commit()
+    return resultado
+
+def criar_excecao(db: Session, dados: dict):
+    erro = validar_excecao(db, dados)
+    if erro: return {"erro": erro}
+    with _lock_resolucao:
+        sincronizar_com_modelo(db)
+        excecao = ExcecaoData(**dados)
+        db.add(excecao)
+        db.flush()
+        resolvidos = resolver_datas(db, {(excecao.data, t) for t in _turnos_da_excecao(excecao)})
+    return {"excecao_id": excecao.id, "resolvidos": resolvidos}
+
+def remover_excecao(db: Session, excecao_id: int):
+    excecao = db.get(ExcecaoData, excecao_id)
+    if not excecao: return {"erro": "Exceção não encontrada"}
+    with _lock_resolucao:
+        sincronizar_com_modelo(db)
+        pares = {(excecao.data, t) for t in _turnos_da_excecao(excecao)}
+        # Alocações de uma grade extra apontam para a exceção
+        db.query(AlocacaoData).filter(AlocacaoData.excecao_id == excecao_id).delete(synchronize_session=False)
+        db.delete(excecao)
+        db.flush()
+        return {"resolvidos": resolver_datas(db, pares)}
+
+def ressolver_excecoes(db: Session, buckets: set = None):
+    """Refaz só as datas futuras com exceção nos (dia_semana, turno) informados (None = todos)."""
+    excecoes = db.query(ExcecaoData.data, ExcecaoData.turno).filter(ExcecaoData.data >= get_data_atual()).distinct().all()
+    pares = set()
+    for data, turno in excecoes:
+        for t in ([turno] if turno else TURNOS):
+            if buckets is None or (dia_semana(data), t) in buckets: pares.add((data, t))
+    return resolver_datas(db, pares) if pares else {}
+
+def sincronizar_com_modelo(db: Session):
+    """
+    Toda mudança no modelo semanal (grades, salas, manutenção, alocação, troca)
+    marca o turno como pendente; aqui as datas com exceção daqueles turnos são
+    refeitas. Check-ins do portal não entram no plano datado e não marcam nada.
+    Roda só do lado da escrita: na thread de sincronização e antes de criar ou
+    remover uma exceção.
+    """
+    with _lock_resolucao:
+        with _lock:
+            pendentes = set(_pendentes)
+            _pendentes.clear()
+        if not pendentes: return {}
+        try:
+            return ressolver_excecoes(db, None if None in pendentes else pendentes)
+        except Exception:
+            with _lock: _pendentes.update(pendentes)
+            raise
+
+def listar_excecoes(db: Session, inicio: date, fim: date = None):
+    fim = fim or inicio + timedelta(weeks=settings.HORIZONTE_SEMANAS)
+    excecoes = db.query(ExcecaoData).filter(ExcecaoData.data >= inicio, ExcecaoData.data < fim).order_by(ExcecaoData.data, ExcecaoData.id).all()
+    return [{"id": e.id, "data": e.data.isoformat(), "turno": e.turno, "tipo": e.tipo, "sala_id": e.sala_id, "grade_id": e.grade_id,
+             "nome_profissional": e.nome_profissional, "especialidade": e.especialidade, "motivo": e.motivo} for e in excecoes]
+
+def resumo_horizonte(db: Session, inicio: date, semanas: int):
+    """
+    Contagem de alocações por data e turno. Custa três consultas agregadas
+    (modelo semanal, planos datados e exceções), qualquer que seja o horizonte.
+    """
+    fim = inicio + timedelta(weeks=semanas)
+    modelo = dict(((d, t), n) for d, t, n in db.query(Alocacao.dia_semana, Alocacao.turno, func.count(Alocacao.id))
+                  .join(Grade, Alocacao.grade_id == Grade.id).filter(Grade.tipo_recurso != TIPO_CHECKIN, Alocacao.sala_id.isnot(None))
+                  .group_by(Alocacao.dia_semana, Alocacao.turno).all())
+    datados = dict(((d, t), n) for d, t, n in db.query(AlocacaoData.data, AlocacaoData.turno, func.count(AlocacaoData.id))
+                   .filter(AlocacaoData.data >= inicio, AlocacaoData.data < fim).group_by(AlocacaoData.data, AlocacaoData.turno).all())
+    excecoes = defaultdict(int)
+    for data, turno, n in db.query(ExcecaoData.data, ExcecaoData.turno, func.count(ExcecaoData.id))\
+            .filter(ExcecaoData.data >= inicio, ExcecaoData.data < fim).group_by(ExcecaoData.data, ExcecaoData.turno).all():
+        for t in ([turno] if turno else TURNOS): excecoes[(data, t)] += n
+
+    datas = []
+    for i in range((fim - inicio).days):
+        data = inicio + timedelta(days=i)
+        dia = dia_semana(data)
+        turnos = {}
+        for turno in TURNOS:
+            if excecoes[(data, turno)]:
+                turnos[turno] = {"origem": "excecao", "alocacoes": datados.get((data, turno), 0), "excecoes": excecoes[(data, turno)]}
+            else:
+                turnos[turno] = {"origem": "modelo", "alocacoes": modelo.get((dia, turno), 0), "excecoes": 0}
+        datas.append({"data": data.isoformat(), "dia_semana": dia, "turnos": turnos})
+    return {"inicio": inicio.isoformat(), "fim": fim.isoformat(), "datas": datas}
+
+def alocacoes_da_data(db: Session, data: date, turno: str = None):
+    """Plano de uma data: o datado nos turnos com exceção, o modelo semanal nos demais."""
+    dia = dia_semana(data)
+    turnos = [turno] if turno else TURNOS
+    com_excecao = {t for (t,) in db.query(ExcecaoData.turno).filter(ExcecaoData.data == data).distinct().all()}
+    if None in com_excecao: com_excecao = set(TURNOS)
+
+    itens = []
+    for t in turnos:
+        if t in com_excecao:
+            linhas = db.query(AlocacaoData, Grade, ExcecaoData).outerjoin(Grade, AlocacaoData.grade_id == Grade.id)\
+                .outerjoin(ExcecaoData, AlocacaoData.excecao_id == ExcecaoData.id)\
+                .filter(AlocacaoData.data == data, AlocacaoData.turno == t).all()
+            for aloc, grade, extra in linhas:
+                origem = grade or extra
+                if origem is None: continue  # grade apagada numa reimportação
+                itens.append({"turno": t, "sala_id": aloc.sala_id, "medico": origem.nome_profissional, "especialidade": origem.especialidade,
+                              "score": aloc.score, "origem": "extra" if extra else "excecao"})
+        else:
+            linhas = db.query(Alocacao, Grade).join(Grade, Alocacao.grade_id == Grade.id)\
+                .filter(Alocacao.dia_semana == dia, Alocacao.turno == t, Grade.tipo_recurso != TIPO_CHECKIN, Alocacao.sala_id.isnot(None)).all()
+            for aloc, grade in linhas:
+                itens.append({"turno": t, "sala_id": aloc.sala_id, "medico": grade.nome_profissional, "especialidade": grade.especialidade,
+                              "score": aloc.score, "origem": "modelo"})
+    itens.sort(key=lambda x: (TURNOS.index(x["turno"]), natural_sort_key(x["sala_id"])))
+    return {"data": data.isoformat(), "dia_semana": dia, "turnos_com_excecao": sorted(com_excecao & set(turnos), key=TURNOS.index), "itens": itens}
@@ -0,0 +1,138 @@
+import numpy as np
+
+# Valor usado para esconder salas já ocupadas no argmax (abaixo de qualquer score real)
+SCORE_BLOQUEADO = np.iinfo(np.int32).min
+ESPECIALIDADES_TERREO = ("ortopedia", "traumatologia", "geriatria")
+
+def _normalizar(texto) -> str:
+    return str(texto).lower().strip() if texto else ""
+
+def _codificar(valor, tabela: dict) -> int:
+    if valor not in tabela: tabela[valor] = len(tabela)
+    return tabela[valor]
+
+def construir_matriz_score(grades, salas, zona_preferencial: dict):
+    """
+    Versão vetorizada de calcular_score para todos os pares grade x sala.
+    As grades são reduzidas a perfis (especialidade + zona alvo), então a matriz
+    tem uma linha por perfil e não por grade.
+    Retorna (matriz_perfis [n_perfis x n_salas], perfil_por_grade [n_grades]).
+    """
+    blocos, locais = {}, {}
+    prefs_salas = {}
+
+    # --- Códigos por sala ---
+    n_salas = len(salas)
+    s_esp = np.full(n_salas, -1, dtype=np.int64)
+    s_pref = np.zeros(n_salas, dtype=np.int64)
+    s_bloco = np.zeros(n_salas, dtype=np.int64)
+    s_local = np.zeros(n_salas, dtype=np.int64)
+    s_maca = np.zeros(n_salas, dtype=bool)
+    s_oftalmo = np.zeros(n_salas, dtype=bool)
+    s_terreo = np.zeros(n_salas, dtype=bool)
+    s_manutencao = np.zeros(n_salas, dtype=bool)
+
+    for j, sala in enumerate(salas):
+        pref = _normalizar(sala.especialidade_preferencial)
+        if sala.especialidade_id: s_esp[j] = sala.especialidade_id
+        s_pref[j] = _codificar(pref, prefs_salas)
+        s_bloco[j] = _codificar(sala.bloco, blocos)
+        s_local[j] = _codificar((sala.bloco, sala.andar), locais)
+        s_maca[j] = "maca" in str(sala.features).lower()
+        s_oftalmo[j] = "oftalmo" in pref
+        s_terreo[j] = str(sala.andar) == "0"
+        s_manutencao[j] = bool(sala.is_maintenance)
+
+    # --- Perfis de grade (grades com mesma especialidade pontuam igual) ---
+    perfis = {}
+    perfil_por_grade = np.zeros(len(grades), dtype=np.int64)
+    for i, grade in enumerate(grades):
+        chave_esp = grade.especialidade_id if grade.especialidade_id else grade.especialidade
+        chave = (grade.especialidade_id or None, _normalizar(grade.especialidade), chave_esp)
+        perfil_por_grade[i] = _codificar(chave, perfis)
+
+    n_perfis = len(perfis)
+    g_esp = np.full(n_perfis, -1, dtype=np.int64)
+    g_nome = np.zeros(n_perfis, dtype=np.int64)
+    g_zona_bloco = np.full(n_perfis, -1, dtype=np.int64)
+    g_zona_local = np.full(n_perfis, -1, dtype=np.int64)
+    g_oftalmo = np.zeros(n_perfis, dtype=bool)
+    g_gineco = np.zeros(n_perfis, dtype=bool)
+    g_terreo = np.zeros(n_perfis, dtype=bool)
+
+    nomes_grades = {}
+    for (esp_id, nome, chave_esp), p in perfis.items():
+        if esp_id: g_esp[p] = esp_id
+        g_nome[p] = _codificar(nome, nomes_grades)
+        zona_alvo = zona_preferencial.get(chave_esp)
+        if zona_alvo:
+            g_zona_bloco[p] = _codificar(zona_alvo[0], blocos)
+            g_zona_local[p] = _codificar(tuple(zona_alvo), locais)
+        g_oftalmo[p] = "oftalmo" in nome
+        g_gineco[p] = "ginecologia" in nome or "obstetricia" in nome
+        g_terreo[p] = any(e in nome for e in ESPECIALIDADES_TERREO)
+
+    # Substring especialidade x preferência, calculado só entre textos distintos
+    contem = np.zeros((len(nomes_grades), len(prefs_salas)), dtype=bool)
+    for nome, a in nomes_grades.items():
+        for pref, b in prefs_salas.items():
+            contem[a, b] = nome in pref
+
+    # --- Montagem da matriz (mesma ordem de regras de calcular_score) ---
+    ambos_com_id = (g_esp >= 0)[:, None] & (s_esp >= 0)[None, :]
+    score = np.where(
+        ambos_com_id,
+        np.where(g_esp[:, None] == s_esp[None, :], 2000, 0),
+        np.where(contem[g_nome][:, s_pref], 1500, 0),
+    )
+
+    zona = np.where(
+        s_local[None, :] == g_zona_local[:, None], 500,
+        np.where(s_bloco[None, :] == g_zona_bloco[:, None], 200, -100),
+    )
+    score += np.where((g_zona_local >= 0)[:, None], zona, 0)
+    score += np.where(g_terreo[:, None], np.where(s_terreo[None, :], 300, -300), 0)
+
+    score = np.where(g_gineco[:, None] & ~s_maca[None, :], -2000, score)
+    score = np.where(g_oftalmo[:, None] & ~s_oftalmo[None, :], -5000, score)
+    score = np.where(s_manutencao[None, :], -10000, score)
+
+    return score.astype(np.int32), perfil_por_grade
+
+def alocar_gulosa(grades, salas, zona_preferencial: dict, ocupacao: dict):
+    """
+    Percorre as grades na ordem recebida e escolhe a sala livre de maior score
+    via argmax mascarado. Empates ficam com a primeira sala na ordem de `salas`.
+    `ocupacao` é {dia: {turno: set(sala_id)}}; grades fora dele são ignoradas.
+    Retorna (lista de (grade, sala, score), lista de grades sem sala).
+    """
+    alocadas, sem_sala = [], []
+    if not grades or not salas:
+        return alocadas, [g for g in grades if g.dia_semana in ocupacao and g.turno in ocupacao[g.dia_semana]]
+
+    matriz, perfil_por_grade = construir_matriz_score(grades, salas, zona_preferencial)
+    indice_sala = {sala.id: j for j, sala in enumerate(salas)}
+    mascaras = {}
+
+    for i, item in enumerate(grades):
+        if item.dia_semana not in ocupacao or item.turno not in ocupacao[item.dia_semana]: continue
+        chave = (item.dia_semana, item.turno)
+        if chave not in mascaras:
+            mascara = np.zeros(len(salas), dtype=bool)
+            for sala_id in ocupacao[item.dia_semana][item.turno]:
+                if sala_id in indice_sala: mascara[indice_sala[sala_id]] = True
+            mascaras[chave] = mascara
+        ocupadas = mascaras[chave]
+
+        linha = np.where(ocupadas, SCORE_BLOQUEADO, matriz[perfil_por_grade[i]])
+        j = int(np.argmax(linha))
+        melhor_score = int(linha[j])
+
+        if melhor_score > -1000:
+            alocadas.append((item, salas[j], melhor_score))
+            ocupadas[j] = True
+            ocupacao[item.dia_semana][item.turno].add(salas[j].id)
+        else:
+            sem_sala.append(item)
+
+    return alocadas, sem_sala
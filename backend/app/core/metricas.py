@@ -0,0 +1,155 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+# Métricas do processo no formato texto do Prometheus, sem dependência externa.
+# Cada série é (nome, labels ordenados); histogramas guardam contagem por bucket.
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+_definicoes = {}   # nome -> (tipo, ajuda, buckets)
+_series = {}       # nome -> {labels: valor | [contagens, soma, total]}
+_coletores = []
+_lock = threading.Lock()
+
+def registrar_contador(nome: str, ajuda: str):
+    _definicoes[nome] = ("counter", ajuda, None)
+    _series.setdefault(nome, {})
+
+def registrar_histograma(nome: str, ajuda: str, buckets=BUCKETS_LATENCIA):
+    _definicoes[nome] = ("histogram", ajuda, tuple(buckets))
+    _series.setdefault(nome, {})
+
+def registrar_coletor(coletor):
+    """`coletor()` devolve [(nome, tipo, ajuda, [(labels, valor)])] lidos na hora da exportação (gauges)."""
+    _coletores.append(coletor)
+
+def incrementar(nome: str, valor: float = 1, **labels):
+    chave = tuple(sorted(labels.items()))
+    with _lock:
+        serie = _series[nome]
+        serie[chave] = serie.get(chave, 0) + valor
+
+def observar(nome: str, valor: float, **labels):
+    buckets = _definicoes[nome][2]
+    chave = tuple(sorted(labels.items()))
+    with _lock:
+        serie = _series[nome]
+        estado = serie.get(chave)
+        if estado is None: estado = serie[chave] = [[0] * len(buckets), 0.0, 0]
+        i = bisect.bisect_left(buckets, valor)
+        if i < len(buckets): estado[0][i] += 1
+        estado[1] += valor
+        estado[2] += 1
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pares) -> str:
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}" if pares else ""
+
+def _numero(valor) -> str:
+    if valor == float("inf"): return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def exportar() -> str:
+    linhas = []
+    with _lock:
+        copia = {nome: {k: (v if not isinstance(v, list) else [list(v[0]), v[1], v[2]]) for k, v in serie.items()} for nome, serie in _series.items()}
+    for nome, (tipo, ajuda, buckets) in _definicoes.items():
+        linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+        for chave, valor in sorted(copia[nome].items()):
+            if tipo == "counter":
+                linhas.append(f"{nome}{_labels(chave)} {_numero(valor)}")
+                continue
+            contagens, soma, total = valor
+            acumulado = 0
+            for limite, n in zip(buckets, contagens):
+                acumulado += n
+                linhas.append(f"{nome}_bucket{_labels(chave + (('le', _numero(limite)),))} {acumulado}")
+            linhas.append(f"{nome}_bucket{_labels(chave + (('le', '+Inf'),))} {total}")
+            linhas.append(f"{nome}_sum{_labels(chave)} {_numero(soma)}")
+            linhas.append(f"{nome}_count{_labels(chave)} {total}")
+    for coletor in _coletores:
+        for nome, tipo, ajuda, amostras in coletor():
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+            linhas += [f"{nome}{_labels(tuple(sorted(labels.items())))} {_numero(valor)}" for labels, valor in amostras]
+    return "\n".join(linhas) + "\n"
+
+# --- Métricas da aplicação ---
+registrar_histograma("gds_http_requisicao_segundos", "Latência das requisições HTTP por rota")
+registrar_histograma("gds_http_consultas_sql", "Consultas SQL por requisição HTTP", BUCKETS_CONSULTAS)
+registrar_histograma("gds_http_sql_segundos", "Tempo em SQL por requisição HTTP")
+registrar_contador("gds_sql_consultas_total", "Consultas SQL executadas, por engine")
+registrar_contador("gds_sql_segundos_total", "Tempo total em SQL, por engine")
+registrar_histograma("gds_otimizador_fase_segundos", "Duração de cada fase do otimizador")
+
+# Acumulador [consultas, segundos] da requisição em andamento (None fora de requisições).
+# O threadpool e o run_sync herdam o contexto, então endpoints síncronos também contam.
+_sql_requisicao = ContextVar("sql_requisicao", default=None)
+
+def registrar_consulta(engine: str, segundos: float):
+    """Chamado pelos eventos de cursor da engine (app/database.py) a cada statement."""
+    incrementar("gds_sql_consultas_total", engine=engine)
+    incrementar("gds_sql_segundos_total", segundos, engine=engine)
+    acumulador = _sql_requisicao.get()
+    if acumulador is not None:
+        acumulador[0] += 1
+        acumulador[1] += segundos
+
+class MedicaoRequisicoes:
+    """
+    Middleware ASGI: latência por rota (o template, ex: /api/salas/{sala_id}, não
+    a URL) e consultas/tempo de SQL por requisição. Também devolve o cabeçalho
+    Server-Timing para inspeção no navegador.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        acumulador = [0, 0.0]
+        token = _sql_requisicao.set(acumulador)
+        inicio = time.perf_counter()
+        status = [500]
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status[0] = mensagem["status"]
+                timing = f'sql;dur={acumulador[1] * 1000:.1f};desc="{acumulador[0]} consultas", total;dur={(time.perf_counter() - inicio) * 1000:.1f}'
+                mensagem["headers"] = list(mensagem.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _sql_requisicao.reset(token)
+            rota = scope.get("route")
+            labels = {"metodo": scope["method"], "rota": getattr(rota, "path", "nao_mapeada")}
+            observar("gds_http_requisicao_segundos", time.perf_counter() - inicio, status=str(status[0]), **labels)
+            observar("gds_http_consultas_sql", acumulador[0], **labels)
+            observar("gds_http_sql_segundos", acumulador[1], **labels)
+
+class Fases:
+    """Cronômetro de fases: `with fases("escrita"): ...`; `.ms` vai nas estatísticas e cada fase no histograma."""
+    def __init__(self, operacao: str, **labels):
+        self.operacao = operacao
+        self.labels = labels
+        self.ms = {}
+
+    def __call__(self, fase: str):
+        return _Fase(self, fase)
+
+class _Fase:
+    def __init__(self, fases: Fases, nome: str):
+        self.fases, self.nome = fases, nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        self.fases.ms[self.nome] = round(self.fases.ms.get(self.nome, 0) + segundos * 1000, 2)
+        observar("gds_otimizador_fase_segundos", segundos, operacao=self.fases.operacao, fase=self.nome, **self.fases.labels)
@@ -1,8 +1,29 @@
+from sqlalchemy import func, and_, or_, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models import Sala, Grade, Alocacao, Especialidade
 from collections import defaultdict
 from app.core.time import get_horario_atual
+from app.core.matriz_score import alocar_gulosa
+from app.core.atribuicao import alocar_otima
+from app.core.busca_local import melhorar_alocacao
+from app.core.config import settings
+from app.core.persistencia import inserir_em_lote
+from app.core.cache_ocupacao import obter_snapshot, obter_snapshot_async, invalidar_ocupacao
+from app.core.ranking_salas import IndiceRanking, obter_indice
+from app.core.metricas import Fases
+from app.database import AsyncSessionLocal
 import re
+import time
+
+MODOS_SOLVER = ("guloso", "otimo")
+DIAS_SEMANA = ["SEG", "TER", "QUA", "QUI", "SEX", "SAB", "DOM"]
+TURNOS = ["MANHA", "TARDE", "NOITE"]
+
+# Alocações fixadas: trocas manuais e check-ins do portal não são refeitos pela realocação incremental
+SCORE_TROCA_MANUAL = 5000
+SCORE_CHECKIN = 2000
+TIPO_CHECKIN = "CHECKIN_APP"
 
 def natural_sort_key(s):
     return [int(text) if text.isdigit() else text.lower()
@@ -37,95 +58,232 @@ def calcular_score(grade: Grade, sala: Sala, zona_preferencial: dict) -> int:
         else: score -= 300
     return score
 
-def gerar_alocacao_grade(db: Session):
-    db.query(Alocacao).delete()
-    grades = db.query(Grade).all()
-    grades.sort(key=lambda x: (x.especialidade_id is None, x.tipo_recurso == 'RESIDENTE', x.nome_profissional))
-    salas = db.query(Sala).filter(Sala.is_maintenance == False).all()
-    salas.sort(key=lambda s: (s.bloco, s.andar, natural_sort_key(s.id)))
-    
+def calcular_zonas_preferenciais(salas) -> dict:
+    """Mapeia cada especialidade para o (bloco, andar) onde ela tem mais salas."""
     mapa_zonas = defaultdict(lambda: defaultdict(int))
     for sala in salas:
         chave = (sala.bloco, sala.andar)
         esp = sala.especialidade_id if sala.especialidade_id else sala.especialidade_preferencial
         if esp: mapa_zonas[esp][chave] += 1
-            
-    zona_pref = {k: max(v.items(), key=lambda x: x[1])[0] for k, v in mapa_zonas.items() if v}
-    ocupacao = {d: {t: set() for t in ["MANHA", "TARDE", "NOITE"]} for d in ["SEG", "TER", "QUA", "QUI", "SEX", "SAB", "DOM"]}
-    conflitos = []
-
-    for item in grades:
-        if item.dia_semana not in ocupacao or item.turno not in ocupacao[item.dia_semana]: continue
-        ocupadas = ocupacao[item.dia_semana][item.turno]
-        melhor_sala = None
-        melhor_score = -9999
-        
-        for sala in salas:
-            if sala.id in ocupadas: continue
-            score = calcular_score(item, sala, zona_pref)
-            if score > melhor_score:
-                melhor_score = score
-                melhor_sala = sala
-        
-        if melhor_sala and melhor_score > -1000:
-            db.add(Alocacao(sala_id=melhor_sala.id, grade_id=item.id, dia_semana=item.dia_semana, turno=item.turno, score=melhor_score))
-            ocupadas.add(melhor_sala.id)
+    return {k: max(v.items(), key=lambda x: x[1])[0] for k, v in mapa_zonas.items() if v}
+
+def gerar_alocacao_grade(db: Session, modo: str = "guloso", busca_local_s: float = None):
+    fases = Fases("gerar", modo=modo)
+    with fases("limpeza"):
+        db.query(Alocacao).delete()
+    with fases("carga"):
+        grades = db.query(Grade).all()
+        grades.sort(key=lambda x: (x.especialidade_id is None, x.tipo_recurso == 'RESIDENTE', x.nome_profissional))
+        salas = db.query(Sala).filter(Sala.is_maintenance == False).all()
+        salas.sort(key=lambda s: (s.bloco, s.andar, natural_sort_key(s.id)))
+    
+    zona_pref = calcular_zonas_preferenciais(salas)
+    ocupacao = {d: {t: set() for t in TURNOS} for d in DIAS_SEMANA}
+
+    # Scores pré-calculados numa matriz grade x sala (ver matriz_score.py)
+    buckets = None
+    with fases("solver"):
+        if modo == "otimo":
+            alocadas, sem_sala, buckets = alocar_otima(grades, salas, zona_pref, ocupacao)
         else:
-            conflitos.append({"medico": item.nome_profissional, "motivo": "Sem sala"})
-            
-    db.commit()
-    return {"resumo_ambulatorios": obter_resumo_atual(db), "conflitos": conflitos}
+            alocadas, sem_sala = alocar_gulosa(grades, salas, zona_pref, ocupacao)
+
+    # Pós-processamento opcional: trocas/realocações dentro de cada (dia, turno) até o orçamento acabar
+    busca_local = None
+    orcamento = settings.BUSCA_LOCAL_SEGUNDOS if busca_local_s is None else busca_local_s
+    if orcamento > 0:
+        with fases("busca_local"):
+            alocadas, sem_sala, busca_local = melhorar_alocacao(salas, zona_pref, alocadas, sem_sala, orcamento)
+
+    with fases("escrita"):
+        linhas = [{"sala_id": sala.id, "grade_id": item.id, "dia_semana": item.dia_semana, "turno": item.turno, "score": score} for item, sala, score in alocadas]
+        escrita = inserir_em_lote(db, Alocacao, linhas)
+    invalidar_ocupacao()
+    with fases("resumo"):
+        resumo = obter_resumo_atual(db)
+    conflitos = [{"medico": item.nome_profissional, "motivo": "Sem sala"} for item in sem_sala]
+    estatisticas = {
+        "modo": modo,
+        "score_total": sum(score for _, _, score in alocadas),
+        "total_alocadas": len(alocadas),
+        "total_conflitos": len(conflitos),
+        "tempo_solver_ms": fases.ms["solver"],
+        "fases_ms": fases.ms,
+        "escrita": escrita,
+        "buckets": buckets,
+        "busca_local": busca_local
+    }
+    return {"resumo_ambulatorios": resumo, "conflitos": conflitos, "estatisticas": estatisticas}
+
+def is_alocacao_fixa(score, tipo_recurso) -> bool:
+    return (score or 0) >= SCORE_TROCA_MANUAL or tipo_recurso == TIPO_CHECKIN
+
+def buckets_afetados_por_salas(db: Session, sala_ids: list, em_manutencao: bool) -> set:
+    """
+    Sala entrando em manutenção: só importam os turnos em que ela está alocada.
+    Sala voltando ao uso: só importam os turnos que têm grades sem sala.
+    """
+    if em_manutencao:
+        linhas = db.query(Alocacao.dia_semana, Alocacao.turno).filter(Alocacao.sala_id.in_(sala_ids)).distinct().all()
+        return {(d, t) for d, t in linhas}
+
+    # Sem plano gerado não há o que encaixar
+    if db.query(Alocacao.id).first() is None: return set()
+    alocadas = db.query(Alocacao.grade_id)
+    linhas = db.query(Grade.dia_semana, Grade.turno).filter(~Grade.id.in_(alocadas)).distinct().all()
+    return {(d, t) for d, t in linhas}
+
+def realocar_buckets(db: Session, buckets: set, modo: str = "guloso"):
+    """
+    Realocação incremental: refaz apenas os (dia, turno) informados.
+    Alocações fixadas (troca manual / check-in) ficam onde estão e ocupam suas salas,
+    exceto as que estão numa sala em manutenção: essas são as primeiras a receber sala
+    nova (ou aparecem nos conflitos).
+    """
+    buckets = {(d, t) for d, t in buckets if d in DIAS_SEMANA and t in TURNOS}
+    if not buckets: return {"buckets": [], "realocadas": 0, "conflitos": []}
+
+    fases = Fases("realocar", modo=modo)
+    ocupacao = {}
+    for dia, turno in buckets: ocupacao.setdefault(dia, {})[turno] = set()
+    todas_salas = db.query(Sala).all()
+    em_manutencao = {s.id for s in todas_salas if s.is_maintenance}
+
+    # Uma consulta para todos os turnos: alocações atuais com o tipo da grade
+    existentes = db.query(Alocacao.id, Alocacao.sala_id, Alocacao.score, Alocacao.dia_semana, Alocacao.turno, Alocacao.grade_id, Grade.tipo_recurso)\
+        .join(Grade, Alocacao.grade_id == Grade.id)\
+        .filter(tuple_(Alocacao.dia_semana, Alocacao.turno).in_(list(buckets))).all()
+    fixas_grade_ids, deslocadas_ids, descartar = set(), set(), []
+    for aloc in existentes:
+        fixa = is_alocacao_fixa(aloc.score, aloc.tipo_recurso)
+        if fixa and aloc.sala_id not in em_manutencao:
+            ocupacao[aloc.dia_semana][aloc.turno].add(aloc.sala_id)
+            fixas_grade_ids.add(aloc.grade_id)
+        else:
+            # Fixada numa sala que entrou em manutenção deixa de ser fixa: volta ao solver, na frente
+            if fixa: deslocadas_ids.add(aloc.grade_id)
+            descartar.append(aloc.id)
+    if descartar:
+        db.query(Alocacao).filter(Alocacao.id.in_(descartar)).delete(synchronize_session=False)
+
+    # Check-ins sem alocação (check-out já feito) não voltam para uma sala
+    grades = db.query(Grade).filter(
+        tuple_(Grade.dia_semana, Grade.turno).in_(list(buckets)),
+        or_(Grade.tipo_recurso.is_(None), Grade.tipo_recurso != TIPO_CHECKIN, Grade.id.in_(deslocadas_ids))
+    ).all()
+    grades = [g for g in grades if g.id not in fixas_grade_ids]
+    grades.sort(key=lambda x: (x.id not in deslocadas_ids, x.especialidade_id is None, x.tipo_recurso == 'RESIDENTE', x.nome_profissional))
+    salas = [s for s in todas_salas if not s.is_maintenance]
+    salas.sort(key=lambda s: (s.bloco, s.andar, natural_sort_key(s.id)))
+    zona_pref = calcular_zonas_preferenciais(salas)
+
+    with fases("solver"):
+        if modo == "otimo":
+            alocadas, sem_sala, _ = alocar_otima(grades, salas, zona_pref, ocupacao)
+        else:
+            alocadas, sem_sala = alocar_gulosa(grades, salas, zona_pref, ocupacao)
+
+    with fases("escrita"):
+        linhas = [{"sala_id": sala.id, "grade_id": item.id, "dia_semana": item.dia_semana, "turno": item.turno, "score": score} for item, sala, score in alocadas]
+        escrita = inserir_em_lote(db, Alocacao, linhas)
+    for dia, turno in buckets: invalidar_ocupacao(dia, turno)
+    return {
+        "buckets": sorted(f"{d}-{t}" for d, t in buckets),
+        "realocadas": len(alocadas),
+        "escrita": escrita,
+        "fases_ms": fases.ms,
+        "conflitos": [{"medico": item.nome_profissional, "motivo": "Sem sala"} for item in sem_sala]
+    }
+
+def _consulta_alocacoes(db: Session, *colunas):
+    return db.query(*colunas).select_from(Alocacao)\
+        .join(Sala, Alocacao.sala_id == Sala.id)\
+        .join(Grade, Alocacao.grade_id == Grade.id)\
+        .outerjoin(Especialidade, Grade.especialidade_id == Especialidade.id)
+
+def _nome_ambulatorio():
+    return func.coalesce(Especialidade.nome, Grade.especialidade)
 
 def obter_resumo_atual(db: Session):
-    dados = db.query(Alocacao, Sala, Grade, Especialidade).join(Sala, Alocacao.sala_id == Sala.id).join(Grade, Alocacao.grade_id == Grade.id).outerjoin(Especialidade, Grade.especialidade_id == Especialidade.id).all()
-    agrupamento = defaultdict(lambda: {"salas_unicas": set(), "locais": set(), "detalhes": []})
-    for aloc, sala, grade, esp_obj in dados:
-        nome = esp_obj.nome if esp_obj else grade.especialidade
-        agrupamento[nome]['salas_unicas'].add(sala.nome_visual)
-        agrupamento[nome]['locais'].add(f"Bloco {sala.bloco} - {sala.andar}")
-        agrupamento[nome]['detalhes'].append({"alocacao_id": aloc.id, "medico": grade.nome_profissional, "sala": sala.nome_visual, "dia": grade.dia_semana, "turno": grade.turno, "score": aloc.score})
-    
+    """Resumo por ambulatório agregado no banco; os detalhes por profissional ficam em listar_detalhes_alocacao."""
+    nome = _nome_ambulatorio().label("nome")
+    contagens = _consulta_alocacoes(db, nome, func.count(func.distinct(Sala.nome_visual)), func.count(Alocacao.id)).group_by(nome).all()
+    locais = _consulta_alocacoes(db, nome, Sala.bloco, Sala.andar).distinct().all()
+    salas = _consulta_alocacoes(db, nome, Sala.nome_visual).distinct().all()
+
+    agrupamento = defaultdict(lambda: {"locais": [], "salas": []})
+    for esp, bloco, andar in locais: agrupamento[esp]['locais'].append(f"Bloco {bloco} - {andar}")
+    for esp, sala in salas: agrupamento[esp]['salas'].append(sala)
+
     resumo = []
-    for nome, info in agrupamento.items():
-        resumo.append({"ambulatorio": nome, "total_salas": len(info['salas_unicas']), "localizacao": sorted(list(info['locais'])), "lista_salas": sorted(list(info['salas_unicas']), key=natural_sort_key), "detalhes": info['detalhes']})
+    for esp, total_salas, total_alocacoes in contagens:
+        info = agrupamento[esp]
+        resumo.append({"ambulatorio": esp, "total_salas": total_salas, "total_alocacoes": total_alocacoes, "localizacao": sorted(info['locais']), "lista_salas": sorted(info['salas'], key=natural_sort_key)})
     resumo.sort(key=lambda x: x['total_salas'], reverse=True)
     return resumo
 
-def listar_opcoes_troca(alocacao_id: int, db: Session):
+def listar_detalhes_alocacao(db: Session, especialidade: str = None, dia: str = None, turno: str = None, limit: int = 50, offset: int = 0):
+    """Alocações por profissional, paginadas e filtradas por ambulatório / dia / turno."""
+    consulta = _consulta_alocacoes(db, Alocacao.id, Alocacao.score, Grade.nome_profissional, Grade.dia_semana, Grade.turno, Sala.nome_visual)
+    if especialidade: consulta = consulta.filter(_nome_ambulatorio() == especialidade)
+    if dia: consulta = consulta.filter(Alocacao.dia_semana == dia)
+    if turno: consulta = consulta.filter(Alocacao.turno == turno)
+
+    total = consulta.count()
+    linhas = consulta.order_by(Alocacao.id).offset(offset).limit(limit).all()
+    itens = [{"alocacao_id": aloc_id, "medico": medico, "sala": sala, "dia": dia_grade, "turno": turno_grade, "score": score} for aloc_id, score, medico, dia_grade, turno_grade, sala in linhas]
+    return {"total": total, "limit": limit, "offset": offset, "itens": itens}
+
+def montar_indice_ranking(db: Session) -> IndiceRanking:
+    """Índice de ranking com as mesmas salas, ordem e zonas de gerar_alocacao_grade."""
+    salas = db.query(Sala).filter(Sala.is_maintenance == False).all()
+    salas.sort(key=lambda s: (s.bloco, s.andar, natural_sort_key(s.id)))
+    perfis = db.query(Grade.especialidade_id, Grade.especialidade).distinct().all()
+    return IndiceRanking(salas, calcular_zonas_preferenciais(salas), perfis)
+
+def listar_opcoes_troca(alocacao_id: int, db: Session, limit: int = None, bloco: str = None, andar: str = None, somente_livres: bool = False):
+    """
+    Top-K salas para a troca, vindas do índice de ranking (ranking_salas.py) e
+    cruzadas com a ocupação do turno da alocação. Livres primeiro, depois
+    ocupadas, cada grupo por score decrescente.
+    """
     aloc_origem = db.query(Alocacao).filter(Alocacao.id == alocacao_id).first()
     if not aloc_origem: return []
     
     grade_origem = db.query(Grade).filter(Grade.id == aloc_origem.grade_id).first()
+    indice = obter_indice(lambda: montar_indice_ranking(db))
     
-    ocupacoes_concorrentes = db.query(Alocacao, Grade).join(Grade).filter(
+    ocupacoes_concorrentes = db.query(Alocacao.sala_id, Grade.nome_profissional).join(Grade).filter(
         Alocacao.dia_semana == aloc_origem.dia_semana,
         Alocacao.turno == aloc_origem.turno
     ).all()
+    mapa_ocupacao = dict(ocupacoes_concorrentes)
     
-    mapa_ocupacao = {a.sala_id: g.nome_profissional for a, g in ocupacoes_concorrentes}
-    todas_salas = db.query(Sala).filter(Sala.is_maintenance == False).all()
-    
-    opcoes = []
-    for sala in todas_salas:
+    livres, ocupadas = [], []
+    for sala, score in indice.candidatos(grade_origem, bloco, andar):
         ocupante = mapa_ocupacao.get(sala.id)
         is_atual = (sala.id == aloc_origem.sala_id)
-        score = calcular_score(grade_origem, sala, {}) 
+        ocupada = bool(ocupante) and not is_atual
+        if ocupada and (somente_livres or (limit and len(ocupadas) >= limit)): continue
+        
         status = "LIVRE"
         if is_atual: status = "ATUAL"
         elif ocupante: status = f"OCUPADA ({ocupante})"
         
-        opcoes.append({
+        (ocupadas if ocupada else livres).append({
             "sala_id": sala.id,
             "nome": sala.nome_visual,
             "score": score,
             "recomendado": score > 0,
             "status": status,
-            "ocupada": bool(ocupante) and not is_atual,
+            "ocupada": ocupada,
             "ocupante_nome": ocupante if not is_atual else None
         })
+        # Candidatos vêm em ordem de score: com K livres o resto não entra mais
+        if limit and len(livres) >= limit: break
             
-    opcoes.sort(key=lambda x: (not x['ocupada'], x['recomendado'], x['score']), reverse=True)
-    return opcoes
+    opcoes = livres + ocupadas
+    return opcoes[:limit] if limit else opcoes
 
 def aplicar_troca_manual(alocacao_id: int, nova_sala_id: str, forcar: bool, db: Session):
     aloc_origem = db.query(Alocacao).filter(Alocacao.id == alocacao_id).first()
@@ -146,23 +304,113 @@ def aplicar_troca_manual(alocacao_id: int, nova_sala_id: str, forcar: bool, db:
         if not forcar:
             return {"sucesso": False, "motivo": "Sala ocupada"}
         else:
-            aloc_destino.sala_id = sala_anterior_id
-            aloc_destino.score = 5000
-            db.add(aloc_destino)
+            # (sala, dia, turno) é único: libera a sala destino antes de trocar
+            aloc_destino.sala_id = None
+            db.flush()
             
     # Move o profissional origem para a nova sala
     aloc_origem.sala_id = nova_sala_id
-    aloc_origem.score = 5000 
+    aloc_origem.score = SCORE_TROCA_MANUAL
+    if aloc_destino:
+        db.flush()
+        aloc_destino.sala_id = sala_anterior_id
+        aloc_destino.score = SCORE_TROCA_MANUAL
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Outra requisição ocupou a sala entre a checagem e o commit
+        db.rollback()
+        return {"sucesso": False, "motivo": "Sala ocupada"}
+    invalidar_ocupacao(aloc_origem.dia_semana, aloc_origem.turno)
     return {"sucesso": True}
 
+def aplicar_movimentos_em_lote(movimentos: list, db: Session):
+    """
+    Aplica vários (alocacao_id, nova_sala_id) numa única transação.
+    Tudo é validado contra a ocupação final do turno antes de escrever: se
+    qualquer movimento falhar, nada é aplicado e volta um erro por movimento.
+    Cadeias (A->B, B->C) são aplicadas na ordem certa e rotações (A->B->C->A)
+    estacionam uma alocação sem sala até a vaga abrir, respeitando o índice
+    único (sala, dia, turno) a cada flush.
+    """
+    ids = [aloc_id for aloc_id, _ in movimentos]
+    alocacoes = {a.id: a for a in db.query(Alocacao).filter(Alocacao.id.in_(ids)).all()}
+    salas = {s.id: s for s in db.query(Sala).filter(Sala.id.in_({sala_id for _, sala_id in movimentos})).all()}
+
+    erros, validos, vistos = [], [], set()
+    def erro(i, aloc_id, sala_id, motivo):
+        erros.append({"indice": i, "alocacao_id": aloc_id, "nova_sala_id": sala_id, "motivo": motivo})
+
+    for i, (aloc_id, sala_id) in enumerate(movimentos):
+        aloc, sala = alocacoes.get(aloc_id), salas.get(sala_id)
+        if aloc_id in vistos: erro(i, aloc_id, sala_id, "Alocação repetida no lote"); continue
+        vistos.add(aloc_id)
+        if not aloc: erro(i, aloc_id, sala_id, "Alocação não encontrada"); continue
+        if not sala: erro(i, aloc_id, sala_id, "Sala não encontrada"); continue
+        if sala.is_maintenance: erro(i, aloc_id, sala_id, "Sala em manutenção"); continue
+        validos.append((i, aloc, sala_id))
+
+    # Ocupação atual dos turnos envolvidos: (sala, dia, turno) -> (alocacao_id, profissional)
+    turnos = {(aloc.dia_semana, aloc.turno) for _, aloc, _ in validos}
+    ocupacao = {}
+    if turnos:
+        filtro = or_(*(and_(Alocacao.dia_semana == dia, Alocacao.turno == turno) for dia, turno in turnos))
+        for aloc_id, sala_id, dia, turno, nome in db.query(Alocacao.id, Alocacao.sala_id, Alocacao.dia_semana, Alocacao.turno, Grade.nome_profissional)\
+                .join(Grade, Alocacao.grade_id == Grade.id).filter(filtro, Alocacao.sala_id.isnot(None)).all():
+            ocupacao[(sala_id, dia, turno)] = (aloc_id, nome)
+
+    # Estado final: quem se move libera a sala de origem; cada destino só pode ter um dono
+    saindo = {aloc.id for _, aloc, _ in validos}
+    destinos = {}
+    for i, aloc, sala_id in validos:
+        chave = (sala_id, aloc.dia_semana, aloc.turno)
+        atual = ocupacao.get(chave)
+        if chave in destinos:
+            erro(i, aloc.id, sala_id, f"Sala destino repetida no lote (movimento {destinos[chave]})")
+        elif atual and atual[0] != aloc.id and atual[0] not in saindo:
+            erro(i, aloc.id, sala_id, f"Sala ocupada ({atual[1]})")
+        else:
+            destinos[chave] = i
+
+    if erros: return {"sucesso": False, "erros": sorted(erros, key=lambda e: e["indice"])}
+
+    # Aplicação por turno: primeiro quem tem destino livre; se só sobrar rotação, estaciona um
+    pendentes = defaultdict(dict)
+    for _, aloc, sala_id in validos:
+        if aloc.sala_id != sala_id: pendentes[(aloc.dia_semana, aloc.turno)][aloc.id] = (aloc, sala_id)
+
+    movidas, ciclos = 0, 0
+    try:
+        for (dia, turno), fila in pendentes.items():
+            ocupante = {sala_id: aloc_id for (sala_id, d, t), (aloc_id, _) in ocupacao.items() if (d, t) == (dia, turno)}
+            while fila:
+                prontos = [(aloc, sala_id) for aloc, sala_id in fila.values() if sala_id not in ocupante]
+                if not prontos:
+                    aloc, _ = next(iter(fila.values()))
+                    del ocupante[aloc.sala_id]
+                    aloc.sala_id = None
+                    db.flush()
+                    ciclos += 1
+                    continue
+                for aloc, sala_id in prontos:
+                    if aloc.sala_id is not None: del ocupante[aloc.sala_id]
+                    aloc.sala_id = sala_id
+                    aloc.score = SCORE_TROCA_MANUAL
+                    ocupante[sala_id] = aloc.id
+                    del fila[aloc.id]
+                    movidas += 1
+                db.flush()
+        db.commit()
+    except IntegrityError:
+        # Outra requisição mexeu nas salas entre a validação e a escrita
+        db.rollback()
+        return {"sucesso": False, "erros": [{"indice": None, "alocacao_id": None, "nova_sala_id": None, "motivo": "Ocupação mudou durante a troca, tente novamente"}]}
+    for dia, turno in pendentes: invalidar_ocupacao(dia, turno)
+    return {"sucesso": True, "movidas": movidas, "ciclos_resolvidos": ciclos}
+
 # função de monitoramento
-def obter_dashboard_tempo_real(db: Session):
-    tempo = get_horario_atual()
-    dia = tempo['dia']
-    turno = tempo['turno']
-    
+def montar_ocupacao(db: Session, dia: str, turno: str):
     salas = db.query(Sala).all()
     
     # Busca alocações APENAS do momento atual
@@ -201,7 +449,38 @@ def obter_dashboard_tempo_real(db: Session):
         })
         
     return {
-        "tempo": tempo,
         "estatisticas": stats,
         "salas": sorted(resultado, key=lambda x: natural_sort_key(x['sala_id']))
-    }
\ No newline at end of file
+    }
+
+def obter_dashboard_tempo_real(db: Session):
+    tempo = get_horario_atual()
+    dia = tempo['dia']
+    turno = tempo['turno']
+
+    # Servido do snapshot em memória; o banco só é consultado após uma invalidação
+    snapshot = obter_snapshot((dia, turno), lambda: montar_ocupacao(db, dia, turno))
+    return {
+        "tempo": tempo,
+        "estatisticas": snapshot["estatisticas"],
+        "salas": snapshot["salas"],
+        "versao": snapshot["versao"]
+    }
+
+async def obter_dashboard_tempo_real_async():
+    """Mesmo retorno de obter_dashboard_tempo_real, para endpoints async (sessão própria só na montagem)."""
+    tempo = get_horario_atual()
+    dia = tempo['dia']
+    turno = tempo['turno']
+
+    async def montar():
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(montar_ocupacao, dia, turno)
+
+    snapshot = await obter_snapshot_async((dia, turno), montar)
+    return {
+        "tempo": tempo,
+        "estatisticas": snapshot["estatisticas"],
+        "salas": snapshot["salas"],
+        "versao": snapshot["versao"]
+    }
@@ -0,0 +1,21 @@
+import time
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+def inserir_em_lote(db: Session, modelo, linhas: list, tamanho_lote: int = None, commit: bool = True) -> dict:
+    """
+    Escrita em massa compartilhada por importadores e otimizador.
+    Usa INSERT do Core com executemany em lotes, tudo na transação corrente da
+    sessão (inclusive deletes feitos antes pelo chamador).
+    `linhas` são dicts coluna -> valor. Retorna linhas escritas, lotes e tempo.
+    """
+    tamanho_lote = tamanho_lote or settings.BULK_BATCH_SIZE
+    inicio = time.perf_counter()
+    tabela = modelo.__table__
+    lotes = 0
+    for i in range(0, len(linhas), tamanho_lote):
+        db.execute(insert(tabela), linhas[i:i + tamanho_lote])
+        lotes += 1
+    if commit: db.commit()
+    return {"linhas": len(linhas), "lotes": lotes, "tempo_ms": round((time.perf_counter() - inicio) * 1000, 2)}
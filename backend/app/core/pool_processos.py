@@ -0,0 +1,44 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import settings
+
+# Pool único de processos (solver ótimo por bucket e simulação de cenários), criado
+# no lifespan da API e reaproveitado por todas as requisições. forkserver: os
+# processos saem de um servidor limpo, sem herdar as threads e os locks do processo
+# da API (publicador SSE, agendador de turnos, caches), o que um fork a partir de
+# uma thread do uvicorn poderia deixar travados.
+_pool = None
+_lock = threading.Lock()
+
+def tamanho_pool() -> int:
+    return max(1, settings.POOL_PROCESSOS or os.cpu_count() or 1)
+
+def iniciar_pool() -> ProcessPoolExecutor:
+    """Chamado no lifespan; fora da API (benchmarks, scripts) o pool nasce no primeiro uso."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            contexto = multiprocessing.get_context("forkserver")
+            # Módulos importados uma vez no servidor e herdados por todos os processos
+            contexto.set_forkserver_preload(["app.core.atribuicao", "app.core.cenarios"])
+            _pool = ProcessPoolExecutor(max_workers=tamanho_pool(), mp_context=contexto)
+            # Sobe os processos já (um por tarefa enviada), fora do caminho da primeira requisição
+            for _ in range(tamanho_pool()): _pool.submit(int)
+        return _pool
+
+def obter_pool() -> ProcessPoolExecutor:
+    global _pool
+    # Um processo que morreu (ex: sem memória) quebra o pool inteiro: troca por um novo
+    if _pool is not None and _pool._broken:
+        with _lock: antigo, _pool = _pool, None
+        antigo.shutdown(wait=False, cancel_futures=True)
+    return _pool or iniciar_pool()
+
+def encerrar_pool():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None: pool.shutdown(wait=True, cancel_futures=True)
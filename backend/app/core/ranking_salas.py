@@ -0,0 +1,77 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from app.core.matriz_score import construir_matriz_score, _normalizar
+from app.core.cache_ocupacao import registrar_ouvinte
+
+# Cópia só com o que o score usa, para o índice sobreviver à sessão que o montou
+SalaRanking = namedtuple("SalaRanking", "id nome_visual bloco andar especialidade_id especialidade_preferencial features is_maintenance")
+PerfilGrade = namedtuple("PerfilGrade", "especialidade_id especialidade dia_semana turno")
+
+def chave_perfil(grade):
+    """Mesma chave de perfil de construir_matriz_score: grades com a mesma chave pontuam igual."""
+    chave_esp = grade.especialidade_id if grade.especialidade_id else grade.especialidade
+    return (grade.especialidade_id or None, _normalizar(grade.especialidade), chave_esp)
+
+class IndiceRanking:
+    """
+    Ranking de salas por perfil de especialidade (score decrescente, já com o
+    bônus de zona de gerar_alocacao_grade). Os perfis conhecidos são calculados
+    na montagem; um perfil novo é calculado na primeira consulta e guardado.
+    """
+    def __init__(self, salas, zona_preferencial: dict, perfis=()):
+        self.salas = [SalaRanking(s.id, s.nome_visual, s.bloco, s.andar, s.especialidade_id, s.especialidade_preferencial, s.features, s.is_maintenance) for s in salas]
+        self.zona_preferencial = zona_preferencial
+        self._rankings = {}
+        self._lock = threading.Lock()
+        self._calcular([PerfilGrade(esp_id, esp, None, None) for esp_id, esp in perfis])
+
+    def _calcular(self, grades):
+        grades = [g for g in grades if chave_perfil(g) not in self._rankings]
+        if not grades or not self.salas: return
+        matriz, perfil_por_grade = construir_matriz_score(grades, self.salas, self.zona_preferencial)
+        for grade, p in zip(grades, perfil_por_grade.tolist()):
+            scores = matriz[p]
+            # Estável: empates seguem a ordem das salas (bloco, andar, número)
+            self._rankings[chave_perfil(grade)] = (np.argsort(-scores.astype(np.int64), kind="stable"), scores)
+
+    def candidatos(self, grade, bloco: str = None, andar: str = None):
+        """Itera (sala, score) do melhor para o pior score, opcionalmente só num bloco/andar."""
+        chave = chave_perfil(grade)
+        if chave not in self._rankings:
+            with self._lock: self._calcular([grade])
+        if chave not in self._rankings: return  # nenhuma sala disponível
+        ordem, scores = self._rankings[chave]
+        for j in ordem.tolist():
+            sala = self.salas[j]
+            if bloco is not None and sala.bloco != bloco: continue
+            if andar is not None and str(sala.andar) != str(andar): continue
+            yield sala, int(scores[j])
+
+# Índice único do processo; qualquer invalidação global (salas mudaram, nova
+# importação, nova alocação) descarta e a próxima consulta remonta.
+_indice = None
+_geracao = 0
+_lock = threading.Lock()
+
+def obter_indice(montar) -> IndiceRanking:
+    """`montar()` devolve um IndiceRanking novo; só é chamado se não houver um válido."""
+    global _indice
+    with _lock:
+        if _indice is not None: return _indice
+        geracao = _geracao
+    indice = montar()
+    with _lock:
+        # Invalidado durante a montagem: usa, mas não guarda
+        if _geracao == geracao: _indice = indice
+    return indice
+
+def invalidar_indice():
+    global _indice, _geracao
+    with _lock:
+        _geracao += 1
+        _indice = None
+
+registrar_ouvinte(lambda dia, turno: invalidar_indice() if dia is None or turno is None else None)
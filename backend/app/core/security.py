@@ -1,5 +1,11 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
+import bcrypt
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -7,6 +13,36 @@ from app.core.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# --- Senhas ---
+# bcrypt direto (mesmo formato $2b$ do passlib, que não funciona com bcrypt >= 4.1).
+# Com BCRYPT_ROUNDS=12 custa ~0,3-0,4 s de CPU: a partir do event loop, só via run_in_threadpool.
+LIMITE_SENHA_BYTES = 72  # o bcrypt ignora/recusa o que passa disso
+
+def gerar_hash_senha(senha: str) -> str:
+    """O bcrypt 5 recusa (ValueError) senhas acima de 72 bytes: quem chama valida antes (usuarios._validar_senha)."""
+    dados = senha.encode("utf-8")
+    if len(dados) > LIMITE_SENHA_BYTES: raise ValueError(f"Senha com {len(dados)} bytes; o limite do bcrypt é {LIMITE_SENHA_BYTES}")
+    return bcrypt.hashpw(dados, bcrypt.gensalt(settings.BCRYPT_ROUNDS)).decode("ascii")
+
+def verificar_senha(senha: str, senha_hash: Optional[str]) -> bool:
+    """Sem hash (usuário inexistente) compara com um fictício: a resposta leva o mesmo tempo e não revela quem existe."""
+    dados = senha.encode("utf-8")[:LIMITE_SENHA_BYTES]
+    if senha_hash is None:
+        bcrypt.checkpw(dados, _ficticio[0] if _ficticio else preparar_hash_ficticio())
+        return False
+    try:
+        return bcrypt.checkpw(dados, senha_hash.encode("ascii"))
+    except ValueError:
+        return False
+
+_ficticio = []
+
+def preparar_hash_ficticio() -> bytes:
+    """Chamada no lifespan: o primeiro login de usuário inexistente não paga um hash a mais."""
+    if not _ficticio: _ficticio.append(bcrypt.hashpw(b"ficticio", bcrypt.gensalt(settings.BCRYPT_ROUNDS)))
+    return _ficticio[0]
+
+# --- Tokens ---
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -14,24 +50,85 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         # Usa a configuração do .env
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
+
+    # jti identifica o token na revogação; iat (fracionário) compara com tokens_validos_desde
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     # Usa a SECRET_KEY e ALGORITHM do .env
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Credenciais inválidas",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+# Tokens já verificados (sha256 do token -> (dados, válido até em time.monotonic)), LRU
+# limitado a TOKEN_CACHE_MAX. A revogação é conferida a cada uso, inclusive nos acertos:
+# por jti (logout) e por usuário (tokens emitidos antes de tokens_validos_desde).
+_verificados = OrderedDict()
+_revogados = {}       # jti -> exp (epoch); some depois que o token expiraria de qualquer forma
+_validos_desde = {}   # username -> epoch; usuário desativado ou com senha trocada
+_lock = threading.Lock()
+
+def _chave_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _revogado(dados: dict) -> bool:
+    return dados["jti"] in _revogados or dados["iat"] < _validos_desde.get(dados["username"], 0)
+
+def definir_estado_revogacao(revogados: dict, validos_desde: dict):
+    """Carga inicial a partir do banco (app/services/usuarios.py)."""
+    with _lock:
+        _revogados.clear(); _revogados.update(revogados)
+        _validos_desde.clear(); _validos_desde.update(validos_desde)
+        _verificados.clear()
+
+def revogar_jti(jti: str, exp: float):
+    agora = time.time()
+    with _lock:
+        _revogados[jti] = exp
+        # Limpeza preguiçosa: revogações de tokens já expirados não servem para mais nada
+        for chave in [j for j, e in _revogados.items() if e < agora]: del _revogados[chave]
+
+def revogar_usuario(username: str, desde: float):
+    with _lock: _validos_desde[username] = desde
+
+def verificar_token(token: str) -> Optional[dict]:
+    """Dados do token ({username, papel, jti, iat, exp}) ou None se inválido, expirado ou revogado."""
+    chave = _chave_token(token)
+    agora = time.monotonic()
+    with _lock:
+        item = _verificados.get(chave)
+        if item is not None:
+            dados, valido_ate = item
+            if valido_ate > agora and not _revogado(dados):
+                _verificados.move_to_end(chave)
+                return dados
+            del _verificados[chave]
+            if valido_ate > agora: return None
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = {"username": username}
     except JWTError:
-        raise credentials_exception
-    return token_data
\ No newline at end of file
+        return None
+    username = payload.get("sub")
+    if username is None or "jti" not in payload: return None
+    dados = {"username": username, "papel": payload.get("papel", "coordenador"), "jti": payload["jti"],
+             "iat": float(payload.get("iat", 0)), "exp": float(payload["exp"])}
+    # Nunca guarda além do exp do próprio token
+    ttl = min(settings.TOKEN_CACHE_TTL_SEGUNDOS, dados["exp"] - time.time())
+    with _lock:
+        if _revogado(dados): return None
+        if ttl > 0:
+            _verificados[chave] = (dados, agora + ttl)
+            if len(_verificados) > settings.TOKEN_CACHE_MAX: _verificados.popitem(last=False)
+    return dados
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    token_data = verificar_token(token)
+    if token_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciais inválidas",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
+async def exigir_admin(usuario: dict = Depends(get_current_user)):
+    if usuario["papel"] != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores")
+    return usuario
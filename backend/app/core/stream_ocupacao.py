@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.core.time import get_horario_atual
+from app.core.optimizer import obter_dashboard_tempo_real
+from app.core.cache_ocupacao import registrar_ouvinte
+
+INTERVALO_PUBLICACAO = 0.2   # segundos entre checagens de mudança
+HEARTBEAT = 15               # segundos sem eventos até mandar um ping
+RETRY_MS = 3000              # sugestão de reconexão para o EventSource
+MAX_EVENTOS_GUARDADOS = 500  # janela de replay para Last-Event-ID
+
+def _ler_estado():
+    db = SessionLocal()
+    try: return obter_dashboard_tempo_real(db)
+    finally: db.close()
+
+def _indexar(estado):
+    return {s["sala_id"]: s for s in estado["salas"]}
+
+class TransmissorOcupacao:
+    """
+    Publica a ocupação atual para clientes SSE: um snapshot completo na conexão
+    e depois só as salas que mudaram. Uma única tarefa remonta o estado quando o
+    cache de ocupação é invalidado (check-in, check-out, trocas, manutenção,
+    realocação), então o custo no banco não depende do número de telas.
+    """
+    def __init__(self):
+        # Prefixo dos ids: depois de um restart, ids antigos não são confundidos com novos
+        self.epoca = str(int(time.time()))
+        self.contador = 0
+        self.eventos = deque(maxlen=MAX_EVENTOS_GUARDADOS)
+        self.estado = None
+        self.chave = None
+        self.pendente = True
+        self.pronto = asyncio.Event()
+        self.sinal = asyncio.Event()
+        registrar_ouvinte(self._marcar_pendente)
+
+    def _marcar_pendente(self, dia, turno):
+        # Chamado de threads do pool de requests; só sinaliza, quem publica é a tarefa
+        self.pendente = True
+
+    @property
+    def ultimo_id(self):
+        return f"{self.epoca}-{self.contador}"
+
+    def _publicar(self, tipo, dados):
+        self.contador += 1
+        self.eventos.append((self.contador, tipo, dados))
+        sinal, self.sinal = self.sinal, asyncio.Event()
+        sinal.set()
+
+    def _atualizar(self, novo):
+        chave = (novo["tempo"]["dia"], novo["tempo"]["turno"])
+        if self.estado is None or chave != self.chave:
+            self.estado, self.chave = novo, chave
+            self._publicar("snapshot", novo)
+            return
+
+        antigas, novas = _indexar(self.estado), _indexar(novo)
+        mudancas = [
+            sala for sala_id, sala in novas.items()
+            if sala_id not in antigas or (antigas[sala_id]["status"], antigas[sala_id]["ocupante"]) != (sala["status"], sala["ocupante"])
+        ]
+        mudancas += [{"sala_id": sala_id, "status": "REMOVIDA", "ocupante": None} for sala_id in antigas.keys() - novas.keys()]
+        self.estado = novo
+        if mudancas:
+            self._publicar("delta", {"tempo": novo["tempo"], "estatisticas": novo["estatisticas"], "mudancas": mudancas})
+
+    async def executar(self):
+        """Tarefa de fundo iniciada no lifespan da API."""
+        while True:
+            try:
+                tempo = get_horario_atual()
+                if self.pendente or (tempo["dia"], tempo["turno"]) != self.chave:
+                    self.pendente = False
+                    self._atualizar(await run_in_threadpool(_ler_estado))
+                    self.pronto.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro ao publicar ocupação: {e}")
+            await asyncio.sleep(INTERVALO_PUBLICACAO)
+
+    def _eventos_desde(self, ultimo_id):
+        """Eventos após `ultimo_id`, ou None se ele não puder ser reconstituído pelo buffer."""
+        try:
+            epoca, numero = ultimo_id.rsplit("-", 1)
+            numero = int(numero)
+        except (AttributeError, ValueError):
+            return None
+        if epoca != self.epoca or numero > self.contador: return None
+        if numero == self.contador: return []
+        if not self.eventos or self.eventos[0][0] > numero + 1: return None
+        return [e for e in self.eventos if e[0] > numero]
+
+    @staticmethod
+    def _formatar(evento_id, tipo, dados):
+        return f"id: {evento_id}\nevent: {tipo}\ndata: {json.dumps(dados, default=str)}\n\n"
+
+    async def assinar(self, request, ultimo_id: str = None):
+        await self.pronto.wait()
+        yield f"retry: {RETRY_MS}\n\n"
+        cursor = ultimo_id
+
+        while not await request.is_disconnected():
+            pendentes = self._eventos_desde(cursor)
+            if pendentes is None:
+                # Primeira conexão, buffer perdido ou restart: manda o estado inteiro
+                cursor, estado = self.ultimo_id, self.estado
+                yield self._formatar(cursor, "snapshot", estado)
+            else:
+                for numero, tipo, dados in pendentes:
+                    cursor = f"{self.epoca}-{numero}"
+                    yield self._formatar(cursor, tipo, dados)
+
+            # Algo pode ter sido publicado enquanto o cliente consumia
+            if cursor != self.ultimo_id: continue
+            try:
+                await asyncio.wait_for(self.sinal.wait(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+
+transmissor = TransmissorOcupacao()
@@ -1,30 +1,67 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 
-def get_horario_atual():
-    """Retorna o dia e turno atuais baseados no horário de Recife."""
-    tz = pytz.timezone('America/Recife')
-    agora = datetime.now(tz)
-    
-    dias = ['SEG', 'TER', 'QUA', 'QUI', 'SEX', 'SAB', 'DOM']
-    dia_atual = dias[agora.weekday()]
-    
-    hora = agora.hour
-    turno_atual = None
-    
-    # Definição dos Turnos
-    if 6 <= hora < 13:
-        turno_atual = 'MANHA'
-    elif 13 <= hora < 18: # Ajustar conforme a realidade do HC
-        turno_atual = 'TARDE'
-    elif 18 <= hora < 23:
-        turno_atual = 'NOITE'
+from app.core.config import settings
+
+DIAS = ['SEG', 'TER', 'QUA', 'QUI', 'SEX', 'SAB', 'DOM']
+
+# Fuso montado uma única vez (pytz.timezone a cada chamada custava mais que o resto da função)
+FUSO = pytz.timezone(settings.FUSO_HORARIO)
+
+def _ler_inicios(texto: str):
+    """Ex: MANHA=06:00,TARDE=13:00 -> [(360, 'MANHA'), (780, 'TARDE')], em minutos do dia e ordenado."""
+    inicios = []
+    for parte in texto.split(","):
+        turno, horario = parte.split("=")
+        hora, minuto = horario.strip().split(":")
+        inicios.append((int(hora) * 60 + int(minuto), turno.strip()))
+    return sorted(inicios)
+
+# Início de cada turno; o último vai até o primeiro do dia seguinte (ex: MADRUGADA 23h-6h)
+INICIOS_TURNO = _ler_inicios(settings.TURNOS_INICIO)
+
+def agora():
+    return datetime.now(FUSO)
+
+def dia_e_turno(instante: datetime):
+    """
+    (dia, turno) do instante. Antes do primeiro início do dia ainda vale o último
+    turno do dia anterior: 00:30 de terça é (SEG, MADRUGADA), não (TER, MADRUGADA).
+    """
+    minutos = instante.hour * 60 + instante.minute
+    if minutos < INICIOS_TURNO[0][0]:
+        return DIAS[(instante.weekday() - 1) % 7], INICIOS_TURNO[-1][1]
+    turno = INICIOS_TURNO[0][1]
+    for inicio, nome in INICIOS_TURNO:
+        if minutos < inicio: break
+        turno = nome
+    return DIAS[instante.weekday()], turno
+
+def proxima_troca(instante: datetime = None):
+    """(instante da próxima troca de turno, dia da semana, turno que começa), pela mesma regra de dia_e_turno."""
+    instante = instante or agora()
+    minutos = instante.hour * 60 + instante.minute
+    for inicio, nome in INICIOS_TURNO:
+        if inicio > minutos: break
     else:
-        turno_atual = 'MADRUGADA'
-        
+        inicio, nome = INICIOS_TURNO[0]
+        instante = instante + timedelta(days=1)
+    ingenuo = instante.replace(tzinfo=None, hour=inicio // 60, minute=inicio % 60, second=0, microsecond=0)
+    troca = FUSO.localize(ingenuo)
+    dia, _ = dia_e_turno(troca)
+    return troca, dia, nome
+
+def get_horario_atual(instante: datetime = None):
+    """Retorna o dia e turno atuais no fuso do hospital (FUSO_HORARIO, padrão Recife)."""
+    instante = instante or agora()
+    dia, turno = dia_e_turno(instante)
     return {
-        "dia": dia_atual,
-        "turno": turno_atual,
-        "hora_legivel": agora.strftime("%H:%M"),
-        "data_legivel": agora.strftime("%d/%m/%Y")
-    }
\ No newline at end of file
+        "dia": dia,
+        "turno": turno,
+        "hora_legivel": instante.strftime("%H:%M"),
+        "data_legivel": instante.strftime("%d/%m/%Y")
+    }
+
+def get_data_atual():
+    """Data de hoje no fuso do hospital."""
+    return agora().date()
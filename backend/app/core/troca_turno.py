@@ -0,0 +1,81 @@
+import asyncio
+from datetime import timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_
+
+from app.database import SessionLocal
+from app.models import Grade, Alocacao
+from app.core.config import settings
+from app.core.time import agora, proxima_troca, get_horario_atual
+from app.core.optimizer import TIPO_CHECKIN, montar_ocupacao
+from app.core.cache_ocupacao import obter_snapshot, invalidar_ocupacao
+from app.core.metricas import registrar_contador, incrementar
+
+registrar_contador("gds_checkins_expirados_total", "Check-ins do portal removidos na troca de turno")
+
+def expirar_checkins(db, dia: str, turno: str) -> int:
+    """
+    Remove as grades do portal (CHECKIN_APP) e suas alocações de qualquer turno
+    que não seja (dia, turno). O modelo é semanal: sem isso, um check-in de
+    segunda de manhã reapareceria ocupando a sala na segunda seguinte.
+    """
+    antigas = db.query(Grade.id, Grade.dia_semana, Grade.turno).filter(
+        Grade.tipo_recurso == TIPO_CHECKIN, or_(Grade.dia_semana != dia, Grade.turno != turno)
+    ).all()
+    if not antigas: return 0
+    ids = [g.id for g in antigas]
+    db.query(Alocacao).filter(Alocacao.grade_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Grade).filter(Grade.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    for chave in {(g.dia_semana, g.turno) for g in antigas}: invalidar_ocupacao(*chave, modelo=False)
+    incrementar("gds_checkins_expirados_total", len(ids))
+    return len(ids)
+
+def _expirar_turnos_anteriores():
+    tempo = get_horario_atual()
+    with SessionLocal() as db:
+        return expirar_checkins(db, tempo["dia"], tempo["turno"])
+
+def _preaquecer(dia: str, turno: str):
+    """Deixa o snapshot do próximo turno no cache (se nada mudar até a troca, a primeira leitura já acerta)."""
+    with SessionLocal() as db:
+        obter_snapshot((dia, turno), lambda: montar_ocupacao(db, dia, turno))
+
+async def _dormir_ate(instante):
+    # Passos de no máximo 60 s: um acerto do relógio do servidor não desloca a troca
+    while (restante := (instante - agora()).total_seconds()) > 0:
+        await asyncio.sleep(min(restante, 60))
+
+class AgendadorTurnos:
+    """
+    Tarefa de fundo das trocas de turno: TURNO_PREAQUECIMENTO_MINUTOS antes de
+    cada troca monta a ocupação do próximo turno, e na troca expira os check-ins
+    de turnos anteriores. O pico de check-ins do início do turno encontra o
+    cache pronto e a tabela limpa.
+    """
+    async def _virar_turno(self):
+        removidos = await run_in_threadpool(_expirar_turnos_anteriores)
+        if removidos: print(f"Troca de turno: {removidos} check-in(s) de turnos anteriores expirado(s)")
+
+    async def executar(self):
+        """Tarefa iniciada no lifespan da API."""
+        # Na subida, limpa o que ficou de turnos que viraram com a API parada
+        try:
+            await self._virar_turno()
+        except Exception as e:
+            print(f"Erro ao expirar check-ins: {e}")
+        while True:
+            try:
+                troca, dia, turno = proxima_troca()
+                await _dormir_ate(troca - timedelta(minutes=settings.TURNO_PREAQUECIMENTO_MINUTOS))
+                await run_in_threadpool(_preaquecer, dia, turno)
+                await _dormir_ate(troca)
+                await self._virar_turno()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro na troca de turno: {e}")
+                await asyncio.sleep(60)
+
+agendador_turnos = AgendadorTurnos()
@@ -1,14 +1,104 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.metricas import registrar_consulta, registrar_coletor
+
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+class QueuePoolComMetricas(QueuePool):
+    """QueuePool que registra quanto cada checkout esperou por uma conexão livre."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.esperas_ms = deque(maxlen=1000)
+        self.total_checkouts = 0
+        self.timeouts = 0
+        self._lock_metricas = threading.Lock()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._lock_metricas: self.timeouts += 1
+            raise
+        finally:
+            with self._lock_metricas:
+                self.total_checkouts += 1
+                self.esperas_ms.append((time.perf_counter() - inicio) * 1000)
+
+def _opcoes_engine():
+    opcoes = {}
+    if IS_SQLITE:
+        opcoes["connect_args"] = {"check_same_thread": False}
+    # SQLite em memória usa um pool próprio (uma única conexão)
+    if ":memory:" not in SQLALCHEMY_DATABASE_URL:
+        opcoes.update(
+            poolclass=QueuePoolComMetricas,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_pre_ping=not IS_SQLITE,
+        )
+    return opcoes
+
+def _url_assincrona(url: str) -> str:
+    """Mesmo banco pelo driver assíncrono (sqlite -> aiosqlite)."""
+    if url.startswith("sqlite:"): return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    return url
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_opcoes_engine())
+
+# Engine assíncrona para as leituras de alto tráfego (dashboard, resumo, listagens).
+# O otimizador, importadores e escritas continuam na engine síncrona acima.
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or _url_assincrona(SQLALCHEMY_DATABASE_URL)
+_opcoes_async = {k: v for k, v in _opcoes_engine().items() if k not in ("poolclass", "connect_args")}
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_opcoes_async)
+
+def _configurar_sqlite(dbapi_connection, connection_record):
+    # WAL: leitores do dashboard não esperam escritores (check-in, trocas, realocação)
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.close()
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./gds_poc.db"
+if IS_SQLITE:
+    event.listen(engine, "connect", _configurar_sqlite)
+    event.listen(async_engine.sync_engine, "connect", _configurar_sqlite)
+
+def _contar_consultas(engine_alvo, nome: str):
+    """Conta e cronometra cada statement (métricas globais e da requisição em andamento)."""
+    @event.listens_for(engine_alvo, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+    @event.listens_for(engine_alvo, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        registrar_consulta(nome, time.perf_counter() - conn.info["inicio_consultas"].pop())
+
+    @event.listens_for(engine_alvo, "handle_error")
+    def _erro(contexto):
+        # Statement que falhou não passa pelo after_cursor_execute
+        if contexto.connection is not None and contexto.connection.info.get("inicio_consultas"):
+            contexto.connection.info["inicio_consultas"].pop()
+
+_contar_consultas(engine, "sincrona")
+_contar_consultas(async_engine.sync_engine, "assincrona")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -16,4 +106,44 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def obter_metricas_pool():
+    pool = engine.pool
+    metricas = {"url": engine.url.render_as_string(hide_password=True), "pool": pool.__class__.__name__, "status": pool.status(),
+                "assincrona": {"url": async_engine.url.render_as_string(hide_password=True), "status": async_engine.pool.status()}}
+    if isinstance(pool, QueuePoolComMetricas):
+        with pool._lock_metricas:
+            esperas = sorted(pool.esperas_ms)
+            total, timeouts = pool.total_checkouts, pool.timeouts
+        metricas.update({
+            "tamanho": pool.size(),
+            "em_uso": pool.checkedout(),
+            "ociosas": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts_total": total,
+            "timeouts": timeouts,
+            "espera_ms": {
+                "amostras": len(esperas),
+                "media": round(sum(esperas) / len(esperas), 3) if esperas else 0,
+                "p95": round(esperas[int(len(esperas) * 0.95) - 1], 3) if esperas else 0,
+                "max": round(esperas[-1], 3) if esperas else 0,
+            },
+        })
+    return metricas
+
+def _coletar_pool():
+    """Estado do pool síncrono para o /metrics, lido a cada exportação."""
+    metricas = obter_metricas_pool()
+    if "em_uso" not in metricas: return []
+    return [
+        ("gds_db_pool_conexoes", "gauge", "Conexões do pool por estado", [({"estado": "em_uso"}, metricas["em_uso"]), ({"estado": "ociosa"}, metricas["ociosas"])]),
+        ("gds_db_pool_checkouts_total", "counter", "Checkouts de conexão do pool", [({}, metricas["checkouts_total"])]),
+        ("gds_db_pool_timeouts_total", "counter", "Checkouts que estouraram o pool_timeout", [({}, metricas["timeouts"])]),
+    ]
+
+registrar_coletor(_coletar_pool)
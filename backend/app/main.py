@@ -1,32 +1,64 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from pydantic import BaseModel, Field
 from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import asyncio
+import orjson
 import shutil
 import os
-from datetime import timedelta
-
-from app.database import engine, Base, get_db, SessionLocal
-from app.models import Sala, Grade, Alocacao, Especialidade
-from app.services.importer import importar_salas_csv, importar_grades_csv
+from datetime import timedelta, date
+
+from app.database import engine, async_engine, Base, get_db, get_async_db, SessionLocal, obter_metricas_pool
+from app.models import Sala, Grade, Alocacao, Especialidade, Usuario
+from app.migracoes import aplicar_migracoes
+from app.services.importer import importar_salas_csv, importar_grades_csv, importar_grades_csv_streaming, recarregar_regras_mapeamento
+from app.services.usuarios import garantir_admin_inicial, carregar_revogacoes, listar_usuarios, criar_usuario, atualizar_usuario, revogar_token
+from app.services.jobs import novo_job_id, criar_arquivo_upload, enfileirar_importacao_grades, obter_job, cancelar_job
 from app.core.optimizer import (
     gerar_alocacao_grade, 
+    MODOS_SOLVER,
+    SCORE_CHECKIN,
+    TIPO_CHECKIN,
+    realocar_buckets,
+    buckets_afetados_por_salas,
     obter_resumo_atual, 
+    listar_detalhes_alocacao,
     listar_opcoes_troca, 
     aplicar_troca_manual,
-    obter_dashboard_tempo_real
+    aplicar_movimentos_em_lote,
+    obter_dashboard_tempo_real_async
 )
-from app.core.time import get_horario_atual
-from app.core.security import create_access_token, get_current_user
+from app.core.cenarios import simular_cenarios
+from app.core.metricas import MedicaoRequisicoes, exportar
+from app.core.horizonte import agendar_sincronizacao, criar_excecao, remover_excecao, listar_excecoes, resumo_horizonte, alocacoes_da_data
+from app.core.time import get_horario_atual, get_data_atual
+from app.core.cache_ocupacao import invalidar_ocupacao, versao_dados
+from app.core.stream_ocupacao import transmissor
+from app.core.troca_turno import agendador_turnos
+from app.core.pool_processos import iniciar_pool, encerrar_pool
+from app.core.security import create_access_token, get_current_user, exigir_admin, verificar_senha, preparar_hash_ficticio
 from app.core.config import settings
 
 Base.metadata.create_all(bind=engine)
+aplicar_migracoes(engine)
 
 # --- LÓGICA DE AUTO-SEED ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Usuários: administrador inicial do .env e revogações de tokens gravadas
+    with SessionLocal() as db:
+        garantir_admin_inicial(db)
+        carregar_revogacoes(db)
+    await run_in_threadpool(preparar_hash_ficticio)
     db = SessionLocal()
     try:
         # Verifica se já existem salas
@@ -38,7 +70,19 @@ async def lifespan(app: FastAPI):
         print(f"Erro no Auto-Seed: {e}")
     finally:
         db.close()
+    # Publicador do stream de ocupação (SSE)
+    tarefa_stream = asyncio.create_task(transmissor.executar())
+    # Pré-montagem da ocupação antes de cada troca de turno e limpeza dos check-ins vencidos
+    tarefa_turnos = asyncio.create_task(agendador_turnos.executar())
+    # Planos datados: confere na subida o que o modelo semanal mudou com a API parada
+    agendar_sincronizacao()
+    # Pool de processos do solver ótimo e dos cenários: um só, reaproveitado entre requisições
+    iniciar_pool()
     yield
+    tarefa_stream.cancel()
+    tarefa_turnos.cancel()
+    await run_in_threadpool(encerrar_pool)
+    await async_engine.dispose()
 
 app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
@@ -50,9 +94,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Proximo-Cursor"],
 )
+# Listagens e resumo passam de centenas de KiB em JSON; o SSE fica de fora (text/event-stream)
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_TAMANHO_MINIMO, compresslevel=settings.GZIP_NIVEL)
+# Latência por rota e SQL por requisição, servidos em /metrics
+app.add_middleware(MedicaoRequisicoes)
 
 # --- Modelos ---
+class SalaResposta(BaseModel):
+    id: str
+    nome_visual: Optional[str] = None
+    bloco: Optional[str] = None
+    andar: Optional[str] = None
+    especialidade_id: Optional[int] = None
+    especialidade_preferencial: Optional[str] = None
+    features: Optional[Any] = None
+    is_maintenance: Optional[bool] = None
+
+class AlocacaoResposta(BaseModel):
+    id: int
+    sala_id: Optional[str] = None
+    grade_id: Optional[int] = None
+    dia_semana: Optional[str] = None
+    turno: Optional[str] = None
+    score: Optional[int] = None
+
 class NovaDemanda(BaseModel):
     medico_nome: str
     especialidade: str
@@ -64,6 +131,13 @@ class TrocaSalaRequest(BaseModel):
     nova_sala_id: str
     forcar: bool = False
 
+class MovimentoLote(BaseModel):
+    alocacao_id: int
+    nova_sala_id: str
+
+class TrocasEmLoteRequest(BaseModel):
+    movimentos: List[MovimentoLote] = Field(..., min_length=1, max_length=500)
+
 class SalaUpdate(BaseModel):
     is_maintenance: bool
 
@@ -77,6 +151,54 @@ class LoteSalasUpdate(BaseModel):
     andar: str
     is_maintenance: bool
 
+class ExcecaoDataRequest(BaseModel):
+    data: date
+    tipo: str
+    turno: Optional[str] = None
+    sala_id: Optional[str] = None
+    grade_id: Optional[int] = None
+    nome_profissional: Optional[str] = None
+    especialidade: Optional[str] = None
+    motivo: str = ""
+
+class LocalFechado(BaseModel):
+    bloco: str
+    andar: Optional[str] = None
+
+class GradeCenarioRequest(BaseModel):
+    nome_profissional: str
+    especialidade: str
+    dia_semana: str
+    turno: str
+    tipo_recurso: str = "EXTRA"
+
+class CenarioRequest(BaseModel):
+    nome: Optional[str] = None
+    modo: str = "guloso"
+    busca_local_s: float = Field(0, ge=0, le=60)
+    salas_manutencao: List[str] = []
+    salas_liberadas: List[str] = []
+    locais_fechados: List[LocalFechado] = []
+    especialidade_salas: Dict[str, str] = {}
+    grades_removidas: List[int] = []
+    especialidade_grades: Dict[int, str] = {}
+    grades_adicionadas: List[GradeCenarioRequest] = []
+
+class SimulacaoRequest(BaseModel):
+    cenarios: List[CenarioRequest] = Field(..., min_length=1, max_length=20)
+
+class UsuarioCreate(BaseModel):
+    username: str = Field(min_length=3, max_length=64)
+    nome: Optional[str] = None
+    senha: str
+    papel: str = "coordenador"
+
+class UsuarioUpdate(BaseModel):
+    nome: Optional[str] = None
+    senha: Optional[str] = None
+    papel: Optional[str] = None
+    ativo: Optional[bool] = None
+
 class CheckInRequest(BaseModel):
     medico_nome: str
     especialidade: str
@@ -84,13 +206,16 @@ class CheckInRequest(BaseModel):
 
 # --- AUTHENTICATION ---
 @app.post("/api/auth/login")
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    if form_data.username == settings.ADMIN_USERNAME and form_data.password == settings.ADMIN_PASSWORD:
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    usuario = (await db.execute(select(Usuario).where(Usuario.username == form_data.username))).scalar_one_or_none()
+    # bcrypt no threadpool: o event loop segue atendendo as outras requisições
+    senha_ok = await run_in_threadpool(verificar_senha, form_data.password, usuario.senha_hash if usuario else None)
+    if senha_ok and usuario.ativo:
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": form_data.username}, expires_delta=access_token_expires
+            data={"sub": usuario.username, "papel": usuario.papel}, expires_delta=access_token_expires
         )
-        return {"access_token": access_token, "token_type": "bearer", "user": {"name": "Administrador", "role": "admin"}}
+        return {"access_token": access_token, "token_type": "bearer", "user": {"name": usuario.nome or usuario.username, "role": usuario.papel}}
     
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -98,48 +223,171 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+@app.post("/api/auth/logout")
+def logout(usuario: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    revogar_token(db, usuario)
+    return {"status": "OK"}
+
+# --- Usuários (só administradores) ---
+@app.get("/api/usuarios", dependencies=[Depends(exigir_admin)])
+def obter_usuarios(db: Session = Depends(get_db)):
+    return listar_usuarios(db)
+
+@app.post("/api/usuarios", dependencies=[Depends(exigir_admin)])
+def cadastrar_usuario(dados: UsuarioCreate, db: Session = Depends(get_db)):
+    resultado = criar_usuario(db, dados.model_dump())
+    if "erro" in resultado: raise HTTPException(400, resultado["erro"])
+    return resultado
+
+@app.put("/api/usuarios/{username}", dependencies=[Depends(exigir_admin)])
+def alterar_usuario(username: str, dados: UsuarioUpdate, db: Session = Depends(get_db)):
+    resultado = atualizar_usuario(db, username, dados.model_dump())
+    if "erro" in resultado: raise HTTPException(404 if resultado["erro"] == "Usuário não encontrado" else 400, resultado["erro"])
+    return resultado
+
 @app.get("/")
 def read_root():
     return {"message": "API GDS Online", "status": "OK"}
 
+@app.get("/api/admin/db/pool", dependencies=[Depends(get_current_user)])
+def ler_metricas_pool(): return obter_metricas_pool()
+
+@app.get("/metrics", include_in_schema=False)
+def metricas_prometheus(request: Request):
+    permitidos = {ip.strip() for ip in settings.METRICAS_IPS_PERMITIDOS.split(",") if ip.strip()}
+    if request.client is None or request.client.host not in permitidos:
+        raise HTTPException(403, "Acesso às métricas não permitido deste endereço")
+    return PlainTextResponse(exportar(), media_type="text/plain; version=0.0.4")
+
 # --- Setup ---
 @app.post("/api/setup/importar-salas", dependencies=[Depends(get_current_user)])
 def trigger_import_salas(): return importar_salas_csv()
 
 @app.post("/api/setup/importar-grades", dependencies=[Depends(get_current_user)])
-def trigger_import_grades_local(): return importar_grades_csv()
+def trigger_import_grades_local(streaming: bool = False):
+    return importar_grades_csv_streaming() if streaming else importar_grades_csv()
 
-@app.post("/api/upload/grades", dependencies=[Depends(get_current_user)])
+@app.post("/api/setup/recarregar-regras", dependencies=[Depends(get_current_user)])
+def trigger_recarregar_regras(): return recarregar_regras_mapeamento()
+
+@app.post("/api/upload/grades", dependencies=[Depends(get_current_user)], status_code=status.HTTP_202_ACCEPTED)
 async def upload_grades_csv(file: UploadFile = File(...)):
+    """Recebe o CSV e agenda a importação; o andamento é consultado em /api/importacoes/{job_id}."""
+    job_id = novo_job_id()
+    destino = criar_arquivo_upload(job_id)
     try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        data_dir = os.path.join(base_dir, "..", "data")
-        os.makedirs(data_dir, exist_ok=True)
-        file_location = os.path.join(data_dir, "grades.csv")
-        with open(file_location, "wb+") as file_object:
-            shutil.copyfileobj(file.file, file_object)
-        resultado = importar_grades_csv()
-        return {"message": "Processado", "detalhes": resultado}
+        def salvar():
+            with open(destino, "wb") as file_object:
+                shutil.copyfileobj(file.file, file_object)
+        # Cópia em thread para não travar o event loop
+        await run_in_threadpool(salvar)
     except Exception as e:
+        if os.path.exists(destino): os.remove(destino)
         raise HTTPException(status_code=500, detail=str(e))
+    return enfileirar_importacao_grades(job_id, destino, file.filename)
+
+@app.get("/api/importacoes/{job_id}", dependencies=[Depends(get_current_user)])
+def consultar_importacao(job_id: str):
+    job = obter_job(job_id)
+    if not job: raise HTTPException(404, "Importação não encontrada")
+    return job
+
+@app.post("/api/importacoes/{job_id}/cancelar", dependencies=[Depends(get_current_user)])
+def cancelar_importacao(job_id: str):
+    job = cancelar_job(job_id)
+    if not job: raise HTTPException(404, "Importação não encontrada")
+    return job
 
 # --- Core ---
 @app.post("/api/alocacao/gerar", dependencies=[Depends(get_current_user)])
-def trigger_alocacao_inteligente(db: Session = Depends(get_db)):
-    res = gerar_alocacao_grade(db)
-    return {"status": "OK", "resumo_executivo": res["resumo_ambulatorios"]}
+def trigger_alocacao_inteligente(modo: str = "guloso", busca_local_s: Optional[float] = Query(None, ge=0, le=600), db: Session = Depends(get_db)):
+    if modo not in MODOS_SOLVER:
+        raise HTTPException(400, f"Modo inválido. Use um de: {', '.join(MODOS_SOLVER)}")
+    res = gerar_alocacao_grade(db, modo, busca_local_s)
+    return {"status": "OK", "resumo_executivo": res["resumo_ambulatorios"], "conflitos": res["conflitos"], "estatisticas": res["estatisticas"]}
 
 @app.get("/api/alocacao/resumo", dependencies=[Depends(get_current_user)])
-def ler_alocacao_atual(db: Session = Depends(get_db)):
-    return obter_resumo_atual(db)
+async def ler_alocacao_atual(request: Request, db: AsyncSession = Depends(get_async_db)):
+    etag, nao_modificado = _versao_condicional(request)
+    if nao_modificado: return nao_modificado
+    return RespostaJSONRapida(await db.run_sync(obter_resumo_atual), headers=_cabecalhos_versao(etag))
+
+@app.get("/api/alocacao/detalhes", dependencies=[Depends(get_current_user)])
+def ler_detalhes_alocacao(especialidade: Optional[str] = None, dia: Optional[str] = None, turno: Optional[str] = None,
+                          limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0), db: Session = Depends(get_db)):
+    return listar_detalhes_alocacao(db, especialidade, dia, turno, limit, offset)
 
 @app.get("/api/dashboard/agora")
-def ler_dashboard_tempo_real(db: Session = Depends(get_db)):
-    return obter_dashboard_tempo_real(db)
+async def ler_dashboard_tempo_real(request: Request):
+    # Endpoint mais consultado (polling das TVs): roda no event loop, sem ocupar o threadpool
+    dados = await obter_dashboard_tempo_real_async()
+    # A hora entra na ETag para as telas não ficarem com o relógio parado
+    etag = f'W/"{dados["versao"]}-{dados["tempo"]["hora_legivel"]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    # O snapshot já é JSON puro; JSONResponse evita o jsonable_encoder (maior custo da rota)
+    return JSONResponse(dados, headers={"ETag": etag})
+
+@app.get("/api/dashboard/stream")
+async def stream_dashboard_tempo_real(request: Request, last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events: snapshot completo na conexão e depois só as salas que mudaram."""
+    return StreamingResponse(
+        transmissor.assinar(request, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # --- Salas (Protegido) ---
-@app.get("/api/salas", dependencies=[Depends(get_current_user)])
-def listar_salas(db: Session = Depends(get_db)): return db.query(Sala).all()
+# --- Listagens paginadas ---
+LIMITE_PAGINA_PADRAO, LIMITE_PAGINA_MAX = 1000, 10000
+
+class RespostaJSONRapida(JSONResponse):
+    """Serializa com orjson; as listagens já entregam dicts só com tipos JSON."""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+# --- GET condicional pela versão global dos dados ---
+def _versao_condicional(request: Request):
+    """
+    ETag da versão dos dados (sobe a cada escrita, ver cache_ocupacao). Lida antes
+    de qualquer consulta: se o cliente já tem essa versão, o 304 sai sem tocar nas
+    tabelas. Retorna (etag, resposta 304 ou None).
+    """
+    etag = f'W/"{versao_dados()}"'
+    enviadas = [e.strip() for e in request.headers.get("if-none-match", "").split(",")]
+    if etag in enviadas or "*" in enviadas:
+        return etag, Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cabecalhos_versao(etag))
+    return etag, None
+
+def _cabecalhos_versao(etag: str) -> dict:
+    # no-cache: o navegador guarda, mas revalida sempre (o 304 é barato)
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+async def _pagina(db: AsyncSession, modelo, esquema, chave, filtros, depois, limit, headers=None):
+    """
+    Paginação por chave (keyset): `WHERE chave > depois ORDER BY chave LIMIT n`,
+    custo constante em qualquer página. Só as colunas do esquema saem do banco,
+    sem montar objetos ORM. O cursor da próxima página vai em X-Proximo-Cursor.
+    """
+    nomes = list(esquema.model_fields)
+    consulta = select(*(getattr(modelo, n) for n in nomes)).where(*filtros)
+    if depois is not None: consulta = consulta.where(chave > depois)
+    linhas = (await db.execute(consulta.order_by(chave).limit(limit + 1))).all()
+    headers = dict(headers or {})
+    if len(linhas) > limit:
+        linhas = linhas[:limit]
+        headers["X-Proximo-Cursor"] = str(linhas[-1][0])
+    return RespostaJSONRapida([dict(zip(nomes, linha)) for linha in linhas], headers=headers)
+
+@app.get("/api/salas", dependencies=[Depends(get_current_user)], response_model=List[SalaResposta])
+async def listar_salas(request: Request, depois: Optional[str] = None, limit: int = Query(LIMITE_PAGINA_PADRAO, ge=1, le=LIMITE_PAGINA_MAX),
+                       bloco: Optional[str] = None, andar: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    etag, nao_modificado = _versao_condicional(request)
+    if nao_modificado: return nao_modificado
+    filtros = []
+    if bloco is not None: filtros.append(Sala.bloco == bloco)
+    if andar is not None: filtros.append(Sala.andar == andar)
+    return await _pagina(db, Sala, SalaResposta, Sala.id, filtros, depois, limit, _cabecalhos_versao(etag))
 
 @app.post("/api/salas", dependencies=[Depends(get_current_user)])
 def criar_sala_manual(dados: SalaCreate, db: Session = Depends(get_db)):
@@ -178,6 +426,7 @@ def criar_sala_manual(dados: SalaCreate, db: Session = Depends(get_db)):
     
     db.add(nova_sala)
     db.commit()
+    invalidar_ocupacao()
     return {"message": "Sala criada com sucesso", "sala": new_id}
 
 @app.put("/api/salas/{sala_id}", dependencies=[Depends(get_current_user)])
@@ -186,7 +435,10 @@ def atualizar_status_sala(sala_id: str, dados: SalaUpdate, db: Session = Depends
     if not sala: raise HTTPException(404, "Sala não encontrada")
     sala.is_maintenance = dados.is_maintenance
     db.commit()
-    return {"message": "Status atualizado"}
+    invalidar_ocupacao()
+    # Realocação incremental: só os turnos afetados pela mudança
+    realocacao = realocar_buckets(db, buckets_afetados_por_salas(db, [sala_id], dados.is_maintenance))
+    return {"message": "Status atualizado", "realocacao": realocacao}
 
 @app.put("/api/salas/lote/update", dependencies=[Depends(get_current_user)])
 def atualizar_salas_lote(dados: LoteSalasUpdate, db: Session = Depends(get_db)):
@@ -194,7 +446,10 @@ def atualizar_salas_lote(dados: LoteSalasUpdate, db: Session = Depends(get_db)):
     if not salas: raise HTTPException(404, "Nenhuma sala encontrada")
     for s in salas: s.is_maintenance = dados.is_maintenance
     db.commit()
-    return {"message": "Setor atualizado", "afetados": len(salas)}
+    invalidar_ocupacao()
+    buckets = buckets_afetados_por_salas(db, [s.id for s in salas], dados.is_maintenance)
+    realocacao = realocar_buckets(db, buckets)
+    return {"message": "Setor atualizado", "afetados": len(salas), "realocacao": realocacao}
 
 @app.delete("/api/salas/{sala_id}", dependencies=[Depends(get_current_user)])
 def excluir_sala(sala_id: str, db: Session = Depends(get_db)):
@@ -203,12 +458,14 @@ def excluir_sala(sala_id: str, db: Session = Depends(get_db)):
     db.query(Alocacao).filter(Alocacao.sala_id == sala_id).delete()
     db.delete(sala)
     db.commit()
+    invalidar_ocupacao()
     return {"message": "Removida"}
 
 # --- Gestão Manual ---
 @app.get("/api/alocacao/{alocacao_id}/opcoes", dependencies=[Depends(get_current_user)])
-def obter_opcoes_troca(alocacao_id: int, db: Session = Depends(get_db)):
-    return listar_opcoes_troca(alocacao_id, db)
+def obter_opcoes_troca(alocacao_id: int, limit: Optional[int] = Query(None, ge=1, le=500), bloco: Optional[str] = None,
+                       andar: Optional[str] = None, only_free: bool = False, db: Session = Depends(get_db)):
+    return listar_opcoes_troca(alocacao_id, db, limit, bloco, andar, only_free)
 
 @app.put("/api/alocacao/{alocacao_id}/trocar", dependencies=[Depends(get_current_user)])
 def realizar_troca_manual(alocacao_id: int, req: TrocaSalaRequest, db: Session = Depends(get_db)):
@@ -222,8 +479,17 @@ def realizar_troca_manual(alocacao_id: int, req: TrocaSalaRequest, db: Session =
         
     raise HTTPException(400, "Erro desconhecido na troca")
 
+@app.post("/api/alocacao/trocas-em-lote", dependencies=[Depends(get_current_user)])
+def realizar_trocas_em_lote(req: TrocasEmLoteRequest, db: Session = Depends(get_db)):
+    """Vários movimentos (ex: fechamento de um andar) aplicados juntos ou nenhum."""
+    resultado = aplicar_movimentos_em_lote([(m.alocacao_id, m.nova_sala_id) for m in req.movimentos], db)
+    if not resultado["sucesso"]:
+        raise HTTPException(409, detail={"message": "Nenhum movimento aplicado", "erros": resultado["erros"]})
+    return {"message": "Trocas realizadas com sucesso", "movidas": resultado["movidas"], "ciclos_resolvidos": resultado["ciclos_resolvidos"]}
+
 @app.post("/api/grade/adicionar", dependencies=[Depends(get_current_user)])
 def adicionar_demanda_manual(demanda: NovaDemanda, db: Session = Depends(get_db)):
+    plano_gerado = db.query(Alocacao.id).first() is not None
     db.add(Grade(
         nome_profissional=demanda.medico_nome,
         especialidade=demanda.especialidade,
@@ -233,7 +499,41 @@ def adicionar_demanda_manual(demanda: NovaDemanda, db: Session = Depends(get_db)
         origem="GESTOR"
     ))
     db.commit()
-    return {"message": "OK"}
+    # Se já existe um plano, encaixa a nova grade refazendo só o seu turno
+    realocacao = realocar_buckets(db, {(demanda.dia_semana, demanda.turno)}) if plano_gerado else None
+    return {"message": "OK", "realocacao": realocacao}
+
+# --- Simulação (what-if): roda o alocador em memória, sem gravar nada ---
+@app.post("/api/cenarios/simular", dependencies=[Depends(get_current_user)])
+def simular(req: SimulacaoRequest, db: Session = Depends(get_db)):
+    for c in req.cenarios:
+        if c.modo not in MODOS_SOLVER: raise HTTPException(400, f"Modo inválido. Use um de: {', '.join(MODOS_SOLVER)}")
+    return simular_cenarios(db, [c.model_dump() for c in req.cenarios])
+
+# --- Horizonte datado (semanas à frente a partir do modelo semanal) ---
+@app.get("/api/horizonte", dependencies=[Depends(get_current_user)])
+def obter_horizonte(inicio: Optional[date] = None, semanas: Optional[int] = Query(None, ge=1, le=52), db: Session = Depends(get_db)):
+    return resumo_horizonte(db, inicio or get_data_atual(), semanas or settings.HORIZONTE_SEMANAS)
+
+@app.get("/api/horizonte/excecoes", dependencies=[Depends(get_current_user)])
+def obter_excecoes(inicio: Optional[date] = None, fim: Optional[date] = None, db: Session = Depends(get_db)):
+    return listar_excecoes(db, inicio or get_data_atual(), fim)
+
+@app.post("/api/horizonte/excecoes", dependencies=[Depends(get_current_user)])
+def registrar_excecao(req: ExcecaoDataRequest, db: Session = Depends(get_db)):
+    resultado = criar_excecao(db, req.model_dump())
+    if "erro" in resultado: raise HTTPException(400, resultado["erro"])
+    return resultado
+
+@app.delete("/api/horizonte/excecoes/{excecao_id}", dependencies=[Depends(get_current_user)])
+def excluir_excecao(excecao_id: int, db: Session = Depends(get_db)):
+    resultado = remover_excecao(db, excecao_id)
+    if "erro" in resultado: raise HTTPException(404, resultado["erro"])
+    return resultado
+
+@app.get("/api/horizonte/{data}", dependencies=[Depends(get_current_user)])
+def obter_plano_da_data(data: date, turno: Optional[str] = None, db: Session = Depends(get_db)):
+    return alocacoes_da_data(db, data, turno)
 
 # --- CHECK-IN / CHECK-OUT REAL ---
 
@@ -246,38 +546,33 @@ def realizar_checkin(dados: CheckInRequest, db: Session = Depends(get_db)):
     if not turno:
         raise HTTPException(400, "Fora do horário de funcionamento")
 
-    # Verifica se já está ocupada AGORA
-    ocupada = db.query(Alocacao).filter(
-        Alocacao.sala_id == dados.sala_id,
-        Alocacao.dia_semana == dia,
-        Alocacao.turno == turno
-    ).first()
-    
-    if ocupada:
-        raise HTTPException(409, "Sala já ocupada neste turno")
-
-    # Cria Grade Temporária para o Check-in
+    # Grade temporária + alocação numa única transação; a unicidade de
+    # (sala_id, dia_semana, turno) no banco decide quem fica com a sala
     nova_grade = Grade(
         nome_profissional=dados.medico_nome,
         especialidade=dados.especialidade,
         dia_semana=dia,
         turno=turno,
-        tipo_recurso="CHECKIN_APP",
+        tipo_recurso=TIPO_CHECKIN,
         origem="PORTAL_MEDICO"
     )
     db.add(nova_grade)
-    db.commit()
+    db.flush()
     
-    # Cria Alocação Efetiva
     nova_alocacao = Alocacao(
         sala_id=dados.sala_id,
         grade_id=nova_grade.id,
         dia_semana=dia,
         turno=turno,
-        score=2000 
+        score=SCORE_CHECKIN
     )
     db.add(nova_alocacao)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, "Sala já ocupada neste turno")
+    invalidar_ocupacao(dia, turno, modelo=False)
     
     return {"message": "Check-in realizado com sucesso", "alocacao_id": nova_alocacao.id}
 
@@ -296,9 +591,28 @@ def realizar_checkout(sala_id: str, db: Session = Depends(get_db)):
         # Tenta achar grade criada pelo portal para limpar
         raise HTTPException(404, "Nenhuma alocação ativa encontrada para liberar agora.")
         
+    # A grade de um check-in do portal só existia para esta reserva: sai junto
+    grade = db.query(Grade).filter(Grade.id == alocacao.grade_id, Grade.tipo_recurso == TIPO_CHECKIN).first()
     db.delete(alocacao)
+    if grade: db.delete(grade)
     db.commit()
+    # Liberar uma sala do modelo (grade que não veio do portal) muda o plano datado daquele turno
+    invalidar_ocupacao(dia, turno, modelo=grade is None)
     return {"message": "Sala liberada com sucesso"}
 
-@app.get("/api/alocacoes", dependencies=[Depends(get_current_user)])
-def listar_alocacoes_finais(db: Session = Depends(get_db)): return db.query(Alocacao).all()
\ No newline at end of file
+@app.get("/api/alocacoes", dependencies=[Depends(get_current_user)], response_model=List[AlocacaoResposta])
+async def listar_alocacoes_finais(request: Request, depois: Optional[int] = None, limit: int = Query(LIMITE_PAGINA_PADRAO, ge=1, le=LIMITE_PAGINA_MAX),
+                                  dia_semana: Optional[str] = None, turno: Optional[str] = None, bloco: Optional[str] = None,
+                                  andar: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    etag, nao_modificado = _versao_condicional(request)
+    if nao_modificado: return nao_modificado
+    filtros = []
+    if dia_semana is not None: filtros.append(Alocacao.dia_semana == dia_semana)
+    if turno is not None: filtros.append(Alocacao.turno == turno)
+    # Bloco/andar são da sala: subconsulta em vez de join, para a paginação seguir só por alocacoes.id
+    if bloco is not None or andar is not None:
+        salas = select(Sala.id)
+        if bloco is not None: salas = salas.where(Sala.bloco == bloco)
+        if andar is not None: salas = salas.where(Sala.andar == andar)
+        filtros.append(Alocacao.sala_id.in_(salas))
+    return await _pagina(db, Alocacao, AlocacaoResposta, Alocacao.id, filtros, depois, limit, _cabecalhos_versao(etag))
\ No newline at end of file
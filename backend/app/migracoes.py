@@ -0,0 +1,56 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Table, MetaData, select, text
+
+# Tabela de controle fora do Base para não depender dos modelos
+_metadata = MetaData()
+schema_versao = Table(
+    "schema_versao", _metadata,
+    Column("versao", Integer, primary_key=True),
+    Column("descricao", String),
+    Column("aplicada_em", String),
+)
+
+def _m001_indices_ocupacao(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_alocacoes_dia_turno ON alocacoes (dia_semana, turno)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_alocacoes_sala_dia_turno ON alocacoes (sala_id, dia_semana, turno)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_alocacoes_grade_id ON alocacoes (grade_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_grades_dia_turno ON grades (dia_semana, turno)"))
+
+def _m002_unicidade_sala_turno(conn):
+    # Remove reservas duplicadas deixadas por check-ins concorrentes (fica a mais antiga)
+    conn.execute(text(
+        "DELETE FROM alocacoes WHERE sala_id IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM alocacoes WHERE sala_id IS NOT NULL GROUP BY sala_id, dia_semana, turno)"
+    ))
+    # Grades de check-in órfãs (commit da grade sem a alocação)
+    conn.execute(text(
+        "DELETE FROM grades WHERE tipo_recurso = 'CHECKIN_APP' AND id NOT IN "
+        "(SELECT grade_id FROM alocacoes WHERE grade_id IS NOT NULL)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_alocacoes_sala_dia_turno"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_alocacoes_sala_dia_turno ON alocacoes (sala_id, dia_semana, turno)"))
+
+# Migrações em ordem; cada uma roda uma única vez por banco. Novas entram no fim da lista.
+MIGRACOES = [
+    (1, "Índices de ocupação em alocacoes e grades", _m001_indices_ocupacao),
+    (2, "Unicidade de (sala_id, dia_semana, turno) em alocacoes", _m002_unicidade_sala_turno),
+]
+
+def versao_atual(conn) -> int:
+    return conn.execute(select(schema_versao.c.versao).order_by(schema_versao.c.versao.desc())).scalar() or 0
+
+def aplicar_migracoes(engine) -> list:
+    """
+    Leva o banco até a última versão. `create_all` só cria tabelas novas e nunca
+    altera as existentes; mudanças de esquema em bancos já em uso passam por aqui.
+    Cada migração roda na sua própria transação junto com o registro da versão.
+    """
+    _metadata.create_all(bind=engine)
+    aplicadas = []
+    for versao, descricao, migrar in MIGRACOES:
+        with engine.begin() as conn:
+            if versao <= versao_atual(conn): continue
+            migrar(conn)
+            conn.execute(schema_versao.insert().values(versao=versao, descricao=descricao, aplicada_em=datetime.now().isoformat(timespec="seconds")))
+        aplicadas.append({"versao": versao, "descricao": descricao})
+    return aplicadas
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, JSON, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, JSON, ForeignKey, Enum, Index, Date, Float
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -49,6 +49,10 @@ class Grade(Base):
     turno = Column(String)
     origem = Column(String)
 
+    __table_args__ = (
+        Index("ix_grades_dia_turno", "dia_semana", "turno"),
+    )
+
 class Alocacao(Base):
     __tablename__ = "alocacoes"
     id = Column(Integer, primary_key=True, index=True)
@@ -56,4 +60,63 @@ class Alocacao(Base):
     grade_id = Column(Integer, ForeignKey("grades.id"))
     dia_semana = Column(String)
     turno = Column(String)
-    score = Column(Integer)
\ No newline at end of file
+    score = Column(Integer)
+
+    # Consultas quentes filtram por (dia, turno) e por sala dentro do turno
+    __table_args__ = (
+        Index("ix_alocacoes_dia_turno", "dia_semana", "turno"),
+        # Uma sala só pode ter uma alocação por turno (garante check-in sem corrida)
+        Index("uq_alocacoes_sala_dia_turno", "sala_id", "dia_semana", "turno", unique=True),
+        Index("ix_alocacoes_grade_id", "grade_id"),
+    )
+
+# --- Horizonte datado ---
+# A Alocacao semanal é o modelo de todas as datas; uma data só guarda o que
+# muda nela (ExcecaoData) e, para os turnos afetados, o plano refeito (AlocacaoData).
+
+class ExcecaoData(Base):
+    __tablename__ = "excecoes_data"
+    id = Column(Integer, primary_key=True, index=True)
+    data = Column(Date, nullable=False)
+    turno = Column(String, nullable=True)  # None = o dia todo
+    tipo = Column(String, nullable=False)  # FECHAMENTO, AUSENCIA, GRADE_EXTRA
+    sala_id = Column(String, ForeignKey("salas.id"), nullable=True)    # FECHAMENTO de uma sala (None = tudo fechado)
+    grade_id = Column(Integer, ForeignKey("grades.id"), nullable=True)  # AUSENCIA
+    nome_profissional = Column(String, nullable=True)                   # GRADE_EXTRA
+    especialidade = Column(String, nullable=True)                       # GRADE_EXTRA
+    motivo = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_excecoes_data_data", "data", "turno"),
+    )
+
+class AlocacaoData(Base):
+    __tablename__ = "alocacoes_data"
+    id = Column(Integer, primary_key=True, index=True)
+    data = Column(Date, nullable=False)
+    turno = Column(String, nullable=False)
+    sala_id = Column(String, ForeignKey("salas.id"))
+    grade_id = Column(Integer, ForeignKey("grades.id"), nullable=True)          # grade do modelo semanal
+    excecao_id = Column(Integer, ForeignKey("excecoes_data.id"), nullable=True)  # grade extra da data
+    score = Column(Integer)
+
+    __table_args__ = (
+        Index("ix_alocacoes_data_data_turno", "data", "turno"),
+        Index("uq_alocacoes_data_sala", "sala_id", "data", "turno", unique=True),
+    )
+
+class Usuario(Base):
+    __tablename__ = "usuarios"
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String, unique=True, index=True, nullable=False)
+    nome = Column(String)
+    senha_hash = Column(String, nullable=False) # bcrypt ($2b$...)
+    papel = Column(String, default="coordenador") # "admin" ou "coordenador"
+    ativo = Column(Boolean, default=True)
+    # Tokens emitidos antes disso (epoch) são recusados: desativação e troca de senha
+    tokens_validos_desde = Column(Float, default=0)
+
+class TokenRevogado(Base):
+    __tablename__ = "tokens_revogados"
+    jti = Column(String, primary_key=True)
+    expira_em = Column(Float, index=True) # exp do token (epoch); depois disso o registro pode sair
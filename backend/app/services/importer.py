@@ -1,10 +1,17 @@
 import pandas as pd
+import csv
 import os
 import re
+import time
+import resource
 import unicodedata
+from sqlalchemy import MetaData, Table, Column, String, select, insert, delete
 from app.models import Sala, Grade
 from app.database import SessionLocal
-from collections import defaultdict
+from app.core.persistencia import inserir_em_lote
+from app.core.cache_ocupacao import invalidar_ocupacao
+from collections import defaultdict, deque
+from functools import lru_cache
 
 def get_file_path(filename):
     possible_paths = [
@@ -24,80 +31,85 @@ def normalize_text(text):
     return text.upper().strip()
 
 # --- REGRAS DE MAPEAMENTO ---
-MAPPING_RULES = [
-    # Filtros
-    ("TELEMEDICINA", "IGNORAR"), ("TELEENFERMAGEM", "IGNORAR"), ("TELEFONOAUDIOLOGIA", "IGNORAR"),
-    ("TELENUTRICAO", "IGNORAR"), ("TELETERAPIA", "IGNORAR"), ("TELECONSULTA", "IGNORAR"),
-    ("TELE-TRIAGEM", "IGNORAR"), ("NAVEGACAO", "IGNORAR"),
-    
-    # Especialidades
-    ("BRONCOSCOPIA", "PNEUMOLOGIA"),
-    ("HEMODIALISE", "NEFROLOGIA"), ("TRANSPLANTE RENAL", "NEFROLOGIA"),
-    ("PALIATIVOS", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("PLASTICA", "PLASTICA"),
-    ("COLPOSCOPIA", "COLPOSCOPIA"), ("COLPO", "COLPOSCOPIA"),
-    ("PUERICULTURA", "PUERICULTURA"),
-    ("GASTROPEDIATRIA", "PEDIATRIA"), ("NEUROPEDIATRIA", "PEDIATRIA"), ("PEDIATRIA", "PEDIATRIA"),
-    ("ENDOMETRIOSE", "GINECOLOGIA/ OBSTETRICIA"), ("GESTACIONAL", "GINECOLOGIA/ OBSTETRICIA"),
-    ("MASTOLOGIA", "GINECOLOGIA/ OBSTETRICIA"), ("GINECOLOGIA", "GINECOLOGIA/ OBSTETRICIA"),
-    ("GINECO", "GINECOLOGIA/ OBSTETRICIA"), ("OBSTETRICIA", "GINECOLOGIA/ OBSTETRICIA"),
-    ("OBST", "GINECOLOGIA/ OBSTETRICIA"),
-    ("ESPACO TRANS", "ESPACO TRANS"),
-    ("TERAPIA FAMILIAR", "TERAPIA FAMILIAR"),
-    ("NEUROLOGIA", "NEUROLOGIA"), ("NEURO", "NEUROLOGIA"),
-    ("ENDOCRINOLOGIA", "ENDOCRINOLOGIA"), ("ENDOCRINO", "ENDOCRINOLOGIA"), ("OBESIDADE", "ENDOCRINOLOGIA"),
-    ("PRE OPERATORIO", "PRE OPERATORIO"), ("PRE-OPERATORIO", "PRE OPERATORIO"),
-    ("ANESTESIOLOGIA", "PRE OPERATORIO"), 
-    ("SALA DE VACINA", "SALA DE VACINA"), ("VACINA", "SALA DE VACINA"),
-    ("ONCOLOGIA", "ONCOLOGIA"), ("ONCO", "ONCOLOGIA"), ("QUIMIOTERAPIA", "ONCOLOGIA"),
-    ("FONOAUDIOLOGIA", "FONOAUDIOLOGIA"), ("FONO", "FONOAUDIOLOGIA"),
-    ("NEFROLOGIA", "NEFROLOGIA"), ("NEFRO", "NEFROLOGIA"),
-    ("ORTOPEDIA", "ORTOPEDIA"), ("ORTO", "ORTOPEDIA"),
-    ("CARDIOLOGIA", "CARDIOLOGIA"), ("CARDIO", "CARDIOLOGIA"),
-    ("HEMATOLOGIA", "HEMATOLOGIA"), ("HEMATO", "HEMATOLOGIA"),
-    ("PNEUMOLOGIA", "PNEUMOLOGIA"), ("PNEUMO", "PNEUMOLOGIA"),
-    ("UROLOGIA", "UROLOGIA"), ("URO", "UROLOGIA"),
-    ("DOENCAS INFECTO", "DOENCAS INFECTO CONTAGIOSAS- DIP"), ("DIP", "DOENCAS INFECTO CONTAGIOSAS- DIP"),
-    ("INFECTO", "DOENCAS INFECTO CONTAGIOSAS- DIP"),
-    ("VASCULAR", "VASCULAR"),
-    ("OTORRINO", "OTORRINO"),
-    ("OFTALMO", "OFTALMO"), ("OCULISTICA", "OFTALMO"), ("OCI - AVAL", "OFTALMO"),
-    ("PSIQUIATRIA", "PSIQUIATRIA"), ("SAUDE MENTAL", "PSIQUIATRIA"),
-    ("DERMATOLOGIA", "DERMATOLOGIA"), ("DERMATO", "DERMATOLOGIA"),
-    ("GASTRO", "GASTRO"), ("PROCTOLOGIA", "GASTRO"),
-    ("REUMATOLOGIA", "REUMATOLOGIA"), ("REUMATO", "REUMATOLOGIA"),
-    ("LUPUS", "REUMATOLOGIA"), ("GOTA", "REUMATOLOGIA"), ("ARTRITE", "REUMATOLOGIA"),
-    
-    # Apoio
-    ("ALERGIA", "PNEUMOLOGIA"), ("IMUNOLOGIA", "PNEUMOLOGIA"),
-    ("NUTRICAO", "ENDOCRINOLOGIA"), 
-    ("PSICOLOGIA", "PSIQUIATRIA"),
-    ("SERVICO SOCIAL", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("FISIOTERAPIA", "ORTOPEDIA"), 
-    ("EDUCACAO FISICA", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("BUCOMAXILOFACIAL", "OTORRINO"), ("ODONTOLOGIA", "CIRURGIA GERAL"), ("ESTOMATOLOGIA", "OTORRINO"),
-    ("TERAPIA OCUPACIONAL", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("MEDICINA DO TRABALHO", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("ACUPUNTURA", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("RADIOLOGIA", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("PESQUISA", "CLINICA MEDICA/ GERIATRIA/ DOR"), ("ESTOMIAS", "CIRURGIA GERAL"),
-
-    # Generalistas
-    ("CLINICA MEDICA", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("CLINICA GERAL", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("GERIATRIA", "CLINICA MEDICA/ GERIATRIA/ DOR"), ("DOR", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    ("HOSPITAL-DIA", "CLINICA MEDICA/ GERIATRIA/ DOR"), ("TRIAGEM", "CLINICA MEDICA/ GERIATRIA/ DOR"),
-    
-    # Genéricos
-    ("CIRURGIA GERAL", "CIRURGIA GERAL"), ("CIRURGIA", "CIRURGIA GERAL"),
-    ("ENFERMAGEM", "IGNORAR"), ("FARMACIA", "IGNORAR"),
-]
+# As regras ficam em data/regras_especialidades.csv (palavra_chave, especialidade, grupo).
+# A ordem do arquivo é a prioridade: vale a primeira regra cuja palavra aparece no texto.
+ARQUIVO_REGRAS = "regras_especialidades.csv"
+TAMANHO_CACHE_ESPECIALIDADES = 8192
+
+def carregar_regras_mapeamento(path=None):
+    path = path or get_file_path(ARQUIVO_REGRAS)
+    if not path: raise FileNotFoundError(f"Arquivo '{ARQUIVO_REGRAS}' não encontrado.")
+    with open(path, encoding="utf-8", newline="") as f:
+        return [(normalize_text(r['palavra_chave']), r['especialidade'].strip()) for r in csv.DictReader(f) if r.get('palavra_chave')]
+
+class AutomatoRegras:
+    """
+    Aho-Corasick sobre todas as palavras-chave. Numa única passada pelo texto
+    encontra a regra de menor índice presente, o que equivale ao laço
+    "primeira regra que casa" (ex: GASTROPEDIATRIA -> PEDIATRIA antes de GASTRO).
+    """
+    def __init__(self, regras):
+        self.alvos = [alvo for _, alvo in regras]
+        self.transicoes = [{}]
+        self.falha = [0]
+        self.melhor = [None]
+
+        for indice, (palavra, _) in enumerate(regras):
+            no = 0
+            for ch in palavra:
+                if ch not in self.transicoes[no]:
+                    self.transicoes.append({})
+                    self.falha.append(0)
+                    self.melhor.append(None)
+                    self.transicoes[no][ch] = len(self.transicoes) - 1
+                no = self.transicoes[no][ch]
+            if self.melhor[no] is None: self.melhor[no] = indice
+
+        # Links de falha em BFS; cada nó herda a melhor regra do seu sufixo
+        fila = deque(self.transicoes[0].values())
+        while fila:
+            no = fila.popleft()
+            for ch, filho in self.transicoes[no].items():
+                f = self.falha[no]
+                while f and ch not in self.transicoes[f]: f = self.falha[f]
+                destino = self.transicoes[f].get(ch, 0)
+                self.falha[filho] = destino if destino != filho else 0
+                self.melhor[filho] = self._menor(self.melhor[filho], self.melhor[self.falha[filho]])
+                fila.append(filho)
 
+    @staticmethod
+    def _menor(a, b):
+        if a is None: return b
+        if b is None: return a
+        return min(a, b)
+
+    def buscar(self, texto):
+        """Retorna o índice da regra de maior prioridade contida em `texto` (ou None)."""
+        melhor = self.melhor[0]
+        no = 0
+        for ch in texto:
+            while no and ch not in self.transicoes[no]: no = self.falha[no]
+            no = self.transicoes[no].get(ch, 0)
+            melhor = self._menor(melhor, self.melhor[no])
+            if melhor == 0: break
+        return melhor
+
+MAPPING_RULES = carregar_regras_mapeamento()
+_automato = AutomatoRegras(MAPPING_RULES)
+
+@lru_cache(maxsize=TAMANHO_CACHE_ESPECIALIDADES)
 def map_specialty(specialty_raw):
-    norm_spec = normalize_text(specialty_raw)
-    for keyword, target in MAPPING_RULES:
-        if keyword in norm_spec: return target
-    return "NAO MAPEADO"
+    indice = _automato.buscar(normalize_text(specialty_raw))
+    return _automato.alvos[indice] if indice is not None else "NAO MAPEADO"
+
+def recarregar_regras_mapeamento(path=None):
+    """Relê o arquivo de regras sem reiniciar a API e invalida o cache do map_specialty."""
+    global MAPPING_RULES, _automato
+    try: regras = carregar_regras_mapeamento(path)
+    except Exception as e: return {"erro": f"Erro ao ler regras: {str(e)}"}
+    MAPPING_RULES, _automato = regras, AutomatoRegras(regras)
+    map_specialty.cache_clear()
+    return {"status": "sucesso", "regras_carregadas": len(regras)}
 
 def extrair_bloco_e_andar(pavimento_raw):
     raw = normalize_text(pavimento_raw)
@@ -131,7 +143,7 @@ def importar_salas_csv():
     db = SessionLocal()
     try:
         db.query(Sala).delete()
-        salas_criadas = 0
+        linhas = []
         room_counters = defaultdict(int)
         
         for _, row in df.iterrows():
@@ -173,15 +185,14 @@ def importar_salas_csv():
                 room_counters[(bloco, andar)] += 1
                 sala_id = f"{bloco}{andar}-{room_counters[(bloco, andar)]:02d}"
                 
-                nova_sala = Sala(
+                linhas.append(dict(
                     id=sala_id, nome_visual=sala_id, bloco=bloco, andar=andar,
                     especialidade_preferencial=nome_clean, features=features, is_maintenance=is_obra
-                )
-                db.add(nova_sala)
-                salas_criadas += 1
+                ))
         
-        db.commit()
-        return {"status": "sucesso", "salas_importadas": salas_criadas}
+        escrita = inserir_em_lote(db, Sala, linhas)
+        invalidar_ocupacao()
+        return {"status": "sucesso", "salas_importadas": escrita["linhas"], "escrita": escrita}
     except Exception as e:
         db.rollback()
         return {"erro": f"Erro crítico salas: {str(e)}"}
@@ -199,10 +210,12 @@ def map_dia_semana(valor):
     except: pass
     return "IND"
 
+def localizar_csv_grades():
+    # grades.csv é onde fica o último upload importado (app/services/jobs.py): tem precedência
+    return get_file_path("grades.csv") or get_file_path("Grades 2.csv")
+
 def importar_grades_csv():
-    filename = "Grades 2.csv"
-    path = get_file_path(filename)
-    if not path: path = get_file_path("grades.csv")
+    path = localizar_csv_grades()
     if not path: return {"erro": "Arquivo de grades não encontrado"}
     
     try: 
@@ -224,7 +237,7 @@ def importar_grades_csv():
     db = SessionLocal()
     try:
         db.query(Grade).delete()
-        grades_criadas = 0
+        linhas = []
         for _, row in df.iterrows():
             raw_spec = str(row.get('nome_especialidade', ''))
             especialidade_mapeada = map_specialty(raw_spec)
@@ -242,17 +255,177 @@ def importar_grades_csv():
             vinculo = normalize_text(str(row.get('vinculo_descricao', '')))
             tipo = "RESIDENTE" if "RESIDENTE" in vinculo else "DOCENTE"
 
-            nova_grade = Grade(
+            linhas.append(dict(
                 nome_profissional=str(row.get('nome', 'Profissional')),
                 especialidade=especialidade_mapeada,
                 tipo_recurso=tipo, dia_semana=dia, turno=turno, origem="Grades2"
-            )
-            db.add(nova_grade)
-            grades_criadas += 1
+            ))
+        escrita = inserir_em_lote(db, Grade, linhas)
+        invalidar_ocupacao()
+        return {"status": "sucesso", "grades_importadas": escrita["linhas"], "escrita": escrita}
+    except Exception as e:
+        db.rollback()
+        return {"erro": str(e)}
+    finally:
+        db.close()
+
+# --- INGESTÃO EM CHUNKS (exports grandes do AGHU) ---
+TAMANHO_CHUNK_GRADES = 50000
+MAPA_DIAS = {2.0: "SEG", 3.0: "TER", 4.0: "QUA", 5.0: "QUI", 6.0: "SEX"}
+COLUNAS_CHAVE_GRADE = ['nome', 'dia_semana', 'turno']
+
+def como_texto(serie: pd.Series) -> pd.Series:
+    """str() de cada valor, como o import linha a linha: célula vazia vira 'nan' (no pandas 3 o astype(str) a deixa nula)."""
+    return serie.astype(object).fillna('nan').astype(str)
+
+def normalize_series(serie: pd.Series) -> pd.Series:
+    """Versão vetorizada de normalize_text (aplica str() antes, como o import linha a linha)."""
+    return (como_texto(serie).str.normalize('NFKD')
+            .str.encode('ascii', 'ignore').str.decode('ascii')
+            .str.upper().str.strip())
+
+def mapear_chunk_grades(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica os mesmos mapeamentos de importar_grades_csv coluna a coluna."""
+    def coluna(nome, padrao):
+        return df[nome] if nome in df.columns else pd.Series(padrao, index=df.index)
+
+    # map_specialty só roda uma vez por texto distinto do chunk
+    especialidades = como_texto(coluna('nome_especialidade', ''))
+    mapa_esp = {valor: map_specialty(valor) for valor in especialidades.unique()}
+    especialidade = especialidades.map(mapa_esp)
+
+    dia = pd.to_numeric(coluna('dia_semana', None), errors='coerce').map(MAPA_DIAS)
+
+    turno_norm = normalize_series(coluna('turno', ''))
+    turno = pd.Series("NOITE", index=df.index)
+    turno[turno_norm.str.contains("TARDE", regex=False)] = "TARDE"
+    turno[turno_norm.str.contains("MANHA", regex=False)] = "MANHA"
+
+    residente = normalize_series(coluna('vinculo_descricao', '')).str.contains("RESIDENTE", regex=False)
+
+    saida = pd.DataFrame({
+        "nome_profissional": como_texto(coluna('nome', 'Profissional')),
+        "especialidade": especialidade,
+        "tipo_recurso": residente.map({True: "RESIDENTE", False: "DOCENTE"}),
+        "dia_semana": dia,
+        "turno": turno,
+        "origem": "Grades2",
+    })
+    return saida[(saida['especialidade'] != "IGNORAR") & saida['dia_semana'].notna()]
+
+# Chaves já vistas na importação em andamento. Tabelas temporárias da conexão:
+# o conjunto de chaves fica no banco (em disco, indexado) e não na memória do processo.
+_metadados_importacao = MetaData()
+_chaves_vistas = Table("_importacao_chaves_vistas", _metadados_importacao,
+                       Column("chave", String, primary_key=True), prefixes=["TEMPORARY"])
+_chaves_chunk = Table("_importacao_chaves_chunk", _metadados_importacao,
+                      Column("chave", String, primary_key=True), prefixes=["TEMPORARY"])
+
+def _criar_tabelas_chaves(db):
+    conexao = db.connection()
+    for tabela in (_chaves_vistas, _chaves_chunk):
+        tabela.drop(conexao, checkfirst=True)
+        tabela.create(conexao)
+
+def _remover_tabelas_chaves(db):
+    try:
+        conexao = db.connection()
+        for tabela in (_chaves_vistas, _chaves_chunk): tabela.drop(conexao, checkfirst=True)
+        db.commit()
+    except Exception:
+        db.rollback()
+
+def _texto_chave(chaves: pd.DataFrame) -> pd.Series:
+    """Uma string por linha com os valores das colunas-chave (células vazias iguais entre si, como no drop_duplicates)."""
+    colunas = [chaves[c].astype(object).fillna('\0').astype(str) for c in chaves.columns]
+    return colunas[0].str.cat(colunas[1:], sep='\x1f') if len(colunas) > 1 else colunas[0]
+
+def _chaves_novas(db, chave: pd.Series) -> pd.Series:
+    """Máscara das linhas cuja chave ainda não apareceu (no chunk ou em chunks anteriores); registra as novas."""
+    primeira = ~chave.duplicated().to_numpy()
+    distintas = chave[primeira]
+    if distintas.empty: return primeira
+    db.execute(delete(_chaves_chunk))
+    db.execute(insert(_chaves_chunk), [{"chave": c} for c in distintas])
+    repetidas = {c for (c,) in db.execute(select(_chaves_chunk.c.chave).join(_chaves_vistas, _chaves_vistas.c.chave == _chaves_chunk.c.chave))}
+    novas = primeira & ~chave.isin(repetidas).to_numpy()
+    db.execute(insert(_chaves_vistas).from_select(
+        ["chave"], select(_chaves_chunk.c.chave).where(_chaves_chunk.c.chave.not_in(select(_chaves_vistas.c.chave)))))
+    return novas
+
+def _rss_atual_mb() -> float:
+    """RSS atual do processo (/proc/self/statm); 0 onde não houver /proc."""
+    try:
+        with open("/proc/self/statm") as f: paginas = int(f.read().split()[1])
+    except OSError:
+        return 0.0
+    return paginas * resource.getpagesize() / (1024 * 1024)
+
+def importar_grades_csv_streaming(path: str = None, tamanho_chunk: int = TAMANHO_CHUNK_GRADES, ao_progresso=None, cancelamento=None):
+    """
+    Importa as grades lendo o CSV em chunks: o uso de memória não cresce com o
+    tamanho do export. Duplicatas (nome, dia_semana, turno) são removidas também
+    entre chunks e cada chunk é gravado assim que processado, numa única transação.
+    `ao_progresso(linhas_lidas)` é chamado a cada chunk; se `cancelamento`
+    (threading.Event) for acionado, a transação é desfeita entre dois chunks.
+    """
+    path = path or localizar_csv_grades()
+    if not path: return {"erro": "Arquivo de grades não encontrado"}
+
+    inicio = time.perf_counter()
+    db = SessionLocal()
+    try:
+        db.query(Grade).delete()
+        _criar_tabelas_chaves(db)
+        rss_inicio = rss_pico = _rss_atual_mb()
+        lidas, gravadas, chunks = 0, 0, 0
+
+        for chunk in pd.read_csv(path, dtype=str, chunksize=tamanho_chunk):
+            if cancelamento is not None and cancelamento.is_set():
+                db.rollback()
+                return {"status": "cancelado", "linhas_lidas": lidas}
+            chunks += 1
+            lidas += len(chunk)
+
+            # filtro de grades ativas
+            if 'ativa' in chunk.columns:
+                chunk = chunk[chunk['ativa'].astype(str).str.upper().str.strip() == 'TRUE']
+
+            # remoção de duplicatas, inclusive contra chunks anteriores
+            if set(COLUNAS_CHAVE_GRADE).issubset(chunk.columns):
+                chaves = pd.DataFrame({
+                    'nome': chunk['nome'],
+                    # float sempre: um chunk só com inteiros daria '3' e outro com '3.0' para o mesmo dia
+                    'dia_semana': pd.to_numeric(chunk['dia_semana'], errors='coerce').astype(float),
+                    'turno': chunk['turno'],
+                })
+            else:
+                chaves = chunk
+            chunk = chunk[_chaves_novas(db, _texto_chave(chaves))]
+            rss_pico = max(rss_pico, _rss_atual_mb())
+
+            linhas = mapear_chunk_grades(chunk).to_dict('records')
+            gravadas += inserir_em_lote(db, Grade, linhas, commit=False)["linhas"]
+            if ao_progresso: ao_progresso(lidas)
+
         db.commit()
-        return {"status": "sucesso", "grades_importadas": grades_criadas}
+        invalidar_ocupacao()
+        duracao = time.perf_counter() - inicio
+        return {
+            "status": "sucesso", "grades_importadas": gravadas,
+            "ingestao": {
+                "linhas_lidas": lidas, "chunks": chunks,
+                "linhas_por_segundo": round(lidas / duracao, 1) if duracao else None,
+                "tempo_ms": round(duracao * 1000, 2),
+                # Quanto a RSS subiu durante esta importação (amostrada a cada chunk)
+                "rss_delta_mb": round(rss_pico - rss_inicio, 1),
+                # ru_maxrss é em KB no Linux; dentro da API é o pico do servidor desde a subida
+                "pico_rss_processo_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+            }
+        }
     except Exception as e:
         db.rollback()
         return {"erro": str(e)}
     finally:
-        db.close()
\ No newline at end of file
+        _remover_tabelas_chaves(db)
+        db.close()
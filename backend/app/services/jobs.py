@@ -0,0 +1,98 @@
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.core.config import settings
+from app.services.importer import importar_grades_csv_streaming
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
+# Destino do último upload importado com sucesso, onde /api/setup/importar-grades o encontra
+ARQUIVO_GRADES = os.path.join(DATA_DIR, "grades.csv")
+MAX_JOBS_GUARDADOS = 100
+
+# Estados possíveis de um job
+PENDENTE, EXECUTANDO, CONCLUIDO, ERRO, CANCELADO = "PENDENTE", "EXECUTANDO", "CONCLUIDO", "ERRO", "CANCELADO"
+
+_executor = ThreadPoolExecutor(max_workers=settings.IMPORT_WORKERS, thread_name_prefix="importacao")
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+def _agora():
+    return datetime.now().isoformat(timespec="seconds")
+
+def criar_arquivo_upload(job_id: str) -> str:
+    """Cada job grava num arquivo próprio, então uploads simultâneos não se sobrescrevem."""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f"grades_{job_id}_", suffix=".csv", dir=UPLOAD_DIR)
+    os.close(fd)
+    return path
+
+def novo_job_id() -> str:
+    return uuid.uuid4().hex
+
+def _executar(job_id: str):
+    with _lock:
+        job = _jobs[job_id]
+        if job["status"] == CANCELADO: return
+        job["status"], job["iniciado_em"] = EXECUTANDO, _agora()
+
+    def progresso(linhas):
+        job["linhas_processadas"] = linhas
+
+    status = ERRO
+    try:
+        resultado = importar_grades_csv_streaming(
+            job["_arquivo"], settings.IMPORT_CHUNK_SIZE, ao_progresso=progresso, cancelamento=job["_cancelamento"]
+        )
+        if resultado.get("status") == "cancelado": status = CANCELADO
+        elif "erro" in resultado: status = ERRO
+        else: status = CONCLUIDO
+    except Exception as e:
+        resultado, status = {"erro": str(e)}, ERRO
+    finally:
+        if os.path.exists(job["_arquivo"]):
+            if status == CONCLUIDO: os.replace(job["_arquivo"], ARQUIVO_GRADES)
+            else: os.remove(job["_arquivo"])
+
+    with _lock:
+        job["status"], job["resultado"], job["finalizado_em"] = status, resultado, _agora()
+
+def enfileirar_importacao_grades(job_id: str, arquivo: str, nome_original: str = None) -> dict:
+    with _lock:
+        # Descarta os jobs finalizados mais antigos para o registro não crescer sem limite
+        while len(_jobs) >= MAX_JOBS_GUARDADOS:
+            antigo = next((k for k, j in _jobs.items() if j["status"] not in (PENDENTE, EXECUTANDO)), None)
+            if antigo is None: break
+            del _jobs[antigo]
+
+        _jobs[job_id] = {
+            "job_id": job_id, "tipo": "importacao_grades", "arquivo_original": nome_original,
+            "status": PENDENTE, "linhas_processadas": 0, "resultado": None,
+            "criado_em": _agora(), "iniciado_em": None, "finalizado_em": None,
+            "_arquivo": arquivo, "_cancelamento": threading.Event(), "_future": None,
+        }
+        _jobs[job_id]["_future"] = _executor.submit(_executar, job_id)
+    return obter_job(job_id)
+
+def obter_job(job_id: str):
+    with _lock:
+        job = _jobs.get(job_id)
+        if not job: return None
+        return {k: v for k, v in job.items() if not k.startswith("_")}
+
+def cancelar_job(job_id: str):
+    """Job na fila é cancelado na hora; em execução para no próximo chunk (com rollback)."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if not job: return None
+        if job["status"] in (PENDENTE, EXECUTANDO):
+            job["_cancelamento"].set()
+            if job["_future"].cancel():
+                job["status"], job["finalizado_em"] = CANCELADO, _agora()
+                if os.path.exists(job["_arquivo"]): os.remove(job["_arquivo"])
+    return obter_job(job_id)
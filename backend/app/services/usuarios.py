@@ -0,0 +1,90 @@
+import time
+
+from sqlalchemy.orm import Session
+
+from app.models import Usuario, TokenRevogado
+from app.core.config import settings
+from app.core.security import (
+    gerar_hash_senha, LIMITE_SENHA_BYTES, definir_estado_revogacao, revogar_jti, revogar_usuario,
+)
+
+# Funções síncronas: as rotas que chamam rodam no threadpool, então o bcrypt
+# (gerar_hash_senha) nunca ocupa o event loop.
+PAPEIS = ("admin", "coordenador")
+
+def _publico(usuario: Usuario) -> dict:
+    return {"username": usuario.username, "nome": usuario.nome, "papel": usuario.papel, "ativo": usuario.ativo}
+
+def _validar_senha(senha: str):
+    if len(senha) < 8: return "A senha precisa de pelo menos 8 caracteres"
+    if len(senha.encode("utf-8")) > LIMITE_SENHA_BYTES: return f"A senha pode ter no máximo {LIMITE_SENHA_BYTES} bytes"
+    return None
+
+def garantir_admin_inicial(db: Session):
+    """Banco sem usuários: cria o administrador do .env (ADMIN_USERNAME/ADMIN_PASSWORD)."""
+    if db.query(Usuario.id).first() is not None: return
+    # Só o limite do bcrypt (o mínimo de 8 caracteres vale para quem é criado pela API)
+    tamanho = len(settings.ADMIN_PASSWORD.encode("utf-8"))
+    if tamanho > LIMITE_SENHA_BYTES:
+        raise RuntimeError(f"ADMIN_PASSWORD tem {tamanho} bytes; o bcrypt aceita no máximo {LIMITE_SENHA_BYTES}. Encurte-a no .env")
+    db.add(Usuario(username=settings.ADMIN_USERNAME, nome="Administrador", senha_hash=gerar_hash_senha(settings.ADMIN_PASSWORD), papel="admin"))
+    db.commit()
+
+def carregar_revogacoes(db: Session):
+    """Leva ao cache de tokens as revogações gravadas (e apaga as de tokens já expirados)."""
+    agora = time.time()
+    db.query(TokenRevogado).filter(TokenRevogado.expira_em < agora).delete(synchronize_session=False)
+    db.commit()
+    revogados = dict(db.query(TokenRevogado.jti, TokenRevogado.expira_em).all())
+    validos_desde = dict(db.query(Usuario.username, Usuario.tokens_validos_desde).filter(Usuario.tokens_validos_desde > 0).all())
+    definir_estado_revogacao(revogados, validos_desde)
+
+def listar_usuarios(db: Session):
+    return [_publico(u) for u in db.query(Usuario).order_by(Usuario.username).all()]
+
+def criar_usuario(db: Session, dados: dict):
+    if dados["papel"] not in PAPEIS: return {"erro": f"Papel inválido. Use um de: {', '.join(PAPEIS)}"}
+    erro = _validar_senha(dados["senha"])
+    if erro: return {"erro": erro}
+    if db.query(Usuario.id).filter(Usuario.username == dados["username"]).first() is not None:
+        return {"erro": "Usuário já existe"}
+    usuario = Usuario(username=dados["username"], nome=dados.get("nome"), senha_hash=gerar_hash_senha(dados["senha"]), papel=dados["papel"])
+    db.add(usuario)
+    db.commit()
+    return _publico(usuario)
+
+def atualizar_usuario(db: Session, username: str, dados: dict):
+    """Só os campos enviados mudam. Trocar a senha, o papel ou desativar derruba os tokens já emitidos."""
+    usuario = db.query(Usuario).filter(Usuario.username == username).first()
+    if not usuario: return {"erro": "Usuário não encontrado"}
+    if dados.get("papel") is not None and dados["papel"] not in PAPEIS: return {"erro": f"Papel inválido. Use um de: {', '.join(PAPEIS)}"}
+    if dados.get("senha") is not None:
+        erro = _validar_senha(dados["senha"])
+        if erro: return {"erro": erro}
+
+    # Não deixa o sistema sem nenhum administrador ativo
+    deixa_de_ser_admin = usuario.papel == "admin" and usuario.ativo and (dados.get("ativo") is False or dados.get("papel") not in (None, "admin"))
+    if deixa_de_ser_admin and db.query(Usuario.id).filter(Usuario.papel == "admin", Usuario.ativo == True, Usuario.id != usuario.id).first() is None:
+        return {"erro": "É preciso manter pelo menos um administrador ativo"}
+
+    derrubar_tokens = False
+    if dados.get("nome") is not None: usuario.nome = dados["nome"]
+    if dados.get("senha") is not None:
+        usuario.senha_hash = gerar_hash_senha(dados["senha"])
+        derrubar_tokens = True
+    if dados.get("papel") is not None and dados["papel"] != usuario.papel:
+        usuario.papel = dados["papel"]
+        derrubar_tokens = True
+    if dados.get("ativo") is not None and dados["ativo"] != usuario.ativo:
+        usuario.ativo = dados["ativo"]
+        derrubar_tokens = derrubar_tokens or not dados["ativo"]
+    if derrubar_tokens: usuario.tokens_validos_desde = time.time()
+    db.commit()
+    if derrubar_tokens: revogar_usuario(usuario.username, usuario.tokens_validos_desde)
+    return _publico(usuario)
+
+def revogar_token(db: Session, dados_token: dict):
+    """Logout: o jti fica recusado até o token expirar."""
+    db.merge(TokenRevogado(jti=dados_token["jti"], expira_em=dados_token["exp"]))
+    db.commit()
+    revogar_jti(dados_token["jti"], dados_token["exp"])
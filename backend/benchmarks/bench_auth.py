@@ -0,0 +1,98 @@
+"""
+Custo da autenticação: verificação do token por requisição (JWT decodificado
+a cada vez x cache de tokens verificados), sobrecarga numa rota protegida de
+ponta a ponta e atraso do event loop durante logins simultâneos (bcrypt no
+threadpool).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_auth [--requisicoes 2000] [--logins 4]
+
+Usa um SQLite temporário (o banco de desenvolvimento não é tocado).
+"""
+import os
+import tempfile
+
+_PASTA = tempfile.mkdtemp(prefix="gds_auth_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_PASTA}/auth.db"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+import argparse
+import asyncio
+import shutil
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import security
+from app.core.config import settings
+
+def por_chamada_us(funcao, n: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(n): funcao()
+    return (time.perf_counter() - inicio) * 1e6 / n
+
+def medir_verificacao(token: str, n: int):
+    def sem_cache():
+        security._verificados.clear()
+        assert security.verificar_token(token)
+    security.verificar_token(token)
+    com_cache = por_chamada_us(lambda: security.verificar_token(token), n)
+    print(f"verificar_token: JWT decodificado {por_chamada_us(sem_cache, n):7.1f} us | cache {com_cache:7.1f} us")
+
+def medir_rota(cliente: TestClient, token: str, n: int):
+    """Rota protegida barata (/api/admin/db/pool) contra a raiz sem autenticação."""
+    h = {"Authorization": f"Bearer {token}"}
+    livre = por_chamada_us(lambda: cliente.get("/"), n)
+    ttl = settings.TOKEN_CACHE_TTL_SEGUNDOS
+    settings.TOKEN_CACHE_TTL_SEGUNDOS = 0  # nada entra no cache: decodifica a cada requisição
+    security._verificados.clear()
+    sem_cache = por_chamada_us(lambda: cliente.get("/api/admin/db/pool", headers=h), n)
+    settings.TOKEN_CACHE_TTL_SEGUNDOS = ttl
+    com_cache = por_chamada_us(lambda: cliente.get("/api/admin/db/pool", headers=h), n)
+    print(f"requisição: sem autenticação {livre:7.0f} us | protegida sem cache {sem_cache:7.0f} us | protegida com cache {com_cache:7.0f} us")
+
+async def medir_logins(logins: int):
+    """Maior atraso de um timer de 10 ms do event loop enquanto `logins` logins rodam juntos."""
+    atrasos = []
+    parar = asyncio.Event()
+
+    async def relogio():
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.01)
+            atrasos.append((time.perf_counter() - inicio - 0.01) * 1000)
+
+    dados = {"username": settings.ADMIN_USERNAME, "password": settings.ADMIN_PASSWORD}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+        tarefa = asyncio.create_task(relogio())
+        inicio = time.perf_counter()
+        respostas = await asyncio.gather(*(cliente.post("/api/auth/login", data=dados) for _ in range(logins)))
+        total = (time.perf_counter() - inicio) * 1000
+        parar.set()
+        await tarefa
+    assert all(r.status_code == 200 for r in respostas)
+    print(f"{logins} logins simultâneos (bcrypt custo {settings.BCRYPT_ROUNDS}): {total:.0f} ms no total | "
+          f"atraso do event loop: máx {max(atrasos):.1f} ms, {len(atrasos)} ticks")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--logins", type=int, default=4)
+    args = parser.parse_args()
+    try:
+        with TestClient(app) as cliente:
+            resposta = cliente.post("/api/auth/login", data={"username": settings.ADMIN_USERNAME, "password": settings.ADMIN_PASSWORD})
+            token = resposta.json()["access_token"]
+            medir_verificacao(token, args.requisicoes)
+            medir_rota(cliente, token, args.requisicoes)
+        asyncio.run(medir_logins(args.logins))
+    finally:
+        shutil.rmtree(_PASTA, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Quanto a busca local (app/core/busca_local.py) melhora o guloso, por orçamento
+de tempo, comparado ao modo "otimo" como referência.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_busca_local [--escala 1] [--ocupacao 0.95] [--turnos 3] [--orcamentos 0.1 0.5 2]
+
+Gera salas como bench_matriz_score e, em cada turno, grades suficientes para
+ocupar a fração --ocupacao das salas (turnos cheios é onde o guloso erra).
+Confere que toda solução melhorada continua válida.
+"""
+import argparse
+import os
+import random
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from app.models import Grade
+from app.core.optimizer import calcular_score, calcular_zonas_preferenciais
+from app.core.matriz_score import alocar_gulosa
+from app.core.atribuicao import alocar_otima
+from app.core.busca_local import melhorar_alocacao
+from benchmarks.bench_matriz_score import gerar_dados, DIAS, TURNOS
+
+def gerar_turnos_cheios(salas, especialidades, n_turnos: int, ocupacao: float, seed: int = 5):
+    rnd = random.Random(seed)
+    turnos = [(d, t) for d in DIAS for t in TURNOS][:n_turnos]
+    grades = []
+    for dia, turno in turnos:
+        for _ in range(int(len(salas) * ocupacao)):
+            esp = rnd.randrange(len(especialidades))
+            grades.append(Grade(
+                especialidade_id=esp + 1 if rnd.random() < 0.5 else None, id=len(grades) + 1,
+                nome_profissional=f"PROFISSIONAL {len(grades):05d}", especialidade=especialidades[esp],
+                tipo_recurso=rnd.choice(["DOCENTE", "RESIDENTE"]), dia_semana=dia, turno=turno
+            ))
+    grades.sort(key=lambda x: (x.especialidade_id is None, x.tipo_recurso == 'RESIDENTE', x.nome_profissional))
+    return grades, turnos
+
+def nova_ocupacao(turnos):
+    ocupacao = {}
+    for dia, turno in turnos: ocupacao.setdefault(dia, {})[turno] = set()
+    return ocupacao
+
+def validar(alocadas, zona_pref):
+    usadas = set()
+    for grade, sala, score in alocadas:
+        chave = (sala.id, grade.dia_semana, grade.turno)
+        assert chave not in usadas, f"Sala repetida: {chave}"
+        usadas.add(chave)
+        assert score == calcular_score(grade, sala, zona_pref) > -1000, (grade.id, sala.id, score)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", type=int, default=1)
+    parser.add_argument("--ocupacao", type=float, default=0.95)
+    parser.add_argument("--turnos", type=int, default=3)
+    parser.add_argument("--orcamentos", type=float, nargs="+", default=[0.1, 0.5, 2.0])
+    args = parser.parse_args()
+
+    _, salas = gerar_dados(args.escala)
+    especialidades = sorted({s.especialidade_preferencial for s in salas})
+    grades, turnos = gerar_turnos_cheios(salas, especialidades, args.turnos, args.ocupacao)
+    zona_pref = calcular_zonas_preferenciais(salas)
+
+    alocadas, sem_sala = alocar_gulosa(grades, salas, zona_pref, nova_ocupacao(turnos))
+    otimas, sem_sala_otimo, _ = alocar_otima(grades, salas, zona_pref, nova_ocupacao(turnos))
+    score_guloso = sum(s for _, _, s in alocadas)
+
+    print(f"{len(salas)} salas, {len(grades)} grades em {len(turnos)} turnos")
+    print(f"  guloso            : score {score_guloso:>10} | conflitos {len(sem_sala):>4}")
+    print(f"  otimo (referência): score {sum(s for _, _, s in otimas):>10} | conflitos {len(sem_sala_otimo):>4}")
+    for orcamento in args.orcamentos:
+        melhores, restantes, est = melhorar_alocacao(salas, zona_pref, list(alocadas), list(sem_sala), orcamento)
+        validar(melhores, zona_pref)
+        assert len(melhores) + len(restantes) == len(alocadas) + len(sem_sala)
+        print(f"  busca local {orcamento:>5.1f}s: score {score_guloso + est['melhoria_score']:>10} | conflitos {len(restantes):>4} "
+              f"| +{est['melhoria_score']} em {est['movimentos']} movimentos, {est['conflitos_resolvidos']} conflitos resolvidos, "
+              f"{est['tempo_ms']:.0f} ms{' (orçamento esgotado)' if est['orcamento_esgotado'] else ''}")
+
+if __name__ == "__main__":
+    main()
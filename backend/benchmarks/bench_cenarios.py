@@ -0,0 +1,73 @@
+"""
+Simulação de cenários (app/core/cenarios.py): em sequência x em paralelo.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_cenarios [--escala 4] [--cenarios 8] [--modo guloso]
+
+Usa um SQLite temporário com os dados sintéticos de bench_matriz_score e gera o
+plano. Falha se o cenário sem alterações não reproduzir o plano gravado
+(delta zero) ou se a simulação escrever no banco.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Alocacao
+from app.core.optimizer import gerar_alocacao_grade
+from app.core.cenarios import simular_cenarios
+from app.core.pool_processos import iniciar_pool, encerrar_pool
+from benchmarks.bench_matriz_score import gerar_dados
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", type=int, default=4)
+    parser.add_argument("--cenarios", type=int, default=8)
+    parser.add_argument("--modo", default="guloso")
+    args = parser.parse_args()
+
+    # Como na API: o pool já está de pé quando a simulação chega
+    iniciar_pool().submit(int).result()
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{pasta}/bench.db")
+        Base.metadata.create_all(engine)
+        Sessao = sessionmaker(bind=engine)
+        with Sessao() as db:
+            grades, salas = gerar_dados(args.escala)
+            db.add_all(salas + grades)
+            db.commit()
+            gerar_alocacao_grade(db, args.modo)
+            antes = sorted(db.query(Alocacao.grade_id, Alocacao.sala_id).all())
+
+            # Conferência: sem alterações, o cenário reproduz o plano gravado
+            r = simular_cenarios(db, [{"nome": "sem alteracoes", "modo": args.modo}], max_workers=1)
+            delta = r["cenarios"][0]["delta"]
+            assert delta == {"score_total": 0, "total_alocadas": 0, "total_conflitos": 0}, delta
+
+            locais = sorted({(s.bloco, s.andar) for s in salas})
+            cenarios = [{"nome": f"fecha {b}{a}", "modo": args.modo, "locais_fechados": [{"bloco": b, "andar": a}]}
+                        for b, a in (locais * args.cenarios)[:args.cenarios]]
+            tempos = {}
+            for nome, workers in (("sequencial", 1), ("paralelo  ", None)):
+                inicio = time.perf_counter()
+                r = simular_cenarios(db, cenarios, max_workers=workers)
+                tempos[nome] = ((time.perf_counter() - inicio) * 1000, r["estatisticas"]["processos"])
+            assert sorted(db.query(Alocacao.grade_id, Alocacao.sala_id).all()) == antes, "simulação alterou o banco"
+    encerrar_pool()
+
+    print(f"{len(salas)} salas, {len(grades)} grades, {args.cenarios} cenários ({args.modo}), {os.cpu_count()} CPUs")
+    for nome, (ms, processos) in tempos.items():
+        print(f"  {nome}: {ms:8.1f} ms ({processos} processo(s))")
+    for c in r["cenarios"][:3]:
+        print(f"  {c['nome']}: delta score {c['delta']['score_total']:+d} | conflitos {c['delta']['total_conflitos']:+d}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Plano de execução e latência das consultas quentes de ocupação, antes e depois
+da migração de índices (app/migracoes.py).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_indices [--escala 10] [--repeticoes 200]
+
+Cria um SQLite temporário sem os índices (como um banco antigo), mede, aplica
+as migrações e mede de novo. Falha se alguma consulta continuar em SCAN.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from sqlalchemy import create_engine, insert, text
+
+from app.database import Base
+from app.models import Sala, Grade, Alocacao
+from app.migracoes import aplicar_migracoes
+
+DIAS = ["SEG", "TER", "QUA", "QUI", "SEX"]
+TURNOS = ["MANHA", "TARDE", "NOITE"]
+INDICES_NOVOS = ["ix_alocacoes_dia_turno", "ix_alocacoes_sala_dia_turno", "uq_alocacoes_sala_dia_turno", "ix_alocacoes_grade_id", "ix_grades_dia_turno"]
+
+# (nome, SQL, tabela/alias que precisa ser buscado por índice)
+CONSULTAS = [
+    ("checkin / checkout / troca manual", "SELECT id FROM alocacoes WHERE sala_id = :sala AND dia_semana = :dia AND turno = :turno LIMIT 1", "alocacoes"),
+    ("dashboard / opções de troca", "SELECT a.sala_id, g.nome_profissional FROM alocacoes a JOIN grades g ON a.grade_id = g.id WHERE a.dia_semana = :dia AND a.turno = :turno", "a"),
+    ("grades do turno", "SELECT id FROM grades WHERE dia_semana = :dia AND turno = :turno", "grades"),
+]
+
+def popular(engine, escala: int, seed: int = 7):
+    rnd = random.Random(seed)
+    n_salas, n_grades = 255 * escala, 1300 * escala
+    salas = [{"id": f"S{i:06d}", "nome_visual": f"S{i:06d}", "bloco": "E", "andar": "1", "features": [], "is_maintenance": False} for i in range(n_salas)]
+    grades = [{"id": i + 1, "nome_profissional": f"P{i}", "especialidade": "CARDIOLOGIA", "tipo_recurso": "DOCENTE",
+               "dia_semana": rnd.choice(DIAS), "turno": rnd.choice(TURNOS), "origem": "BENCH"} for i in range(n_grades)]
+    alocacoes = [{"sala_id": rnd.choice(salas)["id"], "grade_id": g["id"], "dia_semana": g["dia_semana"], "turno": g["turno"], "score": 0} for g in grades]
+    with engine.begin() as conn:
+        conn.execute(insert(Sala.__table__), salas)
+        conn.execute(insert(Grade.__table__), grades)
+        conn.execute(insert(Alocacao.__table__), alocacoes)
+    return [s["id"] for s in salas]
+
+def medir(engine, salas, repeticoes):
+    rnd = random.Random(1)
+    resultado = {}
+    with engine.connect() as conn:
+        for nome, sql, tabela in CONSULTAS:
+            params = {"sala": rnd.choice(salas), "dia": "SEG", "turno": "MANHA"}
+            plano = " / ".join(linha[-1] for linha in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params))
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                params["sala"] = rnd.choice(salas)
+                conn.execute(text(sql), params).fetchall()
+            media_ms = (time.perf_counter() - inicio) / repeticoes * 1000
+            resultado[nome] = (plano, media_ms, tabela)
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", type=int, default=10)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for indice in INDICES_NOVOS: conn.execute(text(f"DROP INDEX IF EXISTS {indice}"))
+        salas = popular(engine, args.escala)
+
+        antes = medir(engine, salas, args.repeticoes)
+        aplicadas = aplicar_migracoes(engine)
+        with engine.begin() as conn: conn.execute(text("ANALYZE"))
+        depois = medir(engine, salas, args.repeticoes)
+        engine.dispose()
+
+    print(f"Migrações aplicadas: {[m['versao'] for m in aplicadas]}")
+    for nome, _, tabela in CONSULTAS:
+        plano_a, ms_a, _ = antes[nome]
+        plano_d, ms_d, _ = depois[nome]
+        print(f"\n{nome}: {ms_a:.3f} ms -> {ms_d:.3f} ms ({ms_a / ms_d:.1f}x)")
+        print(f"  antes:  {plano_a}")
+        print(f"  depois: {plano_d}")
+        assert f"SEARCH {tabela} USING" in plano_d, f"{nome} não usa índice"
+
+if __name__ == "__main__":
+    main()
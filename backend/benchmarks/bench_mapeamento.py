@@ -0,0 +1,72 @@
+"""
+Benchmark e conferência do map_specialty compilado (Aho-Corasick + cache)
+contra a varredura linear original das regras.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_mapeamento [--repeticoes 20]
+
+Falha (AssertionError) se algum texto do export, ou dos casos de prioridade
+conhecidos, mapear diferente da varredura linear.
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+import pandas as pd
+
+from app.services.importer import MAPPING_RULES, map_specialty, normalize_text, localizar_csv_grades
+
+# Casos em que a ordem das regras decide o resultado
+CASOS_PRIORIDADE = {
+    "GASTROPEDIATRIA": "PEDIATRIA",
+    "Gastro Pediatria": "PEDIATRIA",
+    "NEUROPEDIATRIA - EPILEPSIA": "PEDIATRIA",
+    "TELEMEDICINA - CARDIOLOGIA": "IGNORAR",
+    "PRÉ-OPERATÓRIO ANESTESIOLOGIA": "PRE OPERATORIO",
+    "CIRURGIA VASCULAR": "VASCULAR",
+    "CIRURGIA PLÁSTICA": "PLASTICA",
+    "COLPOSCOPIA": "COLPOSCOPIA",
+    "ENDOCRINOLOGIA PEDIÁTRICA": "ENDOCRINOLOGIA",
+    "XYZ": "NAO MAPEADO",
+    "": "NAO MAPEADO",
+}
+
+def map_linear(specialty_raw):
+    norm_spec = normalize_text(specialty_raw)
+    for keyword, target in MAPPING_RULES:
+        if keyword in norm_spec: return target
+    return "NAO MAPEADO"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    for texto, esperado in CASOS_PRIORIDADE.items():
+        assert map_specialty(texto) == esperado == map_linear(texto), texto
+
+    textos = pd.read_csv(localizar_csv_grades(), dtype=str)['nome_especialidade'].astype(str).tolist()
+    for texto in set(textos):
+        assert map_specialty(texto) == map_linear(texto), texto
+
+    inicio = time.perf_counter()
+    for _ in range(args.repeticoes): [map_linear(t) for t in textos]
+    t_linear = time.perf_counter() - inicio
+
+    map_specialty.cache_clear()
+    inicio = time.perf_counter()
+    for _ in range(args.repeticoes): [map_specialty(t) for t in textos]
+    t_compilado = time.perf_counter() - inicio
+
+    total = len(textos) * args.repeticoes
+    print(f"{total} textos ({len(set(textos))} distintos), {len(MAPPING_RULES)} regras")
+    print(f"linear:    {t_linear:.3f}s ({total / t_linear:,.0f} textos/s)")
+    print(f"compilado: {t_compilado:.3f}s ({total / t_compilado:,.0f} textos/s) -> {t_linear / t_compilado:.1f}x")
+    print(f"cache: {map_specialty.cache_info()}")
+
+if __name__ == "__main__":
+    main()
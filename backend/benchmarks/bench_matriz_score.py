@@ -0,0 +1,106 @@
+"""
+Benchmark: laço aninhado com calcular_score x matriz de scores (alocar_gulosa).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_matriz_score [--escalas 1 10] [--repeticoes 3]
+
+Gera salas e grades sintéticas em memória com a mesma forma das importadas
+(255 salas / 126 grades na escala 1x) e confere que as duas versões produzem
+exatamente as mesmas alocações.
+"""
+import argparse
+import os
+import random
+import time
+
+# Settings exige estas variáveis; o benchmark não usa autenticação
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from app.models import Sala, Grade
+from app.core.optimizer import calcular_score, calcular_zonas_preferenciais, natural_sort_key
+from app.core.matriz_score import alocar_gulosa
+from app.services.importer import MAPPING_RULES
+
+SALAS_1X = 255
+GRADES_1X = 126
+DIAS = ["SEG", "TER", "QUA", "QUI", "SEX"]
+TURNOS = ["MANHA", "TARDE", "NOITE"]
+BLOCOS = ["E", "F", "C", "ANEXO"]
+
+def gerar_dados(escala: int, seed: int = 42):
+    rnd = random.Random(seed)
+    especialidades = sorted({alvo for _, alvo in MAPPING_RULES if alvo != "IGNORAR"})
+    salas = []
+    for i in range(SALAS_1X * escala):
+        bloco, andar = rnd.choice(BLOCOS), str(rnd.randint(0, 4))
+        features = ["MACA"] if rnd.random() < 0.3 else []
+        esp = rnd.randrange(len(especialidades))
+        salas.append(Sala(
+            especialidade_id=esp + 1 if rnd.random() < 0.5 else None,
+            id=f"{bloco}{andar}-{i:05d}", nome_visual=f"{bloco}{andar}-{i:05d}", bloco=bloco, andar=andar,
+            especialidade_preferencial=especialidades[esp], features=features, is_maintenance=False
+        ))
+    grades = []
+    for i in range(GRADES_1X * escala):
+        esp = rnd.randrange(len(especialidades))
+        grades.append(Grade(
+            especialidade_id=esp + 1 if rnd.random() < 0.5 else None,
+            id=i + 1, nome_profissional=f"PROFISSIONAL {i:05d}", especialidade=especialidades[esp],
+            tipo_recurso=rnd.choice(["DOCENTE", "RESIDENTE"]), dia_semana=rnd.choice(DIAS), turno=rnd.choice(TURNOS)
+        ))
+    grades.sort(key=lambda x: (x.especialidade_id is None, x.tipo_recurso == 'RESIDENTE', x.nome_profissional))
+    salas.sort(key=lambda s: (s.bloco, s.andar, natural_sort_key(s.id)))
+    return grades, salas
+
+def nova_ocupacao():
+    return {d: {t: set() for t in TURNOS} for d in DIAS}
+
+def alocar_laco(grades, salas, zona_pref, ocupacao):
+    """Implementação original (pares grade x sala em Python puro)."""
+    alocadas, sem_sala = [], []
+    for item in grades:
+        ocupadas = ocupacao[item.dia_semana][item.turno]
+        melhor_sala, melhor_score = None, -9999
+        for sala in salas:
+            if sala.id in ocupadas: continue
+            score = calcular_score(item, sala, zona_pref)
+            if score > melhor_score:
+                melhor_score, melhor_sala = score, sala
+        if melhor_sala and melhor_score > -1000:
+            alocadas.append((item, melhor_sala, melhor_score))
+            ocupadas.add(melhor_sala.id)
+        else:
+            sem_sala.append(item)
+    return alocadas, sem_sala
+
+def cronometrar(func, repeticoes, *args):
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func(*args, nova_ocupacao())
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def assinatura(resultado):
+    alocadas, sem_sala = resultado
+    return [(g.id, s.id, sc) for g, s, sc in alocadas], [g.id for g in sem_sala]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'escala':>6} {'salas':>7} {'grades':>7} {'laco (s)':>10} {'matriz (s)':>11} {'speedup':>8}")
+    for escala in args.escalas:
+        grades, salas = gerar_dados(escala)
+        zona_pref = calcular_zonas_preferenciais(salas)
+        t_laco, r_laco = cronometrar(alocar_laco, args.repeticoes, grades, salas, zona_pref)
+        t_matriz, r_matriz = cronometrar(alocar_gulosa, args.repeticoes, grades, salas, zona_pref)
+        assert assinatura(r_laco) == assinatura(r_matriz), f"Alocações divergentes na escala {escala}x"
+        print(f"{escala:>5}x {len(salas):>7} {len(grades):>7} {t_laco:>10.3f} {t_matriz:>11.3f} {t_laco / t_matriz:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
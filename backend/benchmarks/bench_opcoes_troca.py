@@ -0,0 +1,105 @@
+"""
+Latência das opções de troca manual: varredura completa com calcular_score
+(como era antes) x índice de ranking top-K (app/core/ranking_salas.py).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_opcoes_troca [--escala 4] [--consultas 200] [--limite 30]
+
+Usa um SQLite temporário com 255 x escala salas. Falha se o top-K do índice
+não tiver os mesmos scores (com bônus de zona) que calcular_score.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Sala, Grade, Alocacao
+from app.core.optimizer import gerar_alocacao_grade, listar_opcoes_troca, calcular_score, calcular_zonas_preferenciais
+
+DIAS = ["SEG", "TER", "QUA", "QUI", "SEX"]
+TURNOS = ["MANHA", "TARDE"]
+BLOCOS = ["A", "B", "C", "D", "E"]
+ESPECIALIDADES = ["CARDIOLOGIA", "PEDIATRIA", "ORTOPEDIA", "GINECOLOGIA", "OFTALMOLOGIA", "DERMATOLOGIA", "NEUROLOGIA", "GERIATRIA"]
+
+def popular(Sessao, escala: int, seed: int = 7):
+    rnd = random.Random(seed)
+    salas = [{"id": f"{b}{a}-{i:03d}", "nome_visual": f"{b}{a}-{i:03d}", "bloco": b, "andar": str(a), "especialidade_preferencial": rnd.choice(ESPECIALIDADES),
+              "features": ["maca"] if rnd.random() < 0.5 else [], "is_maintenance": rnd.random() < 0.03}
+             for b in BLOCOS for a in range(3) for i in range(17 * escala)]
+    grades = [{"nome_profissional": f"P{i}", "especialidade": rnd.choice(ESPECIALIDADES), "tipo_recurso": "DOCENTE",
+               "dia_semana": rnd.choice(DIAS), "turno": rnd.choice(TURNOS), "origem": "BENCH"} for i in range(len(salas) * 3)]
+    with Sessao() as db:
+        db.execute(insert(Sala.__table__), salas)
+        db.execute(insert(Grade.__table__), grades)
+        db.commit()
+        gerar_alocacao_grade(db)
+
+def opcoes_varredura(alocacao_id: int, db):
+    """Implementação anterior: todas as salas, calcular_score sem zona, ordenação completa."""
+    aloc = db.query(Alocacao).filter(Alocacao.id == alocacao_id).first()
+    grade = db.query(Grade).filter(Grade.id == aloc.grade_id).first()
+    mapa = {a.sala_id: g.nome_profissional for a, g in db.query(Alocacao, Grade).join(Grade).filter(Alocacao.dia_semana == aloc.dia_semana, Alocacao.turno == aloc.turno).all()}
+    opcoes = []
+    for sala in db.query(Sala).filter(Sala.is_maintenance == False).all():
+        ocupante = mapa.get(sala.id)
+        score = calcular_score(grade, sala, {})
+        opcoes.append({"sala_id": sala.id, "score": score, "recomendado": score > 0, "ocupada": bool(ocupante) and sala.id != aloc.sala_id})
+    opcoes.sort(key=lambda x: (not x['ocupada'], x['recomendado'], x['score']), reverse=True)
+    return opcoes
+
+def cronometrar(funcao, ids):
+    tempos = []
+    for alocacao_id in ids:
+        inicio = time.perf_counter()
+        funcao(alocacao_id)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return sum(tempos) / len(tempos), tempos[int(len(tempos) * 0.99) - 1]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", type=int, default=4)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--limite", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{pasta}/bench.db")
+        Base.metadata.create_all(engine)
+        Sessao = sessionmaker(bind=engine)
+        popular(Sessao, args.escala)
+
+        with Sessao() as db:
+            todas = [a for (a,) in db.query(Alocacao.id).all()]
+            ids = random.Random(3).choices(todas, k=args.consultas)
+            n_salas = db.query(Sala).count()
+
+            # Conferência: scores do top-K iguais a calcular_score com as zonas do otimizador
+            salas = db.query(Sala).filter(Sala.is_maintenance == False).all()
+            zona, por_id = calcular_zonas_preferenciais(salas), {s.id: s for s in salas}
+            for alocacao_id in ids[:20]:
+                grade = db.get(Grade, db.get(Alocacao, alocacao_id).grade_id)
+                top = listar_opcoes_troca(alocacao_id, db, args.limite)
+                assert len(top) == min(args.limite, len(salas)), len(top)
+                assert all(o["score"] == calcular_score(grade, por_id[o["sala_id"]], zona) for o in top)
+                livres = [o["score"] for o in top if not o["ocupada"]]
+                assert livres == sorted(livres, reverse=True)
+
+            antes = cronometrar(lambda i: opcoes_varredura(i, db), ids)
+            depois = cronometrar(lambda i: listar_opcoes_troca(i, db, args.limite), ids)
+
+    print(f"{n_salas} salas, {len(todas)} alocações, {args.consultas} consultas, top {args.limite}")
+    print(f"  varredura completa: média {antes[0]:7.2f} ms | p99 {antes[1]:7.2f} ms")
+    print(f"  índice top-K      : média {depois[0]:7.2f} ms | p99 {depois[1]:7.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Custo de serialização das listagens /api/salas e /api/alocacoes por 10 mil
+linhas: objetos ORM + jsonable_encoder + json.dumps (como era antes) x só as
+colunas do esquema de resposta + orjson (como é agora).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_serializacao [--linhas 10000] [--repeticoes 5]
+
+Usa um SQLite temporário. Falha se os dois caminhos não produzirem o mesmo
+conteúdo (nos campos do esquema).
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Sala, Alocacao
+from app.main import SalaResposta, AlocacaoResposta, RespostaJSONRapida
+
+def popular(Sessao, linhas: int):
+    salas = [{"id": f"E{i % 7}-{i:06d}", "nome_visual": f"E{i % 7}-{i:06d}", "bloco": "E", "andar": str(i % 7), "especialidade_preferencial": "PEDIATRIA",
+              "features": ["MACA"] if i % 3 == 0 else [], "is_maintenance": i % 50 == 0, "status_atual": "LIVRE"} for i in range(linhas)]
+    alocacoes = [{"sala_id": salas[i]["id"], "grade_id": i + 1, "dia_semana": "SEG", "turno": "MANHA", "score": 2000} for i in range(linhas)]
+    with Sessao() as db:
+        db.execute(insert(Sala.__table__), salas)
+        db.execute(insert(Alocacao.__table__), alocacoes)
+        db.commit()
+
+def antes(db, modelo):
+    """FastAPI sem response_model: objetos ORM pelo jsonable_encoder e JSONResponse (json.dumps)."""
+    inicio = time.perf_counter()
+    objetos = db.scalars(select(modelo)).all()
+    meio = time.perf_counter()
+    corpo = json.dumps(jsonable_encoder(objetos), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return corpo, meio - inicio, time.perf_counter() - meio
+
+def depois(db, modelo, esquema):
+    """Mesmo caminho de _pagina em app/main.py: colunas do esquema, dicts e orjson."""
+    nomes = list(esquema.model_fields)
+    inicio = time.perf_counter()
+    linhas = db.execute(select(*(getattr(modelo, n) for n in nomes)).order_by(getattr(modelo, "id"))).all()
+    meio = time.perf_counter()
+    corpo = RespostaJSONRapida([dict(zip(nomes, linha)) for linha in linhas]).body
+    return corpo, meio - inicio, time.perf_counter() - meio
+
+def medir(funcao, repeticoes):
+    consultas, serializacoes = [], []
+    for _ in range(repeticoes):
+        corpo, consulta, serializacao = funcao()
+        consultas.append(consulta * 1000)
+        serializacoes.append(serializacao * 1000)
+    return corpo, min(consultas), min(serializacoes)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, default=10000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    por_10k = 10000 / args.linhas
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{pasta}/bench.db")
+        Base.metadata.create_all(engine)
+        Sessao = sessionmaker(bind=engine)
+        popular(Sessao, args.linhas)
+
+        print(f"{args.linhas} linhas por listagem; tempos por 10 mil linhas (melhor de {args.repeticoes})")
+        for nome, modelo, esquema in (("/api/salas", Sala, SalaResposta), ("/api/alocacoes", Alocacao, AlocacaoResposta)):
+            with Sessao() as db:
+                corpo_antes, consulta_antes, ser_antes = medir(lambda: antes(db, modelo), args.repeticoes)
+            with Sessao() as db:
+                corpo_depois, consulta_depois, ser_depois = medir(lambda: depois(db, modelo, esquema), args.repeticoes)
+
+            # Conferência: mesmo conteúdo nos campos do esquema
+            campos = list(esquema.model_fields)
+            esperado = sorted(({k: item[k] for k in campos} for item in json.loads(corpo_antes)), key=lambda x: x["id"])
+            assert json.loads(corpo_depois) == esperado, f"{nome}: conteúdo diferente"
+
+            print(f"  {nome}")
+            print(f"    antes : consulta {consulta_antes * por_10k:7.1f} ms | serialização {ser_antes * por_10k:7.1f} ms | {len(corpo_antes) * por_10k / 1024:7.0f} KiB")
+            print(f"    depois: consulta {consulta_depois * por_10k:7.1f} ms | serialização {ser_depois * por_10k:7.1f} ms | {len(corpo_depois) * por_10k / 1024:7.0f} KiB")
+
+if __name__ == "__main__":
+    main()
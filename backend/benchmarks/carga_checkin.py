@@ -0,0 +1,54 @@
+"""
+Teste de carga: centenas de check-ins simultâneos disputando as mesmas salas.
+
+Uso (a partir de backend/, com a API rodando):
+    python -m benchmarks.carga_checkin [--url http://localhost:8000] [--salas 10] [--requisicoes 400]
+
+Cada sala deve aceitar exatamente um check-in no turno atual; os demais
+precisam receber 409. Ao final as salas usadas são liberadas via checkout.
+Sai com erro se houver qualquer reserva dupla.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--salas", type=int, default=10)
+    parser.add_argument("--requisicoes", type=int, default=400)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as cliente:
+        painel = (await cliente.get("/api/dashboard/agora")).json()
+        livres = [s["sala_id"] for s in painel["salas"] if s["status"] == "LIVRE"][:args.salas]
+        if len(livres) < args.salas: raise SystemExit("Salas livres insuficientes para o teste")
+
+        async def checkin(i):
+            sala = livres[i % len(livres)]
+            r = await cliente.post("/api/checkin", json={"medico_nome": f"CARGA {i}", "especialidade": "CARGA", "sala_id": sala})
+            return sala, r.status_code
+
+        inicio = time.perf_counter()
+        respostas = await asyncio.gather(*(checkin(i) for i in range(args.requisicoes)))
+        duracao = time.perf_counter() - inicio
+
+        sucessos = Counter(sala for sala, codigo in respostas if codigo == 200)
+        codigos = Counter(codigo for _, codigo in respostas)
+        painel = (await cliente.get("/api/dashboard/agora")).json()
+        ocupadas = {s["sala_id"] for s in painel["salas"] if s["status"] == "OCUPADA"}
+
+        for sala in livres: await cliente.post(f"/api/checkout/{sala}")
+
+    print(f"{args.requisicoes} check-ins em {duracao:.2f}s ({args.requisicoes / duracao:.0f} req/s) | códigos: {dict(codigos)}")
+    duplas = {sala: n for sala, n in sucessos.items() if n > 1}
+    assert not duplas, f"Reservas duplas: {duplas}"
+    assert set(sucessos) == set(livres) <= ocupadas, "Nem toda sala disputada terminou com exatamente um ocupante"
+    assert codigos[200] + codigos[409] == args.requisicoes, "Respostas diferentes de 200/409"
+    print(f"OK: {len(livres)} salas, uma reserva cada, {codigos[409]} conflitos devolvidos como 409")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""
+Latência do /api/dashboard/agora sob polling concorrente: caminho síncrono
+(threadpool + get_db, como era antes) x caminho assíncrono (get_async_db).
+
+Uso (a partir de backend/, com salas e grades importadas e alocação gerada):
+    python -m benchmarks.carga_dashboard [--clientes 40] [--rodadas 20] [--intervalo-ms 500] [--invalidar-ms 250]
+
+Sobe um uvicorn próprio (com uma rota síncrona extra só para comparação) e mede
+de fora, por HTTP. Cada cliente é uma TV consultando a cada --intervalo-ms
+(carga aberta: a próxima consulta sai no horário mesmo se a anterior atrasou). --invalidar-ms simula escritas (check-ins, trocas) com um
+check-in/checkout alternados numa sala livre nesse intervalo, o que invalida o snapshot de
+ocupação e força leituras do banco durante a carga.
+"""
+import os
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "admin")
+os.environ.setdefault("ADMIN_PASSWORD", "admin")
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from app.main import app
+from app.database import get_db
+from app.core.optimizer import obter_dashboard_tempo_real
+
+# Versão síncrona do endpoint, só para comparação
+@app.get("/_bench/dashboard-sync")
+def dashboard_sync(db: Session = Depends(get_db)):
+    return obter_dashboard_tempo_real(db)
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+async def medir(cliente, rota, clientes, rodadas, intervalo_ms, invalidar_ms, sala_livre):
+    latencias = []
+
+    async def escritor():
+        ocupada = False
+        try:
+            while True:
+                await asyncio.sleep(invalidar_ms / 1000)
+                if ocupada: await cliente.post(f"/api/checkout/{sala_livre}")
+                else: await cliente.post("/api/checkin", json={"medico_nome": "CARGA", "especialidade": "CARGA", "sala_id": sala_livre})
+                ocupada = not ocupada
+        finally:
+            if ocupada: await cliente.post(f"/api/checkout/{sala_livre}")
+
+    async def consulta():
+        inicio = time.perf_counter()
+        r = await cliente.get(rota)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        assert r.status_code == 200, r.status_code
+
+    async def poller(i):
+        # TVs defasadas entre si dentro do intervalo
+        await asyncio.sleep(intervalo_ms / 1000 * i / clientes)
+        pendentes = []
+        for _ in range(rodadas):
+            pendentes.append(asyncio.create_task(consulta()))
+            await asyncio.sleep(intervalo_ms / 1000)
+        await asyncio.gather(*pendentes)
+
+    tarefa_escritor = asyncio.create_task(escritor()) if invalidar_ms else None
+    inicio = time.perf_counter()
+    await asyncio.gather(*(poller(i) for i in range(clientes)))
+    duracao = time.perf_counter() - inicio
+    if tarefa_escritor:
+        tarefa_escritor.cancel()
+        await asyncio.gather(tarefa_escritor, return_exceptions=True)
+    return {"req_s": len(latencias) / duracao, "p50": percentil(latencias, 0.50), "p95": percentil(latencias, 0.95), "p99": percentil(latencias, 0.99)}
+
+async def aguardar_servidor(cliente):
+    for _ in range(100):
+        try:
+            await cliente.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise SystemExit("Servidor não subiu")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, default=40)
+    parser.add_argument("--rodadas", type=int, default=20)
+    parser.add_argument("--intervalo-ms", type=int, default=500)
+    parser.add_argument("--invalidar-ms", type=int, default=0)
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args()
+
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.carga_dashboard:app", "--port", str(args.porta), "--log-level", "warning"]
+    )
+    limites = httpx.Limits(max_connections=args.clientes, max_keepalive_connections=args.clientes)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.porta}", timeout=120, limits=limites) as cliente:
+            await aguardar_servidor(cliente)
+            # Aquecimento: conexões dos dois pools e snapshot em cache
+            for rota in ("/_bench/dashboard-sync", "/api/dashboard/agora"): await cliente.get(rota)
+            painel = (await cliente.get("/api/dashboard/agora")).json()
+            sala_livre = next(s["sala_id"] for s in painel["salas"] if s["status"] == "LIVRE")
+
+            print(f"{args.clientes} clientes x {args.rodadas} leituras a cada {args.intervalo_ms} ms{f' (invalidando a cada {args.invalidar_ms} ms)' if args.invalidar_ms else ''}")
+            for nome, rota in (("sincrono  ", "/_bench/dashboard-sync"), ("assincrono", "/api/dashboard/agora")):
+                r = await medir(cliente, rota, args.clientes, args.rodadas, args.intervalo_ms, args.invalidar_ms, sala_livre)
+                print(f"  {nome}: {r['req_s']:8.0f} req/s | p50 {r['p50']:7.1f} ms | p95 {r['p95']:7.1f} ms | p99 {r['p99']:7.1f} ms")
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+if __name__ == "__main__":
+    asyncio.run(main())
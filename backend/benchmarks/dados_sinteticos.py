@@ -0,0 +1,111 @@
+"""
+Gerador de CSVs sintéticos no formato dos exports do AGHU: as mesmas colunas
+que importar_salas_csv e importar_grades_csv leem, em múltiplos do HC.
+
+Na escala 1x o volume bate com os arquivos reais de data/: 34 linhas de
+salas (~255 salas) e ~5.500 linhas de grades de 21 profissionais (~126 grades
+depois da remoção de duplicatas). Cada escala multiplica linhas, salas e
+profissionais.
+
+Uso (a partir de backend/):
+    python -m benchmarks.dados_sinteticos --escala 10 --pasta /tmp/gds_10x
+"""
+import argparse
+import csv
+import os
+import random
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from app.services.importer import MAPPING_RULES
+
+LINHAS_SALAS_1X = 34
+SALAS_1X = 255
+LINHAS_GRADES_1X = 5466
+PROFISSIONAIS_1X = 21
+HORARIOS_POR_PROFISSIONAL = 7
+
+# Pavimentos como vêm na planilha de salas (texto livre; o importador extrai bloco e andar)
+PAVIMENTOS = (
+    ["1º pavimento (Térreo) Bloco E"] * 4 + ["2º pavimento Bloco E"] * 10 + ["3º pavimento Bloco E"] * 5
+    + ["2º pavimento Bloco F", "4º pavimento Bloco F", "6º pavimento Bloco C"] + ["3º pavimento Bloco F"] * 4
+    + ["5º pavimento Bloco F"] * 4 + ["6º pavimento Bloco F"] * 2 + ["1º pavimento (Térreo) Anexo"] * 2
+)
+OBSERVACOES = ["", "", "", "", "Precisa de macas ginecológicas", "Equipamentos especializados"]
+SUFIXOS = ["", " - ADULTO", " - INFANTIL", " - AMBULATORIO GERAL", " - RETORNO", " - NASE"]
+# Proporções do export real: dias 2..7 (7 é descartado), turnos e vínculos
+DIAS = [2.0, 3.0, 4.0, 5.0, 6.0, 7.0]
+PESOS_DIAS = [1077, 1077, 1074, 1109, 896, 15]
+TURNOS = ["MANHA", "TARDE", "NOITE"]
+PESOS_TURNOS = [3202, 1988, 277]
+VINCULOS = ["RJU - UFPE", "EBSERH - CLT", "TERCEIRIZADO", "RESIDENTE"]
+PESOS_VINCULOS = [5297, 168, 1, 1]
+
+def _palavras_chave():
+    """Palavras das regras de mapeamento: as mapeadas viram especialidades, as IGNORAR viram ruído."""
+    mapeadas = [palavra for palavra, alvo in MAPPING_RULES if alvo != "IGNORAR"]
+    ignoradas = [palavra for palavra, alvo in MAPPING_RULES if alvo == "IGNORAR"]
+    return mapeadas, ignoradas
+
+def _quantidades(total: int, partes: int, rnd: random.Random):
+    """Divide `total` salas em `partes` linhas (cada uma <= 60, o limite do importador)."""
+    cortes = sorted(rnd.sample(range(1, total), partes - 1))
+    quantidades = [b - a for a, b in zip([0] + cortes, cortes + [total])]
+    return [min(q, 60) for q in quantidades]
+
+def gerar_salas_csv(path: str, escala: int, seed: int = 42) -> int:
+    """Grava a planilha de salas. Retorna o número de salas descritas."""
+    rnd = random.Random(seed)
+    mapeadas, _ = _palavras_chave()
+    linhas = LINHAS_SALAS_1X * escala
+    quantidades = _quantidades(SALAS_1X * escala, linhas, rnd)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["Pavimento", "Nome do ambulatório", "Número de salas existestes", "Característica", "OBS"])
+        for i, qtd in enumerate(quantidades):
+            nome = "fechado para obra" if rnd.random() < 0.1 else rnd.choice(mapeadas).lower() + rnd.choice(SUFIXOS).lower()
+            caracteristica = "especializado" if rnd.random() < 0.15 else "clínicos"
+            escritor.writerow([PAVIMENTOS[i % len(PAVIMENTOS)], nome, qtd, caracteristica, rnd.choice(OBSERVACOES)])
+    return sum(quantidades)
+
+def gerar_grades_csv(path: str, escala: int, seed: int = 42) -> int:
+    """Grava o export de grades (inclui duplicatas, inativas e especialidades ignoradas). Retorna as linhas."""
+    rnd = random.Random(seed)
+    mapeadas, ignoradas = _palavras_chave()
+    # Cada profissional atende em poucos (dia, turno) fixos, como no export real
+    # (21 profissionais -> ~126 grades depois da remoção de duplicatas)
+    profissionais = []
+    for i in range(PROFISSIONAIS_1X * escala):
+        horarios = {(rnd.choices(DIAS, PESOS_DIAS)[0], rnd.choices(TURNOS, PESOS_TURNOS)[0]) for _ in range(HORARIOS_POR_PROFISSIONAL)}
+        profissionais.append((f"PROFISSIONAL SINTETICO {i:06d}", sorted(horarios)))
+    linhas = LINHAS_GRADES_1X * escala
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["nome", "nome_especialidade", "dia_semana", "turno", "vinculo_descricao", "ativa"])
+        for _ in range(linhas):
+            palavra = rnd.choice(ignoradas) if ignoradas and rnd.random() < 0.05 else rnd.choice(mapeadas)
+            nome, horarios = rnd.choice(profissionais)
+            dia, turno = rnd.choice(horarios)
+            escritor.writerow([
+                nome, palavra + rnd.choice(SUFIXOS), dia, turno,
+                rnd.choices(VINCULOS, PESOS_VINCULOS)[0], "FALSE" if rnd.random() < 0.02 else "TRUE",
+            ])
+    return linhas
+
+def gerar_pasta(pasta: str, escala: int, seed: int = 42) -> dict:
+    """Cria `pasta`/salas.csv e `pasta`/grades.csv (nomes que o importador procura em data/)."""
+    os.makedirs(pasta, exist_ok=True)
+    return {
+        "salas": gerar_salas_csv(os.path.join(pasta, "salas.csv"), escala, seed),
+        "linhas_grades": gerar_grades_csv(os.path.join(pasta, "grades.csv"), escala, seed),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", type=int, default=1)
+    parser.add_argument("--pasta", required=True)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(gerar_pasta(args.pasta, args.escala, args.seed))
@@ -0,0 +1,137 @@
+"""
+Raspador local do /metrics: resume latência, consultas SQL por requisição e
+fases do otimizador, e aponta rotas com muitas consultas (suspeita de N+1).
+
+Uso (a partir de backend/):
+    python -m benchmarks.raspar_metricas --url http://127.0.0.1:8000/metrics [--limite-sql 20]
+    python -m benchmarks.raspar_metricas --embutido [--escala 1] [--limite-sql 20]
+
+--url lê de uma API rodando nesta máquina (o /metrics só responde aos IPs de
+METRICAS_IPS_PERMITIDOS). --embutido sobe o app em processo com um banco
+temporário e dados sintéticos, percorre as rotas principais e raspa no fim.
+Sai com código 1 se alguma rota passar de --limite-sql consultas por requisição.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict
+
+LINHA = re.compile(r'^(?P<nome>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>.*)\})? (?P<valor>\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+def interpretar(texto: str) -> dict:
+    """Formato texto do Prometheus -> {nome: [(labels, valor)]}."""
+    series = defaultdict(list)
+    for linha in texto.splitlines():
+        if not linha or linha.startswith("#"): continue
+        m = LINHA.match(linha)
+        if not m: continue
+        labels = dict(LABEL.findall(m.group("labels") or ""))
+        series[m.group("nome")].append((labels, float(m.group("valor"))))
+    return series
+
+def _chave(labels, *ignorar):
+    return tuple(sorted((k, v) for k, v in labels.items() if k not in ignorar))
+
+def percentil_histograma(buckets: list, p: float):
+    """Limite superior do primeiro bucket que cobre a fração p (aproximação do Prometheus sem interpolação)."""
+    buckets = sorted(buckets, key=lambda b: float("inf") if b[0] == "+Inf" else float(b[0]))
+    total = buckets[-1][1] if buckets else 0
+    if not total: return 0.0
+    for limite, acumulado in buckets:
+        if acumulado >= total * p: return float("inf") if limite == "+Inf" else float(limite)
+    return float("inf")
+
+def histogramas(series: dict, nome: str, *ignorar) -> dict:
+    """{labels: {"count", "sum", "buckets"}} somando as séries que só diferem nos labels ignorados."""
+    saida = defaultdict(lambda: {"count": 0.0, "sum": 0.0, "buckets": defaultdict(float)})
+    for labels, valor in series.get(f"{nome}_count", []): saida[_chave(labels, *ignorar)]["count"] += valor
+    for labels, valor in series.get(f"{nome}_sum", []): saida[_chave(labels, *ignorar)]["sum"] += valor
+    for labels, valor in series.get(f"{nome}_bucket", []): saida[_chave(labels, "le", *ignorar)]["buckets"][labels["le"]] += valor
+    return saida
+
+def resumir(texto: str, limite_sql: float) -> list:
+    series = interpretar(texto)
+    latencia = histogramas(series, "gds_http_requisicao_segundos", "status")
+    consultas = histogramas(series, "gds_http_consultas_sql")
+    suspeitas = []
+
+    print(f"{'rota':<50} {'req':>6} {'média ms':>9} {'p95 ms':>8} {'sql/req':>8} {'sql p95':>8}")
+    for chave, lat in sorted(latencia.items(), key=lambda x: -x[1]["sum"]):
+        rotulos = dict(chave)
+        sql = consultas.get(chave, {"count": 0, "sum": 0, "buckets": {}})
+        media_sql = sql["sum"] / sql["count"] if sql["count"] else 0.0
+        p95 = percentil_histograma(list(lat["buckets"].items()), 0.95)
+        p95_sql = percentil_histograma(list(sql["buckets"].items()), 0.95)
+        alerta = media_sql > limite_sql
+        if alerta: suspeitas.append(f"{rotulos['metodo']} {rotulos['rota']}")
+        print(f"{rotulos['metodo'] + ' ' + rotulos['rota']:<50} {lat['count']:>6.0f} {lat['sum'] / lat['count'] * 1000:>9.1f} {p95 * 1000:>8.0f} "
+              f"{media_sql:>8.1f} {p95_sql:>8.0f}{'  <- N+1?' if alerta else ''}")
+
+    fases = histogramas(series, "gds_otimizador_fase_segundos")
+    if fases:
+        print(f"\n{'fase do otimizador':<50} {'vezes':>6} {'média ms':>9}")
+        for chave, h in sorted(fases.items()):
+            r = dict(chave)
+            print(f"{r['operacao'] + '/' + r.get('modo', '-') + ' ' + r['fase']:<50} {h['count']:>6.0f} {h['sum'] / h['count'] * 1000:>9.1f}")
+    return suspeitas
+
+def raspar_embutido(escala: int) -> str:
+    """Sobe o app em processo com banco temporário e dados sintéticos e exercita as rotas principais."""
+    pasta = tempfile.mkdtemp(prefix="gds_metricas_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{pasta}/metricas.db"
+    os.environ["ASYNC_DATABASE_URL"] = ""
+    for var in ("SECRET_KEY", "ADMIN_USERNAME", "ADMIN_PASSWORD"): os.environ.setdefault(var, "metricas")
+
+    from benchmarks.dados_sinteticos import gerar_pasta
+    gerar_pasta(os.path.join(pasta, "data"), escala)
+    os.chdir(pasta)  # importadores leem data/salas.csv e data/grades.csv
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.core.config import settings
+
+    with TestClient(app, client=("127.0.0.1", 50000)) as cliente:
+        token = cliente.post("/api/auth/login", data={"username": settings.ADMIN_USERNAME, "password": settings.ADMIN_PASSWORD}).json()["access_token"]
+        h = {"Authorization": f"Bearer {token}"}
+        cliente.post("/api/setup/importar-salas", headers=h)
+        cliente.post("/api/setup/importar-grades", headers=h)
+        cliente.post("/api/alocacao/gerar", headers=h)
+        alocacoes = cliente.get("/api/alocacoes", headers=h).json()
+        salas = cliente.get("/api/salas", headers=h).json()
+        for _ in range(5):
+            cliente.get("/api/alocacao/resumo", headers=h)
+            cliente.get("/api/alocacao/detalhes", headers=h)
+            cliente.get("/api/dashboard/agora")
+        for aloc in alocacoes[:10]:
+            cliente.get(f"/api/alocacao/{aloc['id']}/opcoes?limit=30", headers=h)
+        if salas:
+            cliente.put(f"/api/salas/{salas[0]['id']}", headers=h, json={"is_maintenance": True})
+            cliente.put(f"/api/salas/{salas[0]['id']}", headers=h, json={"is_maintenance": False})
+        return cliente.get("/metrics").text
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000/metrics")
+    parser.add_argument("--embutido", action="store_true")
+    parser.add_argument("--escala", type=int, default=1)
+    parser.add_argument("--limite-sql", type=float, default=20)
+    args = parser.parse_args()
+
+    if args.embutido:
+        texto = raspar_embutido(args.escala)
+    else:
+        import httpx
+        resposta = httpx.get(args.url, timeout=10)
+        resposta.raise_for_status()
+        texto = resposta.text
+
+    suspeitas = resumir(texto, args.limite_sql)
+    if suspeitas:
+        print(f"\nRotas acima de {args.limite_sql:g} consultas/requisição: {', '.join(suspeitas)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Suíte de benchmarks com dados sintéticos (benchmarks/dados_sinteticos.py) em
+1x, 10x e 100x o volume do HC.
+
+Uso (a partir de backend/):
+    python -m benchmarks.suite [--escalas 1 10] [--repeticoes 5] [--saida benchmarks/resultados.json]
+                               [--referencia benchmarks/referencia.json] [--tolerancia 0.3] [--piso-ms 5]
+                               [--atualizar-referencia]
+
+Mede os importadores (linha a linha e em chunks), gerar_alocacao_grade,
+obter_resumo_atual, o dashboard (montagem do snapshot e leitura em cache) e
+listar_opcoes_troca, sempre num SQLite temporário (o banco de desenvolvimento
+não é tocado). Os resultados (mediana de --repeticoes) vão para --saida em JSON.
+
+Com uma referência, cada operação que ficou mais de --tolerancia mais lenta (e
+mais de --piso-ms em valor absoluto, para não acusar ruído em operações de
+microssegundos) é listada como regressão e o processo sai com código 1.
+--atualizar-referencia grava os resultados atuais como nova referência, para
+a mudança de desempenho aparecer no diff da revisão. 100x leva dezenas de
+segundos por repetição.
+"""
+import os
+import shutil
+import tempfile
+
+# Banco temporário antes de importar o app: os importadores apagam as tabelas
+_PASTA = tempfile.mkdtemp(prefix="gds_suite_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_PASTA}/suite.db"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_USERNAME", "benchmark")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from app.database import engine, Base, SessionLocal
+from app.migracoes import aplicar_migracoes
+from app.models import Sala, Grade, Alocacao
+from app.services.importer import importar_salas_csv, importar_grades_csv, importar_grades_csv_streaming
+from app.core.config import settings
+from app.core.cache_ocupacao import invalidar_ocupacao
+from app.core.ranking_salas import invalidar_indice
+from app.core.optimizer import (
+    gerar_alocacao_grade, obter_resumo_atual, obter_dashboard_tempo_real, montar_ocupacao,
+    listar_opcoes_troca, montar_indice_ranking,
+)
+from benchmarks.dados_sinteticos import gerar_pasta
+
+ESCALAS = (1, 10, 100)
+
+def cronometrar(funcao, repeticoes: int, lote: int = 1, aquecer: bool = False) -> dict:
+    """
+    Mediana/mínimo de `repeticoes` execuções; com `lote`, cada uma roda a função
+    `lote` vezes e divide. `aquecer` descarta uma execução antes (leituras: cache
+    de páginas do SQLite, checkpoint do WAL logo depois das escritas).
+    """
+    if aquecer: funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(lote): funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000 / lote)
+    return {"mediana_ms": round(statistics.median(tempos), 3), "min_ms": round(min(tempos), 3), "repeticoes": repeticoes, "lote": lote}
+
+def _sem_erro(resultado):
+    if isinstance(resultado, dict) and "erro" in resultado: raise SystemExit(f"Falha no benchmark: {resultado['erro']}")
+    return resultado
+
+def medir_escala(escala: int, repeticoes: int, consultas: int) -> dict:
+    raiz = os.path.join(_PASTA, f"{escala}x")
+    # Os importadores procuram data/salas.csv e data/grades.csv a partir do diretório atual
+    gerados = gerar_pasta(os.path.join(raiz, "data"), escala)
+    origem = os.getcwd()
+    os.chdir(raiz)
+    try:
+        operacoes = {}
+        print(f"[{escala}x] importadores...", flush=True)
+        operacoes["importar_salas_csv"] = cronometrar(lambda: _sem_erro(importar_salas_csv()), repeticoes)
+        operacoes["importar_grades_csv"] = cronometrar(lambda: _sem_erro(importar_grades_csv()), repeticoes)
+        operacoes["importar_grades_csv_streaming"] = cronometrar(
+            lambda: _sem_erro(importar_grades_csv_streaming(os.path.join("data", "grades.csv"), settings.IMPORT_CHUNK_SIZE)), repeticoes)
+    finally:
+        os.chdir(origem)
+
+    with SessionLocal() as db:
+        print(f"[{escala}x] alocação e leituras...", flush=True)
+        operacoes["gerar_alocacao_grade"] = cronometrar(lambda: gerar_alocacao_grade(db), repeticoes)
+        operacoes["obter_resumo_atual"] = cronometrar(lambda: obter_resumo_atual(db), repeticoes, aquecer=True)
+
+        # Dashboard: montagem do snapshot num turno cheio (caminho sem cache) e leitura já em cache
+        dia, turno = db.query(Alocacao.dia_semana, Alocacao.turno).filter(Alocacao.dia_semana == "SEG").first() or ("SEG", "MANHA")
+        operacoes["dashboard_montagem"] = cronometrar(lambda: montar_ocupacao(db, dia, turno), repeticoes, aquecer=True)
+        invalidar_ocupacao()
+        obter_dashboard_tempo_real(db)
+        operacoes["obter_dashboard_tempo_real"] = cronometrar(lambda: obter_dashboard_tempo_real(db), repeticoes, lote=200)
+
+        # Opções de troca: montagem do índice e consultas top-30 com o índice pronto
+        operacoes["montar_indice_ranking"] = cronometrar(lambda: montar_indice_ranking(db), repeticoes, aquecer=True)
+        ids = [i for (i,) in db.query(Alocacao.id).all()]
+        amostra = random.Random(3).choices(ids, k=consultas) if ids else []
+        invalidar_indice()
+        if amostra: listar_opcoes_troca(amostra[0], db, 30)
+        fila = iter(amostra * repeticoes)
+        if amostra: operacoes["listar_opcoes_troca"] = cronometrar(lambda: listar_opcoes_troca(next(fila), db, 30), repeticoes, lote=len(amostra))
+
+        dados = {"salas_csv": gerados["salas"], "linhas_grades_csv": gerados["linhas_grades"],
+                 "salas": db.query(Sala).count(), "grades": db.query(Grade).count(), "alocacoes": len(ids)}
+    return {"dados": dados, "operacoes": operacoes}
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def comparar(atual: dict, referencia: dict, tolerancia: float, piso_ms: float) -> list:
+    """Lista as operações mais lentas que a referência além da tolerância (relativa e absoluta)."""
+    regressoes = []
+    print(f"\n{'escala':>6} {'operação':<32} {'referência':>12} {'atual':>12} {'variação':>9}")
+    for escala, medidas in atual["escalas"].items():
+        base = referencia.get("escalas", {}).get(escala, {}).get("operacoes", {})
+        for nome, medida in medidas["operacoes"].items():
+            ref = base.get(nome)
+            if not ref:
+                print(f"{escala:>5}x {nome:<32} {'-':>12} {medida['mediana_ms']:>10.3f}ms {'novo':>9}")
+                continue
+            variacao = medida["mediana_ms"] / ref["mediana_ms"] - 1 if ref["mediana_ms"] else 0.0
+            regressao = variacao > tolerancia and medida["mediana_ms"] - ref["mediana_ms"] > piso_ms
+            if regressao: regressoes.append({"escala": escala, "operacao": nome, "referencia_ms": ref["mediana_ms"], "atual_ms": medida["mediana_ms"], "variacao": round(variacao, 3)})
+            print(f"{escala:>5}x {nome:<32} {ref['mediana_ms']:>10.3f}ms {medida['mediana_ms']:>10.3f}ms {variacao:>+8.1%}{'  REGRESSÃO' if regressao else ''}")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10], choices=ESCALAS)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--consultas", type=int, default=50, help="consultas de listar_opcoes_troca por repetição")
+    parser.add_argument("--saida", default="benchmarks/resultados.json")
+    parser.add_argument("--referencia", default="benchmarks/referencia.json")
+    parser.add_argument("--tolerancia", type=float, default=0.3, help="fração de piora aceita (0.3 = 30%%)")
+    parser.add_argument("--piso-ms", type=float, default=5.0, help="piora absoluta mínima para contar como regressão")
+    parser.add_argument("--atualizar-referencia", action="store_true")
+    args = parser.parse_args()
+    saida, referencia = os.path.abspath(args.saida), os.path.abspath(args.referencia)
+
+    try:
+        Base.metadata.create_all(bind=engine)
+        aplicar_migracoes(engine)
+        resultado = {
+            "gerado_em": datetime.now().isoformat(timespec="seconds"), "commit": _commit_atual(),
+            "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+            "repeticoes": args.repeticoes, "escalas": {},
+        }
+        for escala in args.escalas:
+            resultado["escalas"][str(escala)] = medir_escala(escala, args.repeticoes, args.consultas)
+    finally:
+        engine.dispose()
+        shutil.rmtree(_PASTA, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(saida), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f: json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Resultados em {saida}")
+
+    if args.atualizar_referencia:
+        shutil.copyfile(saida, referencia)
+        print(f"Referência atualizada: {referencia}")
+        return
+    if not os.path.exists(referencia):
+        print("Sem referência para comparar (use --atualizar-referencia para criar uma)")
+        return
+    with open(referencia, encoding="utf-8") as f: base = json.load(f)
+    if base.get("ambiente", {}).get("cpus") != resultado["ambiente"]["cpus"]:
+        print(f"Aviso: referência medida em outra máquina ({base.get('ambiente')})")
+    regressoes = comparar(resultado, base, args.tolerancia, args.piso_ms)
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%} (e {args.piso_ms} ms)")
+        sys.exit(1)
+    print("\nSem regressões")
+
+if __name__ == "__main__":
+    main()
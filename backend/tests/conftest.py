@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Configuração mínima antes de importar o app: banco temporário, nunca o de desenvolvimento
+os.environ.setdefault("SECRET_KEY", "testes")
+os.environ.setdefault("ADMIN_USERNAME", "testes")
+os.environ.setdefault("ADMIN_PASSWORD", "testes123")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='gds_testes_')}/testes.db"
+os.environ["ASYNC_DATABASE_URL"] = ""
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core.atribuicao import resolver_bucket, alocar_otima, LIMITE_VIAVEL
+from app.core.matriz_score import alocar_gulosa, SCORE_BLOQUEADO
+
+def _gulosa_matriz(scores: np.ndarray):
+    """Mesma regra do alocar_gulosa sobre a matriz: cada linha, na ordem, pega a coluna livre de maior score."""
+    livres = np.ones(scores.shape[1], dtype=bool)
+    pares = []
+    for i in range(scores.shape[0]):
+        if not livres.any(): break
+        linha = np.where(livres, scores[i], SCORE_BLOQUEADO)
+        j = int(np.argmax(linha))
+        if linha[j] > LIMITE_VIAVEL:
+            pares.append((i, j))
+            livres[j] = False
+    return pares
+
+CASOS = [
+    [[-400, -5000]],
+    [[-100, -2000], [-100, -100]],
+    [[-100, -100, -2000], [-100, -100, -2000]],
+    [[2000, -100], [1500, -300], [-999, 500]],
+    [[-999, -999], [-998, -5000]],
+    [[300, -300, -10000], [-2000, -100, 500], [-100, -100, -100], [-5000, -5000, -5000]],
+]
+
+def _checar(scores: np.ndarray):
+    linhas, colunas, _ = resolver_bucket(scores)
+    assert len(set(linhas.tolist())) == len(linhas) and len(set(colunas.tolist())) == len(colunas)
+    assert (scores[linhas, colunas] > LIMITE_VIAVEL).all()
+    gulosa = _gulosa_matriz(scores)
+    assert len(linhas) >= len(gulosa)
+    if len(linhas) == len(gulosa):
+        assert int(scores[linhas, colunas].sum()) >= sum(int(scores[i, j]) for i, j in gulosa)
+
+@pytest.mark.parametrize("scores", CASOS)
+def test_otimo_nunca_aloca_menos_que_o_guloso(scores):
+    _checar(np.array(scores, dtype=np.int32))
+
+def test_scores_negativos_viaveis_sao_alocados():
+    linhas, colunas, _ = resolver_bucket(np.array([[-400, -5000]]))
+    assert list(zip(linhas.tolist(), colunas.tolist())) == [(0, 0)]
+    linhas, _, _ = resolver_bucket(np.array([[-100, -2000], [-100, -100]]))
+    assert len(linhas) == 2
+
+def test_matrizes_aleatorias_com_sinais_mistos():
+    gerador = np.random.default_rng(7)
+    valores = np.array([-10000, -5000, -2000, -999, -300, -100, 0, 200, 500, 1500, 2000])
+    for _ in range(300):
+        forma = tuple(gerador.integers(1, 7, size=2))
+        _checar(gerador.choice(valores, size=forma).astype(np.int32))
+
+def _sala(id, features):
+    return SimpleNamespace(id=id, especialidade_id=None, especialidade_preferencial="", bloco="B", andar="2",
+                           features=features, is_maintenance=False)
+
+def test_ginecologia_em_salas_com_maca_fora_da_zona():
+    grades = [SimpleNamespace(id=i, especialidade="GINECOLOGIA", especialidade_id=None, dia_semana="SEG", turno="MANHA")
+              for i in range(2)]
+    salas = [_sala("M1", ["maca"]), _sala("M2", ["maca"]), _sala("S1", [])]
+    zona = {"GINECOLOGIA": ("A", "1")}
+
+    gulosa, _ = alocar_gulosa(grades, salas, zona, {"SEG": {"MANHA": set()}})
+    otima, sem_sala, _ = alocar_otima(grades, salas, zona, {"SEG": {"MANHA": set()}}, max_workers=1)
+    assert len(gulosa) == 2
+    assert len(otima) == 2 and not sem_sala
+    assert {sala.id for _, sala, _ in otima} == {"M1", "M2"}
+    assert sum(s for _, _, s in otima) >= sum(s for _, _, s in gulosa)
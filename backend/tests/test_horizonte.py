@@ -0,0 +1,15 @@
+from app.core import horizonte
+from app.core.cache_ocupacao import invalidar_ocupacao
+
+def test_so_mudancas_do_modelo_refazem_o_plano_datado(monkeypatch):
+    agendadas = []
+    monkeypatch.setattr(horizonte, "agendar_sincronizacao", lambda: agendadas.append(True))
+    monkeypatch.setattr(horizonte, "_pendentes", set())
+
+    invalidar_ocupacao("SEG", "MANHA", modelo=False)  # check-in/out do portal
+    assert horizonte._pendentes == set() and not agendadas
+
+    invalidar_ocupacao("TER", "TARDE")  # troca, realocação
+    invalidar_ocupacao()  # salas, grades, geração
+    assert horizonte._pendentes == {("TER", "TARDE"), None}
+    assert len(agendadas) == 2
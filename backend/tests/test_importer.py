@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.services.importer import mapear_chunk_grades, map_specialty, map_dia_semana, normalize_text
+
+def _linha_a_linha(df: pd.DataFrame):
+    """Regras do import original (iterrows + str() em cada célula)."""
+    saida = []
+    for _, row in df.iterrows():
+        especialidade = map_specialty(str(row.get('nome_especialidade', '')))
+        if especialidade == "IGNORAR": continue
+        dia = map_dia_semana(row.get('dia_semana'))
+        if dia == "IND": continue
+        turno = normalize_text(str(row.get('turno', '')))
+        turno = "MANHA" if "MANHA" in turno else "TARDE" if "TARDE" in turno else "NOITE"
+        vinculo = normalize_text(str(row.get('vinculo_descricao', '')))
+        saida.append((str(row.get('nome', 'Profissional')), especialidade,
+                      "RESIDENTE" if "RESIDENTE" in vinculo else "DOCENTE", dia, turno))
+    return saida
+
+def test_celulas_vazias_como_no_import_original():
+    df = pd.DataFrame({
+        "nome": ["Ana", np.nan, "Bruno"],
+        "nome_especialidade": ["CARDIOLOGIA", "PEDIATRIA", np.nan],
+        "dia_semana": [2, 3, 4],
+        "turno": ["Manhã", np.nan, "TARDE"],
+        "vinculo_descricao": [np.nan, "Residente", "Docente"],
+    })
+    vetorizado = mapear_chunk_grades(df)
+    assert list(vetorizado.itertuples(index=False, name=None)) == [l + ("Grades2",) for l in _linha_a_linha(df)]
+    assert vetorizado["nome_profissional"].tolist()[1] == "nan"
+    assert vetorizado["nome_profissional"].notna().all()
+
+def _grades_gravadas():
+    from app.database import SessionLocal
+    from app.models import Grade
+    with SessionLocal() as db:
+        return sorted(db.query(Grade.nome_profissional, Grade.especialidade, Grade.tipo_recurso, Grade.dia_semana, Grade.turno).all())
+
+def test_streaming_remove_duplicatas_entre_chunks_como_o_import_inteiro(tmp_path):
+    from app.database import Base, engine
+    from app.services.importer import importar_grades_csv_streaming
+    Base.metadata.create_all(bind=engine)
+    csv = tmp_path / "grades.csv"
+    pd.DataFrame({
+        "nome": ["Ana", "Ana", "Bia", np.nan, "Ana", np.nan, "Bia", "Caio"],
+        "nome_especialidade": ["CARDIOLOGIA", "PEDIATRIA", "PEDIATRIA", "CARDIOLOGIA", "CARDIOLOGIA", "PEDIATRIA", "PEDIATRIA", "PEDIATRIA"],
+        "dia_semana": ["2", "2.0", "3", "4", "2", "4", "3", "5"],
+        "turno": ["MANHA", "MANHA", "TARDE", "MANHA", "TARDE", "MANHA", "TARDE", "MANHA"],
+        "ativa": ["TRUE"] * 8,
+    }).to_csv(csv, index=False)
+
+    resultados = {}
+    for tamanho in (2, 3, 100):
+        resultado = importar_grades_csv_streaming(str(csv), tamanho)
+        assert resultado["status"] == "sucesso"
+        assert resultado["ingestao"]["rss_delta_mb"] >= 0
+        resultados[tamanho] = _grades_gravadas()
+    # (Ana, 2, MANHA), (nan, 4, MANHA) e (Bia, 3, TARDE) repetidos: ficam as primeiras ocorrências
+    assert resultados[2] == resultados[3] == resultados[100]
+    assert len(resultados[100]) == 5
+    assert ("Ana", "CARDIOLOGIA", "DOCENTE", "SEG", "MANHA") in resultados[100]
+
+def test_upload_importado_fica_onde_o_setup_le(tmp_path, monkeypatch):
+    from app.database import Base, engine
+    from app.services import jobs
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(jobs, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(jobs, "ARQUIVO_GRADES", str(tmp_path / "grades.csv"))
+    conteudo = "nome,nome_especialidade,dia_semana,turno,ativa\nAna,CARDIOLOGIA,2,MANHA,TRUE\n"
+
+    job_id = jobs.novo_job_id()
+    arquivo = jobs.criar_arquivo_upload(job_id)
+    with open(arquivo, "w") as f: f.write(conteudo)
+    jobs.enfileirar_importacao_grades(job_id, arquivo, "grades.csv")
+    jobs._jobs[job_id]["_future"].result(timeout=30)
+
+    assert jobs.obter_job(job_id)["status"] == jobs.CONCLUIDO
+    assert (tmp_path / "grades.csv").read_text() == conteudo
+    assert not os.path.exists(arquivo)
@@ -0,0 +1,133 @@
+"""
+Mapeamento de especialidades: o autômato (Aho-Corasick) e as regras em
+data/regras_especialidades.csv têm de dar o mesmo resultado que a varredura
+"primeira regra que casa" sobre a lista que ficava no código antes de as
+regras irem para o CSV (congelada abaixo).
+"""
+import pandas as pd
+import pytest
+
+from app.services.importer import (
+    MAPPING_RULES, AutomatoRegras, map_specialty, normalize_text, localizar_csv_grades,
+)
+
+# Cópia congelada das regras originais (app/services/importer.py no baseline), na ordem de prioridade
+REGRAS_ORIGINAIS = [
+    # Filtros
+    ("TELEMEDICINA", "IGNORAR"), ("TELEENFERMAGEM", "IGNORAR"), ("TELEFONOAUDIOLOGIA", "IGNORAR"),
+    ("TELENUTRICAO", "IGNORAR"), ("TELETERAPIA", "IGNORAR"), ("TELECONSULTA", "IGNORAR"),
+    ("TELE-TRIAGEM", "IGNORAR"), ("NAVEGACAO", "IGNORAR"),
+
+    # Especialidades
+    ("BRONCOSCOPIA", "PNEUMOLOGIA"),
+    ("HEMODIALISE", "NEFROLOGIA"), ("TRANSPLANTE RENAL", "NEFROLOGIA"),
+    ("PALIATIVOS", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("PLASTICA", "PLASTICA"),
+    ("COLPOSCOPIA", "COLPOSCOPIA"), ("COLPO", "COLPOSCOPIA"),
+    ("PUERICULTURA", "PUERICULTURA"),
+    ("GASTROPEDIATRIA", "PEDIATRIA"), ("NEUROPEDIATRIA", "PEDIATRIA"), ("PEDIATRIA", "PEDIATRIA"),
+    ("ENDOMETRIOSE", "GINECOLOGIA/ OBSTETRICIA"), ("GESTACIONAL", "GINECOLOGIA/ OBSTETRICIA"),
+    ("MASTOLOGIA", "GINECOLOGIA/ OBSTETRICIA"), ("GINECOLOGIA", "GINECOLOGIA/ OBSTETRICIA"),
+    ("GINECO", "GINECOLOGIA/ OBSTETRICIA"), ("OBSTETRICIA", "GINECOLOGIA/ OBSTETRICIA"),
+    ("OBST", "GINECOLOGIA/ OBSTETRICIA"),
+    ("ESPACO TRANS", "ESPACO TRANS"),
+    ("TERAPIA FAMILIAR", "TERAPIA FAMILIAR"),
+    ("NEUROLOGIA", "NEUROLOGIA"), ("NEURO", "NEUROLOGIA"),
+    ("ENDOCRINOLOGIA", "ENDOCRINOLOGIA"), ("ENDOCRINO", "ENDOCRINOLOGIA"), ("OBESIDADE", "ENDOCRINOLOGIA"),
+    ("PRE OPERATORIO", "PRE OPERATORIO"), ("PRE-OPERATORIO", "PRE OPERATORIO"),
+    ("ANESTESIOLOGIA", "PRE OPERATORIO"),
+    ("SALA DE VACINA", "SALA DE VACINA"), ("VACINA", "SALA DE VACINA"),
+    ("ONCOLOGIA", "ONCOLOGIA"), ("ONCO", "ONCOLOGIA"), ("QUIMIOTERAPIA", "ONCOLOGIA"),
+    ("FONOAUDIOLOGIA", "FONOAUDIOLOGIA"), ("FONO", "FONOAUDIOLOGIA"),
+    ("NEFROLOGIA", "NEFROLOGIA"), ("NEFRO", "NEFROLOGIA"),
+    ("ORTOPEDIA", "ORTOPEDIA"), ("ORTO", "ORTOPEDIA"),
+    ("CARDIOLOGIA", "CARDIOLOGIA"), ("CARDIO", "CARDIOLOGIA"),
+    ("HEMATOLOGIA", "HEMATOLOGIA"), ("HEMATO", "HEMATOLOGIA"),
+    ("PNEUMOLOGIA", "PNEUMOLOGIA"), ("PNEUMO", "PNEUMOLOGIA"),
+    ("UROLOGIA", "UROLOGIA"), ("URO", "UROLOGIA"),
+    ("DOENCAS INFECTO", "DOENCAS INFECTO CONTAGIOSAS- DIP"), ("DIP", "DOENCAS INFECTO CONTAGIOSAS- DIP"),
+    ("INFECTO", "DOENCAS INFECTO CONTAGIOSAS- DIP"),
+    ("VASCULAR", "VASCULAR"),
+    ("OTORRINO", "OTORRINO"),
+    ("OFTALMO", "OFTALMO"), ("OCULISTICA", "OFTALMO"), ("OCI - AVAL", "OFTALMO"),
+    ("PSIQUIATRIA", "PSIQUIATRIA"), ("SAUDE MENTAL", "PSIQUIATRIA"),
+    ("DERMATOLOGIA", "DERMATOLOGIA"), ("DERMATO", "DERMATOLOGIA"),
+    ("GASTRO", "GASTRO"), ("PROCTOLOGIA", "GASTRO"),
+    ("REUMATOLOGIA", "REUMATOLOGIA"), ("REUMATO", "REUMATOLOGIA"),
+    ("LUPUS", "REUMATOLOGIA"), ("GOTA", "REUMATOLOGIA"), ("ARTRITE", "REUMATOLOGIA"),
+
+    # Apoio
+    ("ALERGIA", "PNEUMOLOGIA"), ("IMUNOLOGIA", "PNEUMOLOGIA"),
+    ("NUTRICAO", "ENDOCRINOLOGIA"),
+    ("PSICOLOGIA", "PSIQUIATRIA"),
+    ("SERVICO SOCIAL", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("FISIOTERAPIA", "ORTOPEDIA"),
+    ("EDUCACAO FISICA", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("BUCOMAXILOFACIAL", "OTORRINO"), ("ODONTOLOGIA", "CIRURGIA GERAL"), ("ESTOMATOLOGIA", "OTORRINO"),
+    ("TERAPIA OCUPACIONAL", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("MEDICINA DO TRABALHO", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("ACUPUNTURA", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("RADIOLOGIA", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("PESQUISA", "CLINICA MEDICA/ GERIATRIA/ DOR"), ("ESTOMIAS", "CIRURGIA GERAL"),
+
+    # Generalistas
+    ("CLINICA MEDICA", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("CLINICA GERAL", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("GERIATRIA", "CLINICA MEDICA/ GERIATRIA/ DOR"), ("DOR", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+    ("HOSPITAL-DIA", "CLINICA MEDICA/ GERIATRIA/ DOR"), ("TRIAGEM", "CLINICA MEDICA/ GERIATRIA/ DOR"),
+
+    # Genéricos
+    ("CIRURGIA GERAL", "CIRURGIA GERAL"), ("CIRURGIA", "CIRURGIA GERAL"),
+    ("ENFERMAGEM", "IGNORAR"), ("FARMACIA", "IGNORAR"),
+]
+
+def mapear_original(texto):
+    norm = normalize_text(texto)
+    for palavra, alvo in REGRAS_ORIGINAIS:
+        if palavra in norm: return alvo
+    return "NAO MAPEADO"
+
+# Casos em que mais de uma regra casa e a ordem decide
+CASOS_PRIORIDADE = {
+    "GASTROPEDIATRIA": "PEDIATRIA",
+    "Gastro Pediatria": "PEDIATRIA",
+    "NEUROPEDIATRIA - EPILEPSIA": "PEDIATRIA",
+    "TELEMEDICINA - CARDIOLOGIA": "IGNORAR",
+    "TELEFONOAUDIOLOGIA": "IGNORAR",
+    "PRÉ-OPERATÓRIO ANESTESIOLOGIA": "PRE OPERATORIO",
+    "CIRURGIA VASCULAR": "VASCULAR",
+    "CIRURGIA PLÁSTICA": "PLASTICA",
+    "CIRURGIA GERAL": "CIRURGIA GERAL",
+    "COLPOSCOPIA": "COLPOSCOPIA",
+    "ENDOCRINOLOGIA PEDIÁTRICA": "ENDOCRINOLOGIA",
+    "ONCOLOGIA GINECOLÓGICA": "GINECOLOGIA/ OBSTETRICIA",
+    "HEMODIÁLISE": "NEFROLOGIA",
+    "BRONCOSCOPIA": "PNEUMOLOGIA",
+    "UROGINECOLOGIA": "GINECOLOGIA/ OBSTETRICIA",
+    "DOR CRÔNICA - NEUROLOGIA": "NEUROLOGIA",
+    "XYZ": "NAO MAPEADO",
+    "": "NAO MAPEADO",
+}
+
+@pytest.mark.parametrize("texto,esperado", CASOS_PRIORIDADE.items())
+def test_casos_de_prioridade(texto, esperado):
+    assert mapear_original(texto) == esperado
+    assert map_specialty(texto) == esperado
+
+def test_csv_preserva_ordem_das_regras_originais():
+    originais = [(normalize_text(p), alvo) for p, alvo in REGRAS_ORIGINAIS]
+    assert MAPPING_RULES == originais
+
+def test_automato_equivale_a_varredura_original_no_export():
+    textos = set(pd.read_csv(localizar_csv_grades(), dtype=str)["nome_especialidade"].dropna())
+    diferentes = {t: (map_specialty(t), mapear_original(t)) for t in textos if map_specialty(t) != mapear_original(t)}
+    assert not diferentes
+
+def test_automato_com_palavras_sobrepostas():
+    # Sufixo de uma palavra é outra regra de maior prioridade: o link de falha precisa herdá-la
+    automato = AutomatoRegras([("B", "b"), ("AB", "ab"), ("ABC", "abc")])
+    assert automato.buscar("ABC") == 0
+    automato = AutomatoRegras([("ABC", "abc"), ("BC", "bc"), ("C", "c")])
+    assert automato.buscar("XABCX") == 0
+    assert automato.buscar("XBC") == 1
+    assert automato.buscar("XYZ") is None
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from app.core.time import FUSO, dia_e_turno, proxima_troca
+
+def instante(dia_do_mes, hora, minuto=0):
+    # 2026-10-19 é uma segunda-feira
+    return FUSO.localize(datetime(2026, 10, dia_do_mes, hora, minuto))
+
+def test_turnos_do_dia():
+    assert dia_e_turno(instante(19, 6)) == ("SEG", "MANHA")
+    assert dia_e_turno(instante(19, 12, 59)) == ("SEG", "MANHA")
+    assert dia_e_turno(instante(19, 13)) == ("SEG", "TARDE")
+    assert dia_e_turno(instante(19, 18)) == ("SEG", "NOITE")
+    assert dia_e_turno(instante(19, 23)) == ("SEG", "MADRUGADA")
+
+def test_madrugada_continua_no_dia_em_que_comecou():
+    assert dia_e_turno(instante(20, 0)) == ("SEG", "MADRUGADA")
+    assert dia_e_turno(instante(20, 5, 59)) == ("SEG", "MADRUGADA")
+    assert dia_e_turno(instante(19, 3)) == ("DOM", "MADRUGADA")
+
+def test_proxima_troca():
+    troca, dia, turno = proxima_troca(instante(19, 23, 30))
+    assert (troca, dia, turno) == (instante(20, 6), "TER", "MANHA")
+    troca, dia, turno = proxima_troca(instante(20, 2))
+    assert (troca, dia, turno) == (instante(20, 6), "TER", "MANHA")
+    troca, dia, turno = proxima_troca(instante(19, 22))
+    assert (troca, dia, turno) == (instante(19, 23), "SEG", "MADRUGADA")
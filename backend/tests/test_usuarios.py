@@ -0,0 +1,41 @@
+import pytest
+
+from app.core import security
+from app.core.config import settings
+from app.database import SessionLocal, Base, engine
+from app.models import Usuario
+from app.services.usuarios import garantir_admin_inicial, criar_usuario
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as sessao:
+        sessao.query(Usuario).delete(); sessao.commit()
+        yield sessao
+        sessao.query(Usuario).delete(); sessao.commit()
+
+def test_hash_recusa_senha_acima_do_limite_do_bcrypt():
+    with pytest.raises(ValueError, match="72"):
+        security.gerar_hash_senha("á" * 40)
+
+def test_admin_inicial_com_senha_longa_falha_com_mensagem_clara(db, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_PASSWORD", "x" * 73)
+    with pytest.raises(RuntimeError, match="ADMIN_PASSWORD"):
+        garantir_admin_inicial(db)
+    assert db.query(Usuario.id).first() is None
+
+def test_admin_inicial_no_limite(db, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_PASSWORD", "x" * 72)
+    garantir_admin_inicial(db)
+    admin = db.query(Usuario).one()
+    assert security.verificar_senha("x" * 72, admin.senha_hash)
+
+def test_criar_usuario_recusa_senha_longa(db):
+    resultado = criar_usuario(db, {"username": "ana", "senha": "é" * 37, "papel": "coordenador"})
+    assert "erro" in resultado
+
+def test_hash_ficticio_preparado_uma_vez():
+    primeiro = security.preparar_hash_ficticio()
+    assert security.preparar_hash_ficticio() is primeiro
+    assert security.verificar_senha("qualquer", None) is False
@@ -13,6 +13,14 @@ export const useAuthStore = defineStore('auth', () => {
   }
 
   function logout() {
+    // Revoga o token no servidor (sem esperar: a saída local acontece de qualquer forma)
+    if (token.value) {
+      fetch('http://localhost:8000/api/auth/logout', {
+        method: 'POST',
+        headers: { Authorization: `Bearer ${token.value}` },
+        keepalive: true
+      }).catch(() => {})
+    }
     token.value = null
     user.value = null
     localStorage.removeItem('gds_token')